@@ -12,25 +12,42 @@ import io
 import json
 import logging
 import os
+import posixpath
+import shutil
 import sys
 import tarfile
 import tempfile
+import time
 import zipfile
-from collections.abc import Iterable
-from importlib.metadata import PathDistribution
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from functools import partial
 from pathlib import Path
+from typing import TYPE_CHECKING
 
+import zstandard
 from build import ProjectBuilder  # noqa: TID253
 from conda.common.compat import on_win
 from conda.common.path.windows import win_path_to_unix
-from conda_package_streaming.create import conda_builder
+from conda_package_streaming.create import (
+    CONDA_PACKAGE_FORMAT_VERSION,
+    CONDA_ZIP64_LIMIT,
+    ZSTD_COMPRESS_LEVEL,
+    ZSTD_COMPRESS_THREADS,
+    CondaTarFile,
+    conda_builder,
+)
 from installer.utils import parse_wheel_filename  # noqa: TID253
 
 from conda_pypi import dependencies, installer, paths
 from conda_pypi.conda_build_utils import PathType, sha256_checksum
-from conda_pypi.license_files import copy_into_info_licenses
-from conda_pypi.translate import CondaMetadata
-from conda_pypi.utils import sha256_as_base64url
+from conda_pypi.license_files import read_wheel_licenses
+from conda_pypi.translate import CondaMetadata, WheelDistribution
+from conda_pypi.utils import file_lock, sha256_as_base64url, sha256_base64url_to_hex
+
+if TYPE_CHECKING:
+    from conda_pypi.conversion_cache import ConversionCache
 
 log = logging.getLogger(__name__)
 
@@ -47,22 +64,34 @@ def filter(tarinfo):
 
 
 # see conda_build.build.build_info_files_json_v1
-def paths_json(base: Path | str):
+def paths_json(base: Path | str, use_record: bool = False, threads: int | None = None):
     """
     Build simple paths.json with only 'hardlink' or 'symlink' types.
+
+    With ``use_record``, digests listed in ``*.dist-info/RECORD`` files under
+    ``base`` are reused for files whose size matches and that are not newer
+    than the RECORD. Other files are hashed on a pool of ``threads`` threads.
     """
     base = str(base)
 
     if not base.endswith(os.sep):
         base = base + os.sep
 
+    if use_record:
+        paths = _paths_from_record(base, threads=threads)
+    else:
+        paths = _paths(base, base)
+
     return {
-        "paths": sorted(_paths(base, base), key=lambda entry: entry["_path"]),
+        "paths": sorted(paths, key=lambda entry: entry["_path"]),
         "paths_version": 1,
     }
 
 
-def _paths(base, path, filter=lambda x: x.name != ".git"):
+def _scan(base, path, filter=lambda x: x.name != ".git"):
+    """
+    Yield ``(relative_path, entry)`` for files and symlinks below ``path``.
+    """
     for entry in os.scandir(path):
         relative_path = entry.path[len(base) :]
         if on_win:
@@ -70,23 +99,83 @@ def _paths(base, path, filter=lambda x: x.name != ".git"):
         if relative_path == "info" or not filter(entry):
             continue
         if entry.is_dir():
-            yield from _paths(base, entry.path, filter=filter)
+            yield from _scan(base, entry.path, filter=filter)
         elif entry.is_file() or entry.is_symlink():
-            try:
-                st_size = entry.stat().st_size
-            except FileNotFoundError:
-                st_size = 0  # symlink to nowhere
-            yield {
-                "_path": relative_path,
-                "path_type": str(PathType.softlink if entry.is_symlink() else PathType.hardlink),
-                "sha256": sha256_checksum(entry.path, entry),
-                "size_in_bytes": st_size,
-            }
+            yield relative_path, entry
         else:
             log.debug(f"Not regular file '{entry}'")
             # will Python's tarfile add pipes, device nodes to the archive?
 
 
+def _path_entry(relative_path: str, entry: os.DirEntry, sha256: str | None) -> dict:
+    try:
+        st_size = entry.stat().st_size
+    except FileNotFoundError:
+        st_size = 0  # symlink to nowhere
+    return {
+        "_path": relative_path,
+        "path_type": str(PathType.softlink if entry.is_symlink() else PathType.hardlink),
+        "sha256": sha256,
+        "size_in_bytes": st_size,
+    }
+
+
+def _paths(base, path, filter=lambda x: x.name != ".git"):
+    for relative_path, entry in _scan(base, path, filter=filter):
+        yield _path_entry(relative_path, entry, sha256_checksum(entry.path, entry))
+
+
+def _recorded_digests(record_entries: list[tuple[str, os.DirEntry]]) -> dict:
+    """
+    Map paths listed in RECORD files to ``(sha256 hex, size, RECORD mtime)``.
+    """
+    recorded = {}
+    for relative_path, entry in record_entries:
+        record_mtime = entry.stat().st_mtime
+        # RECORD paths are relative to the directory containing .dist-info
+        site_dir = posixpath.dirname(posixpath.dirname(relative_path))
+        with open(entry.path, newline="", encoding="utf-8") as record_file:
+            for row in csv.reader(record_file):
+                if len(row) < 3 or not row[1].startswith("sha256=") or not row[2].isdigit():
+                    continue
+                digest = sha256_base64url_to_hex(row[1].removeprefix("sha256="))
+                if digest is None:
+                    continue
+                path = posixpath.normpath(posixpath.join(site_dir, row[0]))
+                recorded[path] = (digest, int(row[2]), record_mtime)
+    return recorded
+
+
+def _paths_from_record(base: str, threads: int | None = None) -> list[dict]:
+    entries = list(_scan(base, base))
+    records = [
+        (relative_path, entry)
+        for relative_path, entry in entries
+        if relative_path.endswith(".dist-info/RECORD") and not entry.is_symlink()
+    ]
+    recorded = _recorded_digests(records)
+
+    paths = []
+    suspect = []
+    for relative_path, entry in entries:
+        digest, size, record_mtime = recorded.get(relative_path, (None, None, None))
+        if digest is not None and not entry.is_symlink():
+            stat = entry.stat()
+            if stat.st_size == size and stat.st_mtime <= record_mtime:
+                paths.append(_path_entry(relative_path, entry, digest))
+                continue
+        suspect.append((relative_path, entry))
+
+    # hashlib releases the GIL while hashing
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        digests = executor.map(lambda item: sha256_checksum(item[1].path, item[1]), suspect)
+        for (relative_path, entry), digest in zip(suspect, digests):
+            paths.append(_path_entry(relative_path, entry, digest))
+
+    log.debug("Reused %d RECORD digests, hashed %d files", len(paths) - len(suspect), len(suspect))
+    return paths
+
+
 def json_dumps(object):
     """
     Consistent json formatting.
@@ -102,6 +191,54 @@ def _add_to_tar(tar: tarfile.TarFile, name: str, data: bytes, mode: int = 0o644)
     tar.addfile(tar_info, io.BytesIO(data))
 
 
+@contextmanager
+def bounded_conda_builder(
+    stem: str,
+    path: Path,
+    *,
+    compressor: Callable[[], zstandard.ZstdCompressor],
+    spool_max_size: int,
+) -> Iterator[CondaTarFile]:
+    """
+    Like :func:`conda_package_streaming.create.conda_builder`, but the
+    uncompressed ``pkg-`` and ``info-`` tarballs roll over to temporary files
+    past ``spool_max_size`` bytes instead of growing in memory with the package.
+    """
+    output_path = Path(path, f"{stem}.conda")
+    with (
+        tempfile.SpooledTemporaryFile(max_size=spool_max_size) as info_file,
+        tempfile.SpooledTemporaryFile(max_size=spool_max_size) as pkg_file,
+    ):
+        with (
+            tarfile.TarFile(fileobj=info_file, mode="w", encoding="utf-8") as info_tar,
+            CondaTarFile(
+                fileobj=pkg_file, mode="w", info_tar=info_tar, encoding="utf-8"
+            ) as pkg_tar,
+        ):
+            yield pkg_tar
+
+        with zipfile.ZipFile(output_path, "x") as conda_file:
+            # one compressor, and so one set of zstd buffers, at a time
+            data_compress = compressor()
+            pkg_metadata = {"conda_pkg_format_version": CONDA_PACKAGE_FORMAT_VERSION}
+            conda_file.writestr("metadata.json", json.dumps(pkg_metadata))
+
+            for component, spool in (("pkg", pkg_file), ("info", info_file)):
+                size = spool.tell()
+                spool.seek(0)
+                with (
+                    conda_file.open(
+                        f"{component}-{stem}.tar.zst",
+                        "w",
+                        force_zip64=(size > CONDA_ZIP64_LIMIT),
+                    ) as component_file,
+                    data_compress.stream_writer(
+                        component_file, size=size, closefd=False
+                    ) as component_stream,
+                ):
+                    shutil.copyfileobj(spool, component_stream)
+
+
 def build_pypa(
     path: Path,
     output_path,
@@ -145,6 +282,36 @@ def build_pypa(
     return editable_file
 
 
+@contextmanager
+def _staging_dir(output_path: Path) -> Iterator[Path]:
+    """
+    Private directory in ``output_path`` to write a package in before
+    :func:`_publish` moves it into place.
+    """
+    staging = Path(tempfile.mkdtemp(dir=output_path, prefix=".staging-"))
+    try:
+        yield staging
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def _publish(staged: Path, package_conda: Path) -> None:
+    """
+    Move ``staged`` to ``package_conda`` in one step, so that processes sharing
+    the directory never see a partial package. Like ``open(mode="x")``, raises
+    FileExistsError if ``package_conda`` exists.
+    """
+    try:
+        # unlike a rename, a hard link never replaces an existing file
+        os.link(staged, package_conda)
+    except FileExistsError:
+        raise
+    except OSError:  # no hard links on this filesystem
+        if package_conda.exists():
+            raise FileExistsError(f"File already exists: {package_conda}") from None
+        os.replace(staged, package_conda)
+
+
 def build_conda(
     whl: Path,
     build_path: Path,
@@ -155,30 +322,59 @@ def build_conda(
     is_editable=False,
     pypi_to_conda_name_mapping: dict | None = None,
     channels: Iterable[str] = (),
+    cache: ConversionCache | None = None,
+    compression_level: int = ZSTD_COMPRESS_LEVEL,
+    compression_threads: int = ZSTD_COMPRESS_THREADS,
+    max_memory: int | None = None,
 ) -> Path:
+    """
+    Convert wheel ``whl`` into a ``.conda`` package in ``output_path``.
+
+    With a ``cache``, plain wheel conversions (no ``project_path`` or
+    ``test_dir``) are looked up before converting and stored afterwards.
+
+    ``compression_level`` (up to 22) and ``compression_threads`` configure the
+    zstd compressor; ``compression_threads=-1`` uses one thread per CPU and
+    ``0`` compresses on the calling thread.
+
+    ``max_memory`` bounds the package data held in memory during conversion,
+    independent of wheel size; larger buffers are spooled to temporary files.
+    By default the whole uncompressed package is held in memory.
+
+    The package is written in a hidden directory in ``output_path`` and moved
+    into place once complete.
+    """
+    cache_key = None
+    if cache is not None and project_path is None and test_dir is None:
+        cache_key = cache.key(
+            whl,
+            pypi_to_conda_name_mapping,
+            channels,
+            python_executable,
+            compression_level,
+            compression_threads,
+        )
+        if cached := cache.get(cache_key):
+            package_conda = output_path / cached.name
+            if package_conda.exists():
+                raise FileExistsError(f"File already exists: {package_conda}")
+            with _staging_dir(output_path) as staging:
+                shutil.copyfile(cached, staging / cached.name)
+                _publish(staging / cached.name, package_conda)
+            return package_conda
+
     if not build_path.exists():
         build_path.mkdir()
 
-    with (
-        zipfile.ZipFile(whl) as wheel_zip,
-        tempfile.TemporaryDirectory(prefix="dist-info") as dist_info_tmp,
-    ):
+    # One open of the archive serves metadata, licenses and package contents.
+    with zipfile.ZipFile(whl) as wheel_zip, _staging_dir(output_path) as staging:
         parsed = parse_wheel_filename(whl.name)
         dist_info_name = f"{parsed.distribution}-{parsed.version}.dist-info"
 
-        dist_info_tmp_path = Path(dist_info_tmp)
-        prefix = f"{dist_info_name}/"
-        for zip_info in wheel_zip.infolist():
-            if zip_info.filename.startswith(prefix):
-                wheel_zip.extract(zip_info, dist_info_tmp_path)
-        dist_info = dist_info_tmp_path / dist_info_name
-        wheel_zip.close()  # so installer has exclusive access below
-
-        # This is mainly for METADATA and entry_points.txt. It would be
-        # straightforward to write or find a WheelDistribution() to grab these
-        # files from the wheel archive directly, instead of PathDistribution():
+        # METADATA, entry_points.txt and License-File payloads are read from
+        # the archive in memory instead of extracting the .dist-info folder.
         metadata = CondaMetadata.from_distribution(
-            PathDistribution(dist_info),
+            WheelDistribution(wheel_zip, dist_info_name),
             pypi_to_conda_name_mapping,
             channels=channels,
         )
@@ -192,8 +388,23 @@ def build_conda(
         # compression saves memory on decompression by allocating correct-sized
         # buffers. The compressed data is written directly into the ZipFile()
         # `.conda` archive.
-        with conda_builder(file_id, output_path) as tar:
-            package_paths = installer.install_installer_to_tar(python_executable, whl, tar)
+        compressor = partial(
+            zstandard.ZstdCompressor, level=compression_level, threads=compression_threads
+        )
+        if max_memory:
+            # the pkg-, info- and one installer buffer may be alive at once;
+            # leave the rest of the budget for zstd and the interpreter
+            spool_max_size = max(max_memory // 4, 1)
+            builder = bounded_conda_builder(
+                file_id, staging, compressor=compressor, spool_max_size=spool_max_size
+            )
+        else:
+            spool_max_size = 0
+            builder = conda_builder(file_id, staging, compressor=compressor)
+        with builder as tar:
+            package_paths = installer.install_installer_to_tar(
+                python_executable, whl, tar, archive=wheel_zip, spool_max_size=spool_max_size
+            )
 
             # XXX set build string as hash of pypa metadata so that conda can re-install
             # when project gains new entry-points, dependencies?
@@ -201,15 +412,9 @@ def build_conda(
             _add_to_tar(tar, "info/index.json", json_dumps(record).encode("utf-8"))
             _add_to_tar(tar, "info/about.json", json_dumps(metadata.about).encode("utf-8"))
 
-            info_tmp = build_path / "info"
-            copy_into_info_licenses(dist_info, info_tmp, metadata.metadata)
-            licenses_dir = info_tmp / "licenses"
-            if licenses_dir.exists():
-                for license_path in sorted(licenses_dir.rglob("*")):
-                    if not license_path.is_file():
-                        continue
-                    rel = license_path.relative_to(info_tmp).as_posix()
-                    _add_to_tar(tar, f"info/{rel}", license_path.read_bytes())
+            licenses = read_wheel_licenses(wheel_zip, dist_info_name, metadata.metadata)
+            for name, payload in sorted(licenses.items()):
+                _add_to_tar(tar, name, payload)
 
             # used especially for console_scripts
             if link_json := metadata.link_json():
@@ -251,7 +456,114 @@ def build_conda(
             ).encode("utf-8")
             _add_to_tar(tar, "info/paths.json", paths_data)
 
-    return output_path / f"{file_id}.conda"
+        package_conda = output_path / f"{file_id}.conda"
+        _publish(staging / package_conda.name, package_conda)
+    if cache_key:
+        cache.put(cache_key, package_conda)
+    return package_conda
+
+
+def _build_conda_once(
+    whl: Path, build_path: Path, output_path: Path, python_executable, lock_dir: Path, **kwargs
+) -> Path:
+    """
+    :func:`build_conda` under a lock on ``whl``'s name in ``lock_dir``, so that
+    processes sharing ``output_path`` convert each wheel once; the others wait
+    for the lock and return the same package.
+    """
+    converted = lock_dir / f"{whl.name}.converted"
+    with file_lock(lock_dir / f"{whl.name}.lock"):
+        try:
+            package_conda = output_path / converted.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            pass
+        else:
+            if package_conda.exists():
+                log.debug("%s is already converted to %s", whl.name, package_conda)
+                return package_conda
+        package_conda = build_conda(whl, build_path, output_path, python_executable, **kwargs)
+        converted.write_text(package_conda.name, encoding="utf-8")
+    return package_conda
+
+
+def _build_conda_timed(
+    whl: Path, output_path: Path, python_executable, lock_dir: Path | None = None, **kwargs
+) -> dict:
+    """
+    Run :func:`build_conda` in a private build directory and report the outcome
+    instead of raising, so that one bad wheel does not abort a batch.
+    """
+    result = {"wheel": str(whl), "package": None, "error": None, "error_type": None}
+    start = time.perf_counter()
+    try:
+        with tempfile.TemporaryDirectory(prefix="conda") as build_path:
+            if lock_dir is None:
+                package_conda = build_conda(
+                    whl, Path(build_path), output_path, python_executable, **kwargs
+                )
+            else:
+                package_conda = _build_conda_once(
+                    whl, Path(build_path), output_path, python_executable, lock_dir, **kwargs
+                )
+        result["package"] = str(package_conda)
+    except Exception as e:
+        log.debug("Failed to convert %s", whl, exc_info=True)
+        result["error"] = f"{type(e).__name__}: {e}"
+        result["error_type"] = type(e).__name__
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def build_conda_batch(
+    wheels: Iterable[Path],
+    output_path: Path,
+    python_executable,
+    jobs: int = 1,
+    test_dir: Path | None = None,
+    pypi_to_conda_name_mapping: dict | None = None,
+    channels: Iterable[str] = (),
+    compression_level: int = ZSTD_COMPRESS_LEVEL,
+    compression_threads: int = ZSTD_COMPRESS_THREADS,
+    max_memory: int | None = None,
+    cache: ConversionCache | None = None,
+    lock_dir: Path | None = None,
+) -> Iterator[dict]:
+    """
+    Convert many wheels with :func:`build_conda`, using a pool of ``jobs``
+    worker processes when ``jobs > 1``.
+
+    With a ``lock_dir``, other processes converting the same wheels into
+    ``output_path`` are waited for, and their packages are reported instead of
+    converting the wheels again.
+
+    Yields one dict per wheel in completion order, with ``wheel``, ``package``
+    (``None`` on failure), ``error`` and ``error_type`` (``None`` on success)
+    and ``seconds`` keys.
+    """
+    kwargs = {
+        "is_editable": False,
+        "test_dir": test_dir,
+        "pypi_to_conda_name_mapping": pypi_to_conda_name_mapping,
+        "channels": tuple(channels),
+        "compression_level": compression_level,
+        "compression_threads": compression_threads,
+        "max_memory": max_memory,
+        "cache": cache,
+        "lock_dir": lock_dir,
+    }
+
+    if jobs <= 1:
+        for whl in wheels:
+            yield _build_conda_timed(whl, output_path, python_executable, **kwargs)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(_build_conda_timed, whl, output_path, python_executable, **kwargs)
+            for whl in wheels
+        ]
+        for future in as_completed(futures):
+            yield future.result()
 
 
 def update_RECORD(record_path: Path, base_path: Path, changed_path: Path):
@@ -283,6 +595,9 @@ def pypa_to_conda(
     pypi_to_conda_name_mapping: dict | None = None,
     channels: Iterable[str] = (),
     yes: bool = True,
+    compression_level: int = ZSTD_COMPRESS_LEVEL,
+    compression_threads: int = ZSTD_COMPRESS_THREADS,
+    max_memory: int | None = None,
 ):
     project = Path(project)
 
@@ -315,6 +630,9 @@ def pypa_to_conda(
             is_editable=distribution == "editable",
             pypi_to_conda_name_mapping=pypi_to_conda_name_mapping,
             channels=channels,
+            compression_level=compression_level,
+            compression_threads=compression_threads,
+            max_memory=max_memory,
         )
 
     return package_conda
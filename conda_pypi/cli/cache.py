@@ -0,0 +1,112 @@
+from argparse import Namespace, _SubParsersAction
+
+from conda.auxlib.ish import dals
+
+
+def configure_parser(parser: _SubParsersAction) -> None:
+    """Configure all subcommand arguments and options via argparse"""
+
+    summary = "Inspect and prune the caches of converted and downloaded wheels"
+    description = summary
+    epilog = dals(
+        """
+        Examples:
+
+        Show the location and size of the conversion cache::
+
+            conda pypi cache
+
+        List cached packages, least recently used first::
+
+            conda pypi cache --list
+
+        Evict least recently used packages until the cache fits in 500 MiB::
+
+            conda pypi cache --prune --max-size 500M
+
+        Remove every cached package::
+
+            conda pypi cache --clear
+
+        Evict least recently used wheels and index pages downloaded from PyPI::
+
+            conda pypi cache --downloads --prune --max-size 1G
+
+        """
+    )
+    cache = parser.add_parser(
+        "cache",
+        help=summary,
+        description=description,
+        epilog=epilog,
+    )
+    cache.add_argument(
+        "--downloads",
+        action="store_true",
+        help="Act on the cache of wheels and index pages downloaded from PyPI "
+        "instead of the cache of converted packages.",
+    )
+    cache.add_argument(
+        "--list",
+        action="store_true",
+        help="List cached packages, least recently used first.",
+    )
+    actions = cache.add_mutually_exclusive_group()
+    actions.add_argument(
+        "--prune",
+        action="store_true",
+        help="Evict least recently used packages beyond the size cap.",
+    )
+    actions.add_argument(
+        "--clear",
+        action="store_true",
+        help="Remove all cached packages.",
+    )
+    cache.add_argument(
+        "--max-size",
+        help="Size cap used by --prune, e.g. 500M or 2G. "
+        "Defaults to the conda_pypi_conversion_cache_max_size setting, or "
+        "conda_pypi_download_cache_max_size with --downloads.",
+    )
+
+
+def execute(args: Namespace) -> int:
+    """Entry point for the `conda pypi cache` subcommand"""
+    from conda.base.context import context
+    from conda.utils import human_bytes
+
+    from conda_pypi.utils import parse_size
+
+    if args.downloads:
+        from conda_pypi.download_cache import DownloadCache
+
+        cache = DownloadCache(max_size=context.plugins.conda_pypi_download_cache_max_size)
+        noun = "files"
+    else:
+        from conda_pypi.conversion_cache import ConversionCache
+
+        cache = ConversionCache(max_size=context.plugins.conda_pypi_conversion_cache_max_size)
+        noun = "packages"
+
+    if args.clear:
+        removed = cache.clear()
+        print(f"Removed {len(removed)} cached {noun} from {cache.path}")
+    elif args.prune:
+        max_size = parse_size(args.max_size) if args.max_size else cache.max_size
+        removed = cache.prune(max_size)
+        freed = sum(entry.size for entry in removed)
+        print(f"Removed {len(removed)} cached {noun} ({human_bytes(freed)}) from {cache.path}")
+
+    entries = cache.entries()
+    if args.list:
+        for entry in entries:
+            if args.downloads:
+                print(f"{entry.path.relative_to(cache.path)}  {human_bytes(entry.size)}")
+            else:
+                print(f"{entry.path.name}  {human_bytes(entry.size)}  {entry.key}")
+
+    total = sum(entry.size for entry in entries)
+    print(f"Cache location: {cache.path}")
+    print(f"Cached {noun}: {len(entries)} ({human_bytes(total)})")
+    print(f"Size cap: {human_bytes(cache.max_size)}")
+    return 0
@@ -40,6 +40,14 @@ def configure_parser(parser: _SubParsersAction) -> None:
 
             conda pypi convert --test-dir ./my-tests-dir ./my-python-project
 
+        Convert a directory of wheels using 8 processes, writing a JSON summary::
+
+            conda pypi convert --jobs 8 --summary-json summary.json ./wheelhouse
+
+        Trade package size for conversion speed::
+
+            conda pypi convert --compression-level 3 --compression-threads -1 ./wheelhouse
+
         """
     )
 
@@ -58,9 +66,11 @@ def configure_parser(parser: _SubParsersAction) -> None:
         default=Path.cwd() / "conda-pypi-output",
     )
     convert.add_argument(
-        "project_path",
+        "project_paths",
         metavar="PROJECT",
-        help="Convert named path as conda package.",
+        nargs="+",
+        help="Convert named path as conda package. Several wheels, or directories "
+        "of wheels, may be given to convert them in one batch.",
     )
     convert.add_argument(
         "-e",
@@ -84,6 +94,63 @@ def configure_parser(parser: _SubParsersAction) -> None:
         required=False,
         default=None,
     )
+    convert.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes used to convert a batch of wheels. 0 uses one process per CPU.",
+    )
+    convert.add_argument(
+        "--summary-json",
+        type=Path,
+        required=False,
+        default=None,
+        help="Write per-wheel results and timings of a batch conversion to this JSON file.",
+    )
+    convert.add_argument(
+        "--compression-level",
+        type=int,
+        default=None,
+        help="zstd compression level of the output packages, up to 22. Lower levels are "
+        "faster, higher levels produce smaller packages. Defaults to 19.",
+    )
+    convert.add_argument(
+        "--compression-threads",
+        type=int,
+        default=None,
+        help="Number of zstd worker threads per package; -1 uses one per CPU. "
+        "Defaults to the conda_pypi_compression_threads setting.",
+    )
+
+
+def _is_wheel_directory(path: Path) -> bool:
+    """
+    A directory of wheels, as opposed to a Python project to build.
+    """
+    if not path.is_dir():
+        return False
+    if (path / "pyproject.toml").exists() or (path / "setup.py").exists():
+        return False
+    return any(path.glob("*.whl"))
+
+
+def collect_wheels(project_paths: list[Path]) -> list[Path] | None:
+    """
+    Expand wheels and directories of wheels into a sorted list of wheels.
+
+    Returns None if any path is a source project or sdist, which cannot be
+    converted in a batch.
+    """
+    wheels = []
+    for path in project_paths:
+        if path.suffix == ".whl":
+            wheels.append(path)
+        elif _is_wheel_directory(path):
+            wheels.extend(sorted(path.glob("*.whl")))
+        else:
+            return None
+    return wheels
 
 
 def execute(args: Namespace) -> int:
@@ -92,18 +159,23 @@ def execute(args: Namespace) -> int:
     """
 
     import json
+    import os
+    import time
     from tempfile import TemporaryDirectory
 
+    import zstandard
     from conda.base.context import context
     from conda.exceptions import ArgumentError
 
     from conda_pypi import build, paths
     from conda_pypi.translate import validate_name_mapping_format
+    from conda_pypi.utils import parse_size
 
     prefix_path = Path(context.target_prefix)
-    if not Path(args.project_path).exists():
-        raise ArgumentError("PROJECT must be a local path to a sdist, wheel or directory.")
-    project_path = Path(args.project_path).expanduser()
+    for project_path in args.project_paths:
+        if not Path(project_path).exists():
+            raise ArgumentError("PROJECT must be a local path to a sdist, wheel or directory.")
+    project_paths = [Path(project_path).expanduser() for project_path in args.project_paths]
     test_dir = args.test_dir.expanduser() if args.test_dir else None
 
     if test_dir:
@@ -131,6 +203,75 @@ def execute(args: Namespace) -> int:
         # Check the dict has correct format
         validate_name_mapping_format(pypi_to_conda_name_mapping)
 
+    if args.jobs < 0:
+        raise ArgumentError("--jobs must be 0 or a positive number of processes.")
+
+    compression_level = args.compression_level
+    if compression_level is None:
+        compression_level = build.ZSTD_COMPRESS_LEVEL
+    elif compression_level > zstandard.MAX_COMPRESSION_LEVEL:
+        raise ArgumentError(
+            f"--compression-level must be at most {zstandard.MAX_COMPRESSION_LEVEL}."
+        )
+    compression_threads = args.compression_threads
+    if compression_threads is None:
+        compression_threads = context.plugins.conda_pypi_compression_threads
+    build_options = {
+        "compression_level": compression_level,
+        "compression_threads": compression_threads,
+        "max_memory": parse_size(context.plugins.conda_pypi_conversion_max_memory) or None,
+    }
+
+    project_path = project_paths[0]
+    if len(project_paths) > 1 or _is_wheel_directory(project_path):
+        wheels = collect_wheels(project_paths)
+        if wheels is None:
+            raise ArgumentError(
+                "Only wheels or directories of wheels can be converted together. "
+                "Convert source projects one at a time."
+            )
+        if args.editable:
+            raise ArgumentError("Cannot create editable package from a wheel file.")
+
+        jobs = args.jobs or os.cpu_count() or 1
+        start = time.perf_counter()
+        results = []
+        for result in build.build_conda_batch(
+            wheels,
+            output_folder,
+            str(paths.get_python_executable(prefix_path)),
+            jobs=jobs,
+            test_dir=test_dir,
+            pypi_to_conda_name_mapping=pypi_to_conda_name_mapping,
+            channels=tuple(context.channels),
+            **build_options,
+        ):
+            wheel_name = Path(result["wheel"]).name
+            if result["error"]:
+                print(f"Failed to convert {wheel_name}: {result['error']}")
+            else:
+                print(f"Converted {wheel_name} in {result['seconds']:.2f}s")
+            results.append(result)
+        elapsed = time.perf_counter() - start
+
+        failed = [result for result in results if result["error"]]
+        print(
+            f"Converted {len(results) - len(failed)} of {len(results)} wheels "
+            f"in {elapsed:.2f}s. Output folder: {output_folder}."
+        )
+
+        if args.summary_json:
+            summary = {
+                "jobs": jobs,
+                "seconds": elapsed,
+                "succeeded": len(results) - len(failed),
+                "failed": len(failed),
+                "results": sorted(results, key=lambda result: result["wheel"]),
+            }
+            Path(args.summary_json).expanduser().write_text(json.dumps(summary, indent=2))
+
+        return 1 if failed else 0
+
     # Handle wheel files directly without building
     if project_path.suffix == ".whl":
         if args.editable:
@@ -146,6 +287,7 @@ def execute(args: Namespace) -> int:
                 test_dir=test_dir,
                 pypi_to_conda_name_mapping=pypi_to_conda_name_mapping,
                 channels=tuple(context.channels),
+                **build_options,
             )
     else:
         # Build from source (project directory or sdist)
@@ -158,6 +300,7 @@ def execute(args: Namespace) -> int:
             test_dir=test_dir,
             pypi_to_conda_name_mapping=pypi_to_conda_name_mapping,
             channels=tuple(context.channels),
+            **build_options,
         )
 
     print(f"Conda package at {package_path} built successfully. Output folder: {output_folder}.")
@@ -1,9 +1,15 @@
+import itertools
+import os
 from argparse import Namespace, _SubParsersAction
+from collections.abc import Callable, Iterable, Iterator
 from importlib.metadata import PackageMetadata
 from pathlib import Path
+from typing import TypeVar
 
 from conda.auxlib.ish import dals
 
+from conda_pypi import __version__
+
 
 def configure_parser(parser: _SubParsersAction) -> None:
     """Configure all subcommand arguments and options via argparse"""
@@ -17,6 +23,18 @@ def configure_parser(parser: _SubParsersAction) -> None:
 
     conda pypi index path/to/my_wheels/
 
+  Read and hash the wheels of a large directory on 8 processes::
+
+    conda pypi index --jobs 8 path/to/my_wheels/
+
+  Also write sharded repodata, for clients that fetch only the packages they need::
+
+    conda pypi index --repodata-format both path/to/my_wheels/
+
+  Create a channel from a JSON lines dump of PyPI release payloads::
+
+    conda pypi index --from-json pypi-releases.jsonl path/to/channel/
+
   Use the generated channel with conda::
 
     conda install -c file:///path/to/my_wheels some-package
@@ -31,17 +49,76 @@ def configure_parser(parser: _SubParsersAction) -> None:
         "directory",
         metavar="DIRECTORY",
         type=Path,
-        help="Directory containing .whl files to index",
+        help="Directory containing .whl files to index, directly or in subdirectories. "
+        "With --from-json, the channel directory, created if needed.",
     )
     index.add_argument(
         "--base-url",
         help="Base URL for the channel (e.g. https://packages.example.com/). When omitted, each entry uses a file:// URI for each wheel file.",
     )
+    index.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes reading, hashing and converting wheels. "
+        "0 uses one process per CPU.",
+    )
+    index.add_argument(
+        "--from-json",
+        metavar="FILE",
+        type=Path,
+        help="Index the PyPI release payloads in FILE, one PyPI JSON API response "
+        "(https://pypi.org/pypi/<name>/<version>/json) per line, instead of reading "
+        "wheels from DIRECTORY. FILE - reads standard input.",
+    )
+    index.add_argument(
+        "--repodata-format",
+        choices=("json", "sharded", "both"),
+        default="json",
+        help="Write repodata.json, sharded repodata (repodata_shards.msgpack.zst "
+        "and one shard per package name) or both. Defaults to json.",
+    )
 
 
-def validate_dir_and_return_whl_files(directory: Path) -> list[Path]:
-    """Ensure provided path is a directory and follows expected structure
-    Expected structure:
+def iter_wheel_files(directory: Path) -> Iterator[Path]:
+    """Yield the ``.whl`` files under ``directory`` as they are found, at any
+    depth, so flat, per-package and mixed layouts all work.
+
+    Directories are read with ``os.scandir`` one at a time, so memory use
+    depends on the depth of the tree, not on the number of entries. Hidden
+    entries, such as conda-index's ``.cache``, are skipped.
+    """
+    # real paths of the directories visited, so symlinks back to one of them,
+    # e.g. to an ancestor, are not followed again
+    root = os.path.realpath(directory)
+    visited = {root}
+
+    def scan(path: str, real_path: str) -> Iterator[Path]:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir():
+                    if entry.is_symlink():
+                        entry_real_path = os.path.realpath(entry.path)
+                    else:
+                        entry_real_path = os.path.join(real_path, entry.name)
+                    if entry_real_path in visited:
+                        continue
+                    visited.add(entry_real_path)
+                    yield from scan(entry.path, entry_real_path)
+                elif entry.name.endswith(".whl") and entry.is_file():
+                    yield Path(entry.path)
+
+    return scan(str(directory), root)
+
+
+def validate_dir_and_return_whl_files(directory: Path) -> Iterator[Path]:
+    """Ensure provided path is a directory containing wheels, and return an
+    iterator over them from :func:`iter_wheel_files`.
+
+    Wheels may sit in the directory itself or in subdirectories, e.g.
     root/
       <package>/ <package>-*.whl"""
 
@@ -50,33 +127,12 @@ def validate_dir_and_return_whl_files(directory: Path) -> list[Path]:
     if not directory.is_dir():
         raise ArgumentError(f"Not a directory: {directory}")
 
-    entries = list(directory.iterdir())
-    if not entries:
-        raise SystemExit(f"No wheel subdirectories found in the given directory: {directory}")
-
-    # notify user of ignored invalid entries
-    invalid_entries = [entry for entry in entries if not entry.is_dir()]
-    if invalid_entries:
-        print(
-            f"Found invalid entries (not wheel directories) in the given directory, ignoring them: {invalid_entries}"
-        )
-
-    # find valid entries
-    valid_entries = [entry for entry in entries if entry.is_dir()]
-    if not valid_entries:
-        raise SystemExit(
-            f"No valid wheel subdirectories found in the given directory: {directory}"
-        )
-
-    all_wheels = []
-    for entry in valid_entries:
-        # one wheel file per subdirectory is expected
-        all_wheels.extend(entry.glob("*.whl"))
-
-    if not all_wheels:
+    wheels = iter_wheel_files(directory)
+    first = next(wheels, None)
+    if first is None:
         raise SystemExit(f"No wheel files found in the given directory: {directory}")
 
-    return all_wheels
+    return itertools.chain((first,), wheels)
 
 
 def pypi_data_dict(wheel: Path, wheel_metadata: PackageMetadata, url: str):
@@ -106,56 +162,284 @@ def pypi_data_dict(wheel: Path, wheel_metadata: PackageMetadata, url: str):
     return pypi_data
 
 
-def execute(args: Namespace) -> int:
-    """Entry point for the `conda pypi index` subcommand"""
+# wheels handed to the worker processes, and stored in one transaction, at a time
+BATCH_SIZE = 1000
+# converted PyPI release payloads stored in one transaction
+JSON_BATCH_SIZE = 10_000
+
+T = TypeVar("T")
+
+
+def index_wheel(wheel: Path, url: str) -> dict:
+    """
+    Read, hash and convert ``wheel`` to a repodata entry, reporting the outcome
+    instead of raising so that one bad wheel does not abort the index.
+
+    Returns a dict with ``wheel``, ``entry`` (``None`` on failure) and
+    ``error`` (``None`` on success) keys.
+    """
     import zipfile
 
     from installer.sources import WheelFile
     from packaging.requirements import InvalidRequirement
 
     from conda_pypi.exceptions import UnableToConvertToRepodataEntry
-    from conda_pypi.index import create_channel_index, store_pypi_metadata, update_index
+    from conda_pypi.index import pypi_to_repodata_entry
     from conda_pypi.license_files import package_metadata_from_metadata_body
 
+    result = {"wheel": str(wheel), "entry": None, "error": None}
+    try:
+        with WheelFile.open(wheel) as source:
+            wheel_metadata = package_metadata_from_metadata_body(source.read_dist_info("METADATA"))
+        pypi_data = pypi_data_dict(wheel, wheel_metadata, url)
+        result["entry"] = pypi_to_repodata_entry(pypi_data)
+    except UnableToConvertToRepodataEntry as e:
+        result["error"] = f"Skipping {wheel.name}: not a pure-python wheel ({e})"
+    except InvalidRequirement as e:
+        result["error"] = f"Skipping {wheel.name}: invalid metadata ({e})"
+    except ValueError as e:
+        result["error"] = f"Skipping {wheel.name}: {e}"
+    except (OSError, zipfile.BadZipFile) as e:
+        result["error"] = f"Failed to read {wheel.name}: {e}"
+    return result
+
+
+def _starmap(function: Callable[..., T], arguments: Iterable[tuple], jobs: int) -> Iterator[T]:
+    """
+    ``function`` for each tuple of ``arguments``, in order, using a pool of
+    ``jobs`` worker processes when ``jobs > 1``. Arguments are submitted a
+    batch at a time, so memory use does not grow with their number.
+    """
+    if jobs <= 1:
+        yield from itertools.starmap(function, arguments)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    arguments = iter(arguments)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        while batch := list(itertools.islice(arguments, BATCH_SIZE)):
+            yield from executor.map(
+                function,
+                *zip(*batch),
+                chunksize=max(1, len(batch) // (jobs * 4)),
+            )
+
+
+def index_wheels(wheels_and_urls: Iterable[tuple[Path, str]], jobs: int = 1) -> Iterator[dict]:
+    """
+    :func:`index_wheel` for each wheel and its URL, in order, using a pool of
+    ``jobs`` worker processes when ``jobs > 1``. Wheels are submitted a batch
+    at a time, so memory use does not grow with the number of wheels.
+    """
+    return _starmap(index_wheel, wheels_and_urls, jobs)
+
+
+def index_pypi_json(line_number: int, line: str) -> dict:
+    """
+    Convert one PyPI release payload, a line of JSON, to a repodata entry,
+    reporting the outcome instead of raising like :func:`index_wheel`.
+
+    Returns a dict with ``line_number``, ``entry`` and ``error`` keys, the
+    latter two ``None`` for a release without a pure Python wheel.
+    """
+    import json
+
+    from packaging.requirements import InvalidRequirement
+
+    from conda_pypi.exceptions import UnableToConvertToRepodataEntry
+    from conda_pypi.index import pypi_to_repodata_entry
+
+    result = {"line_number": line_number, "entry": None, "error": None}
+    try:
+        pypi_data = json.loads(line)
+    except ValueError as e:
+        result["error"] = f"invalid JSON ({e})"
+        return result
+    if not isinstance(pypi_data, dict) or not isinstance(pypi_data.get("info"), dict):
+        result["error"] = "not a PyPI release payload"
+        return result
+    try:
+        result["entry"] = pypi_to_repodata_entry(pypi_data)
+    except UnableToConvertToRepodataEntry:
+        pass
+    except InvalidRequirement as e:
+        result["error"] = f"invalid metadata ({e})"
+    except ValueError as e:
+        result["error"] = str(e)
+    return result
+
+
+def index_pypi_json_lines(lines: Iterable[str], jobs: int = 1) -> Iterator[dict]:
+    """
+    :func:`index_pypi_json` for each line but blank ones, in order, like
+    :func:`index_wheels`.
+    """
+    numbered_lines = enumerate(lines, start=1)
+    return _starmap(index_pypi_json, (item for item in numbered_lines if item[1].strip()), jobs)
+
+
+def execute_from_json(args: Namespace, directory: Path, jobs: int) -> int:
+    """
+    `conda pypi index --from-json`: stream PyPI release payloads into the
+    channel at ``directory``, replacing the packages it had.
+
+    Payloads are converted on ``jobs`` processes and stored in transactions of
+    ``JSON_BATCH_SIZE`` entries, whose stat entries go straight to the 'md'
+    stage, so memory use does not grow with the size of the file.
+    """
+    import contextlib
+    import sys
+
+    from conda.exceptions import ArgumentError
+
+    from conda_pypi.index import (
+        create_channel_index,
+        prune_repodata,
+        store_repodata_entries,
+        update_index,
+    )
+
+    if args.base_url:
+        raise ArgumentError("--base-url cannot be used with --from-json.")
+    from_stdin = str(args.from_json) == "-"
+    if not from_stdin and not args.from_json.is_file():
+        raise ArgumentError(f"Not a file: {args.from_json}")
+    directory.mkdir(parents=True, exist_ok=True)
+
+    write_monolithic = args.repodata_format != "sharded"
+    write_shards = args.repodata_format != "json"
+    channel_index = create_channel_index(
+        directory, threads=jobs, write_monolithic=write_monolithic, write_shards=write_shards
+    )
+    cache = channel_index.cache_for_subdir("noarch")
+
+    indexed = skipped = failed = 0
+    with (
+        contextlib.nullcontext(sys.stdin) if from_stdin else args.from_json.open(encoding="utf-8")
+    ) as lines:
+        # forget the packages of an earlier run
+        cache.store_stat_state("md", ())
+        results = index_pypi_json_lines(lines, jobs)
+        while batch := list(itertools.islice(results, JSON_BATCH_SIZE)):
+            entries = []
+            for result in batch:
+                if result["entry"]:
+                    entries.append(result["entry"])
+                elif result["error"]:
+                    print(f"Skipping line {result['line_number']}: {result['error']}")
+                    failed += 1
+                else:
+                    skipped += 1
+            indexed += len(store_repodata_entries(cache, entries, stage="md"))
+
+    update_index(channel_index)
+    prune_repodata(directory / "noarch", write_monolithic, write_shards)
+
+    print(f"Indexed {indexed} releases; {skipped} without a pure Python wheel; {failed} failed.")
+    return 0
+
+
+def execute(args: Namespace) -> int:
+    """Entry point for the `conda pypi index` subcommand"""
+    from conda.exceptions import ArgumentError
+
+    from conda_pypi.index import (
+        create_channel_index,
+        indexed_wheels,
+        prune_repodata,
+        store_indexed_wheels,
+        store_repodata_entries,
+        update_index,
+    )
+
     directory = Path(args.directory).expanduser()
 
     base_url = args.base_url.rstrip("/") + "/" if args.base_url else ""
 
+    if args.jobs < 0:
+        raise ArgumentError("--jobs must be 0 or a positive number of processes.")
+    jobs = args.jobs or os.cpu_count() or 1
+
+    if args.from_json is not None:
+        return execute_from_json(args, directory, jobs)
+
     all_wheels = validate_dir_and_return_whl_files(directory)
+    wheel_count = 0
     failed_wheels = []
 
+    def url_for(wheel: Path) -> str:
+        if base_url:
+            return base_url + wheel.relative_to(directory).as_posix()
+        return wheel.resolve().as_uri()
+
     # creat channel_index and cache
-    channel_index = create_channel_index(directory)
+    write_monolithic = args.repodata_format != "sharded"
+    write_shards = args.repodata_format != "json"
+    channel_index = create_channel_index(
+        directory, threads=jobs, write_monolithic=write_monolithic, write_shards=write_shards
+    )
     cache = channel_index.cache_for_subdir("noarch")
 
     # Collect stat entries to store them all at once
     stat_entries = []
 
-    for wheel in all_wheels:
-        try:
-            with WheelFile.open(wheel) as source:
-                wheel_metadata = package_metadata_from_metadata_body(
-                    source.read_dist_info("METADATA")
-                )
-            if base_url:
-                url = base_url + wheel.relative_to(directory).as_posix()
+    # wheels indexed by earlier runs are only read again if they changed
+    known = indexed_wheels(cache)
+    seen = set()
+    # wheels being read, by str(wheel): path relative to directory and row
+    changed = {}
+
+    def changed_wheels() -> Iterator[tuple[Path, str]]:
+        nonlocal wheel_count
+        for wheel in all_wheels:
+            wheel_count += 1
+            path = wheel.relative_to(directory).as_posix()
+            seen.add(path)
+            stat = wheel.stat()
+            row = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "url": url_for(wheel),
+                # conversions change between conda-pypi versions
+                "conda_pypi": __version__,
+                "stat": None,
+                "error": None,
+            }
+            previous = known.get(path)
+            if previous and all(
+                previous[key] == row[key] for key in ("size", "mtime_ns", "url", "conda_pypi")
+            ):
+                if previous["error"]:
+                    print(previous["error"])
+                    failed_wheels.append(wheel)
+                    continue
+                if previous["stat"]:
+                    stat_entries.append(previous["stat"])
+                    continue
+            changed[str(wheel)] = (path, row)
+            yield wheel, row["url"]
+
+    results = index_wheels(changed_wheels(), jobs)
+    while batch := list(itertools.islice(results, BATCH_SIZE)):
+        rows = {}
+        entries = []
+        for result in batch:
+            path, row = changed.pop(result["wheel"])
+            rows[path] = row
+            if result["error"]:
+                print(result["error"])
+                failed_wheels.append(Path(result["wheel"]))
+                row["error"] = result["error"]
             else:
-                url = wheel.resolve().as_uri()
-            pypi_data = pypi_data_dict(wheel, wheel_metadata, url)
-            stat_entry = store_pypi_metadata(cache, pypi_data)
-            stat_entries.append(stat_entry)
-        except UnableToConvertToRepodataEntry as e:
-            print(f"Skipping {wheel.name}: not a pure-python wheel ({e})")
-            failed_wheels.append(wheel)
-        except InvalidRequirement as e:
-            print(f"Skipping {wheel.name}: invalid metadata ({e})")
-            failed_wheels.append(wheel)
-        except ValueError as e:
-            print(f"Skipping {wheel.name}: {e}")
-            failed_wheels.append(wheel)
-        except (OSError, zipfile.BadZipFile) as e:
-            print(f"Failed to read {wheel.name}: {e}")
-            failed_wheels.append(wheel)
+                entries.append((row, result["entry"]))
+        batch_stat_entries = store_repodata_entries(cache, (entry for _, entry in entries))
+        for (row, _), stat_entry in zip(entries, batch_stat_entries):
+            row["stat"] = stat_entry
+        stat_entries.extend(batch_stat_entries)
+        store_indexed_wheels(cache, rows)
+
+    store_indexed_wheels(cache, {}, removed=known.keys() - seen)
 
     # Store all stat entries in the 'md' stage in one batch
     if stat_entries:
@@ -163,12 +447,13 @@ def execute(args: Namespace) -> int:
 
     # Generate repodata from cached entries
     update_index(channel_index)
+    prune_repodata(directory / "noarch", write_monolithic, write_shards)
 
     # inform user about wheels that couldn't be indexed
     if failed_wheels:
         failed_names = ", ".join(wheel.name for wheel in failed_wheels)
         print(
-            f"Indexed {len(all_wheels) - len(failed_wheels)} wheels; "
+            f"Indexed {wheel_count - len(failed_wheels)} wheels; "
             f"{len(failed_wheels)} failed: {failed_names}"
         )
 
@@ -4,6 +4,7 @@ from pathlib import Path
 
 from conda.auxlib.ish import dals
 from conda.cli.conda_argparse import add_output_and_prompt_options
+from conda.common.constants import NULL
 
 
 def configure_parser(parser: _SubParsersAction) -> None:
@@ -41,6 +42,14 @@ def configure_parser(parser: _SubParsersAction) -> None:
 
             conda pypi install --index-url https://example.com/simple fastapi
 
+        Install from a directory of pre-downloaded wheels without connecting to PyPI::
+
+            conda pypi install --offline --find-links ./wheelhouse fastapi
+
+        Write timing spans for each phase to a JSON lines file and print a summary::
+
+            conda pypi install --timing-report timings.jsonl fastapi
+
         Install a local project in editable mode::
 
             conda pypi install -e ./my-project
@@ -69,6 +78,28 @@ def configure_parser(parser: _SubParsersAction) -> None:
         action="append",
         help="Add a PyPI index URL (can be used multiple times).",
     )
+    install.add_argument(
+        "-f",
+        "--find-links",
+        dest="find_links",
+        action="append",
+        metavar="DIR",
+        help="Search the wheels in local directory DIR before any PyPI index (can be used "
+        "multiple times). Adds to the conda_pypi_find_links setting.",
+    )
+    install.add_argument(
+        "--offline",
+        action="store_true",
+        default=NULL,
+        help="Do not connect to PyPI; only install wheels found with --find-links.",
+    )
+    install.add_argument(
+        "--timing-report",
+        metavar="PATH",
+        help="Append a JSON line per timed phase (solve, find, download, build_conda, "
+        "update_index ...) to PATH and print a summary table. "
+        "Defaults to the conda_pypi_timing_report setting.",
+    )
     output_and_prompt_options = add_output_and_prompt_options(install)
     # These options also exist on the parent parser. Suppressing subparser
     # defaults keeps `conda pypi --dry-run install ...` from being overwritten.
@@ -119,9 +150,11 @@ def execute(args: Namespace) -> int:
     from packaging.requirements import InvalidRequirement, Requirement
 
     from conda_pypi import build, convert_tree, installer
-    from conda_pypi.downloader import get_package_finder
+    from conda_pypi.download_cache import DownloadCache
+    from conda_pypi.downloader import DEFAULT_INDEX_URLS, get_package_finder
     from conda_pypi.main import run_conda_install
     from conda_pypi.markers import dependency_extras_suffix
+    from conda_pypi.timing import Timings
     from conda_pypi.translate import pypi_to_conda_name, remap_match_spec_name
     from conda_pypi.utils import get_prefix
 
@@ -184,16 +217,26 @@ def execute(args: Namespace) -> int:
         topic="`conda pypi install` for package installs",
         addendum="Use `conda install` with `conda-pypi` channel configuration instead.",
     )
-    if args.index_urls:
-        index_urls = tuple(dict.fromkeys(args.index_urls))
-        finder = get_package_finder(prefix_path, index_urls)
+    # conda's own --offline flag and setting apply too
+    offline = bool(args.offline) or context.offline
+    if args.index_urls or args.find_links or offline:
+        index_urls = tuple(dict.fromkeys(args.index_urls or DEFAULT_INDEX_URLS))
+        finder = get_package_finder(
+            prefix_path,
+            index_urls,
+            cache=DownloadCache.from_context(),
+            find_links=(*(args.find_links or ()), *context.plugins.conda_pypi_find_links),
+            offline=offline,
+        )
     else:
         finder = None
 
+    timings = Timings(args.timing_report) if args.timing_report else None
     converter = convert_tree.ConvertTree(
         prefix_path,
         override_channels=args.ignore_channels,
         finder=finder,
+        timings=timings,
     )
     channel_url = converter.repo.as_uri()
 
@@ -215,7 +258,8 @@ def execute(args: Namespace) -> int:
             remapped = remap_match_spec_name(MatchSpec(pkg), pypi_to_conda_name)
             match_specs.append(MatchSpec(remapped))
 
-    changes = converter.convert_tree(match_specs)
+    with converter:
+        changes = converter.convert_tree(match_specs)
     if changes is None:
         packages_to_install = ()
     else:
@@ -227,6 +271,8 @@ def execute(args: Namespace) -> int:
     ]
 
     if not json_output:
+        if converter.timings:
+            print(f"{converter.timings.summary()}\n")
         if converted_packages:
             converted_packages_dashed = "\n - ".join(converted_packages)
             print(f"Converted packages\n - {converted_packages_dashed}\n")
@@ -15,6 +15,12 @@ from conda.cli.conda_argparse import (
 )
 from conda.exceptions import ArgumentError
 
+from conda_pypi.cli.cache import (
+    configure_parser as configure_parser_cache,
+)
+from conda_pypi.cli.cache import (
+    execute as execute_cache,
+)
 from conda_pypi.cli.convert import (
     configure_parser as configure_parser_convert,
 )
@@ -73,6 +79,7 @@ def configure_parser(parser: argparse.ArgumentParser):
     configure_parser_install(sub_parsers)
     configure_parser_convert(sub_parsers)
     configure_parser_index(sub_parsers)
+    configure_parser_cache(sub_parsers)
 
 
 def execute(args: argparse.Namespace) -> int:
@@ -82,5 +89,7 @@ def execute(args: argparse.Namespace) -> int:
         return execute_convert(args)
     elif args.cmd == "index":
         return execute_index(args)
+    elif args.cmd == "cache":
+        return execute_cache(args)
     else:
         raise ArgumentError(f"Unknown subcommand: {args.cmd}")
@@ -0,0 +1,167 @@
+"""
+Content-addressed cache of `.conda` packages converted from wheels.
+
+Entries are keyed on everything that changes the output of
+:func:`conda_pypi.build.build_conda` for a plain wheel: the wheel's sha256, the
+conda-pypi version, the name mapping and the channels recorded in about.json.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+
+import platformdirs
+
+from conda_pypi import __version__
+from conda_pypi.conda_build_utils import sha256_checksum
+from conda_pypi.utils import parse_size, recorded_sha256
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = "2G"
+
+
+def default_cache_dir() -> Path:
+    return Path(platformdirs.user_cache_dir("conda-pypi"), "conversions")
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    path: Path
+    size: int
+    last_used: float
+
+
+class ConversionCache:
+    """
+    Converted packages stored as ``<path>/<key>/<name>-<version>-<build>.conda``.
+
+    A hit refreshes the entry's mtime, so eviction removes the least recently
+    used entries first once the cache grows past ``max_size`` bytes.
+    """
+
+    def __init__(self, path: Path | str | None = None, max_size: int | str = DEFAULT_MAX_SIZE):
+        self.path = Path(path) if path else default_cache_dir()
+        self.max_size = parse_size(max_size)
+
+    @classmethod
+    def from_context(cls) -> ConversionCache | None:
+        """
+        Cache configured by the ``conda_pypi_conversion_cache_max_size``
+        setting, or None if it is set to 0.
+        """
+        from conda.base.context import context
+
+        max_size = parse_size(context.plugins.conda_pypi_conversion_cache_max_size)
+        if not max_size:
+            return None
+        return cls(max_size=max_size)
+
+    def key(
+        self,
+        whl: Path,
+        pypi_to_conda_name_mapping: dict | None = None,
+        channels: Iterable[str] = (),
+        python_executable: str | None = None,
+        compression_level: int | None = None,
+        compression_threads: int | None = None,
+    ) -> str:
+        if pypi_to_conda_name_mapping is None:
+            # the bundled mapping only changes with the conda-pypi version
+            mapping_digest = "default"
+        else:
+            mapping_digest = hashlib.sha256(
+                json.dumps(pypi_to_conda_name_mapping, sort_keys=True).encode("utf-8")
+            ).hexdigest()
+        key_data = {
+            "channels": list(channels),
+            "compression": [compression_level, compression_threads],
+            "conda_pypi": __version__,
+            "name_mapping": mapping_digest,
+            # written into the shebangs of #!python scripts
+            "python_executable": str(python_executable) if python_executable else None,
+            # verified while downloading, if it was
+            "wheel": recorded_sha256(whl) or sha256_checksum(str(whl)),
+        }
+        return hashlib.sha256(json.dumps(key_data, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Path | None:
+        """
+        Return the cached package for ``key``, marking it as recently used.
+        """
+        entry_dir = self.path / key
+        for package in entry_dir.glob("*.conda"):
+            try:
+                os.utime(package)
+            except FileNotFoundError:  # evicted by another process
+                return None
+            log.debug("Conversion cache hit %s for %s", key, package.name)
+            return package
+        return None
+
+    def put(self, key: str, package: Path) -> Path:
+        """
+        Copy ``package`` into the cache under ``key``, then evict the least
+        recently used entries beyond ``max_size``.
+        """
+        entry_dir = self.path / key
+        entry_dir.mkdir(parents=True, exist_ok=True)
+        target = entry_dir / package.name
+        # copy beside the target and rename, so readers never see a partial file
+        fd, tmp_name = tempfile.mkstemp(dir=entry_dir, prefix=".", suffix=".tmp")
+        os.close(fd)
+        try:
+            shutil.copyfile(package, tmp_name)
+            os.replace(tmp_name, target)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        self.prune()
+        return target
+
+    def entries(self) -> list[CacheEntry]:
+        """
+        Cached packages, least recently used first.
+        """
+        entries = []
+        if not self.path.is_dir():
+            return entries
+        for entry_dir in self.path.iterdir():
+            for package in entry_dir.glob("*.conda"):
+                try:
+                    stat = package.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append(CacheEntry(entry_dir.name, package, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda entry: entry.last_used)
+
+    def prune(self, max_size: int | str | None = None) -> list[CacheEntry]:
+        """
+        Evict least recently used entries until the cache fits in ``max_size``
+        (default ``self.max_size``). Returns the removed entries.
+        """
+        max_size = self.max_size if max_size is None else parse_size(max_size)
+        entries = self.entries()
+        total = sum(entry.size for entry in entries)
+        removed = []
+        for entry in entries:
+            if total <= max_size:
+                break
+            shutil.rmtree(entry.path.parent, ignore_errors=True)
+            total -= entry.size
+            removed.append(entry)
+        if removed:
+            log.debug("Evicted %d entries from conversion cache %s", len(removed), self.path)
+        return removed
+
+    def clear(self) -> list[CacheEntry]:
+        return self.prune(0)
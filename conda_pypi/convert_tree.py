@@ -5,10 +5,14 @@ Convert a dependency tree from pypi into .conda packages
 from __future__ import annotations
 
 import logging
+import os
 import pathlib
 import re
 import tempfile
+import zipfile
 from collections.abc import Iterable
+from contextlib import nullcontext
+from importlib.metadata import Distribution
 from pathlib import Path
 from typing import TYPE_CHECKING
 
@@ -19,18 +23,33 @@ import conda.exceptions
 import platformdirs
 from conda.base.context import context, fresh_context
 from conda.common.path import get_python_short_path
+from conda.core.prefix_data import PrefixData
 from conda.exceptions import UnsatisfiableError
 from conda.models.channel import Channel
 from conda.models.match_spec import MatchSpec
 from conda.models.records import PrefixRecord
 from conda.reporters import get_spinner
 from conda_index.index import ChannelIndex  # noqa: TID253
+from installer.utils import parse_wheel_filename  # noqa: TID253
 from unearth import PackageFinder  # noqa: TID253
 
-from conda_pypi.build import build_conda
-from conda_pypi.downloader import find_and_fetch, get_package_finder
-from conda_pypi.index import update_index
-from conda_pypi.utils import SuppressOutput
+from conda_pypi import timing
+from conda_pypi.build import build_conda_batch
+from conda_pypi.conversion_cache import ConversionCache
+from conda_pypi.download_cache import DownloadCache
+from conda_pypi.downloader import (
+    fetch_candidates_all,
+    find_and_fetch_all,
+    find_candidates_all,
+    get_package_finder,
+)
+from conda_pypi.exceptions import CondaPypiError, FetchError, NoWheelError
+from conda_pypi.index import update_index, update_index_incremental
+from conda_pypi.name_mapping import pypi_to_conda_name
+from conda_pypi.no_wheel_cache import NoWheelCache
+from conda_pypi.timing import Timings
+from conda_pypi.translate import FileDistribution, WheelDistribution, requires_to_conda
+from conda_pypi.utils import SuppressOutput, file_lock, parse_size
 
 log = logging.getLogger(__name__)
 
@@ -56,6 +75,52 @@ def parse_rattler_solver_error(message: str):
             yield match.group(1)
 
 
+def wheel_conda_name(wheel: Path) -> str:
+    """
+    Name of the conda package converted from ``wheel``.
+    """
+    return pypi_to_conda_name(parse_wheel_filename(wheel.name).distribution)
+
+
+def conda_requirements(distribution: Distribution) -> list[str]:
+    """
+    Conda specs for the dependencies of ``distribution`` that its converted
+    package will depend on, read from its ``Requires-Dist``.
+    """
+    # the same specs as the package's depends: extras and other conditional
+    # requirements are not included
+    requirements, _ = requires_to_conda(distribution.requires)
+    return requirements
+
+
+def wheel_requirements(wheel: Path) -> list[str]:
+    """
+    :func:`conda_requirements` of ``wheel``.
+    """
+    parsed = parse_wheel_filename(wheel.name)
+    with zipfile.ZipFile(wheel) as wheel_zip:
+        return conda_requirements(
+            WheelDistribution(wheel_zip, f"{parsed.distribution}-{parsed.version}.dist-info")
+        )
+
+
+def available_names(names: Iterable[str], channels: Iterable[str]) -> set[str]:
+    """
+    Those of ``names`` that some package in ``channels`` provides, in any version.
+    """
+    from conda.core.subdir_data import SubdirData
+
+    channels = list(channels)
+    return {
+        name
+        for name in names
+        # names only: current_repodata.json when the channel has one, else repodata.json
+        if SubdirData.query_all(
+            MatchSpec(name), channels, context.subdirs, repodata_fn=context.repodata_fns[0]
+        )
+    }
+
+
 # import / pupate / transmogrify / ...
 class ConvertTree:
     def __init__(
@@ -64,6 +129,15 @@ class ConvertTree:
         override_channels=False,
         repo: pathlib.Path | None = None,
         finder: PackageFinder | None = None,  # to change index_urls e.g.
+        cache: ConversionCache | None = None,
+        download_cache: DownloadCache | None = None,
+        no_wheel_cache: NoWheelCache | None = None,
+        compression_level: int | None = None,
+        compression_threads: int | None = None,
+        max_memory: int | str | None = None,
+        fetch_workers: int | None = None,
+        conversion_jobs: int | None = None,
+        timings: Timings | None = None,
     ):
         # platformdirs location has a space in it; ok?
         # will be expanded to %20 in "as uri" output, conda understands that.
@@ -75,10 +149,54 @@ class ConvertTree:
         self.override_channels = override_channels
         self.python_exe = Path(self.prefix, get_python_short_path())
 
+        # None when disabled by the conda_pypi_download_cache_max_size setting
+        self.download_cache = download_cache or DownloadCache.from_context()
+
+        # None when disabled by the conda_pypi_no_wheel_cache_ttl setting
+        self.no_wheel_cache = no_wheel_cache or NoWheelCache.from_context(self.repo)
+
         if not finder:
             finder = self.default_package_finder()
         self.finder = finder
 
+        # None when disabled by the conda_pypi_conversion_cache_max_size setting
+        self.cache = cache or ConversionCache.from_context()
+
+        # packages in the local repo are rebuilt often and never published, so
+        # the conda_pypi_compression_level default favours speed over size
+        if compression_level is None:
+            compression_level = context.plugins.conda_pypi_compression_level
+        if compression_threads is None:
+            compression_threads = context.plugins.conda_pypi_compression_threads
+        self.compression_level = compression_level
+        self.compression_threads = compression_threads
+
+        if max_memory is None:
+            max_memory = context.plugins.conda_pypi_conversion_max_memory
+        self.max_memory = parse_size(max_memory) or None
+
+        # concurrent PyPI lookups and downloads, like conda's package downloads
+        self.fetch_workers = fetch_workers or context.fetch_threads
+
+        if conversion_jobs is None:
+            conversion_jobs = context.plugins.conda_pypi_conversion_jobs
+        self.conversion_jobs = conversion_jobs or os.cpu_count() or 1
+
+        # None unless a report is requested by the conda_pypi_timing_report setting
+        self.timings = timings or Timings.from_context()
+
+    def close(self) -> None:
+        """
+        Close the finder's HTTP session and its pooled connections.
+        """
+        self.finder.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
     def _convert_loop(
         self,
         max_attempts: int,
@@ -89,78 +207,223 @@ class ConvertTree:
         converted = set()
         fetched_packages = set()
         missing_packages = set()
+        # conda names that need no fetching: installed, or already fetched or
+        # available along with their dependencies
+        resolved_names = {record.name for record in PrefixData(self.prefix).iter_records()}
         attempts = 0
 
         repo = self.repo
         wheel_dir = tmp_path / "wheels"
         wheel_dir.mkdir(exist_ok=True)
 
-        while len(fetched_packages) < max_attempts and attempts < max_attempts:
+        while attempts < max_attempts:
             attempts += 1
+            with timing.span("solve") as solve_span:
+                try:
+                    # suppress messages coming from the solver
+                    with SuppressOutput():
+                        changes = solver.solve_for_diff()
+                    break
+                except conda.exceptions.PackagesNotFoundError as e:
+                    missing_packages = set(e._kwargs["packages"])
+                    log.debug(f"Missing packages: {missing_packages}")
+                except UnsatisfiableError as e:
+                    log.debug("Unsatisfiable: %r", e)
+                    missing_packages.update(parse_libmamba_solver_error(e.message))
+                    missing_packages.update(parse_rattler_solver_error(e.message))
+                solve_span.packages = sorted(missing_packages, key=str)
+
+            to_fetch = sorted(missing_packages - fetched_packages)
+            if known := self._known_without_wheel(to_fetch):
+                raise FetchError(known)
             try:
-                # suppress messages coming from the solver
-                with SuppressOutput():
-                    changes = solver.solve_for_diff()
-                break
-            except conda.exceptions.PackagesNotFoundError as e:
-                missing_packages = set(e._kwargs["packages"])
-                log.debug(f"Missing packages: {missing_packages}")
-            except UnsatisfiableError as e:
-                log.debug("Unsatisfiable: %r", e)
-                missing_packages.update(parse_libmamba_solver_error(e.message))
-                missing_packages.update(parse_rattler_solver_error(e.message))
-
-            for package in sorted(missing_packages - fetched_packages):
-                find_and_fetch(self.finder, wheel_dir, package)
-                fetched_packages.add(package)
-
-            for normal_wheel in wheel_dir.glob("*.whl"):
-                if normal_wheel in converted:
-                    continue
+                fetched = find_and_fetch_all(
+                    self.finder,
+                    wheel_dir,
+                    to_fetch,
+                    max_workers=self.fetch_workers,
+                    cache=self.download_cache,
+                )
+            except FetchError as e:
+                self._remember_without_wheel(e.errors)
+                raise
+            fetched_packages.update(to_fetch)
+            # without this, each solve would only report the next level of the tree
+            fetched_packages.update(
+                self._fetch_missing_dependencies(
+                    fetched.values(), wheel_dir, channels, resolved_names
+                )
+            )
 
-                log.debug(f"Converting '{normal_wheel}'")
+            pending = sorted(set(wheel_dir.glob("*.whl")) - converted)
+            new_packages = []
+            failed = {}
+            # collect every conversion before the repository is re-indexed
+            with timing.span("convert", [wheel.name for wheel in pending]) as convert_span:
+                for result in build_conda_batch(
+                    pending,
+                    repo / "noarch",  # XXX could be arch
+                    self.python_exe,
+                    jobs=min(self.conversion_jobs, len(pending)),
+                    channels=channels,
+                    compression_level=self.compression_level,
+                    compression_threads=self.compression_threads,
+                    max_memory=self.max_memory,
+                    cache=self.cache,
+                    # each wheel is converted once by the processes sharing the repo
+                    lock_dir=repo / ".locks",
+                ):
+                    if result["error_type"] == "FileExistsError":
+                        log.debug(
+                            f"Tried to convert wheel that is already conda-ized: {result['wheel']}"
+                        )
+                    elif result["error"]:
+                        failed[Path(result["wheel"]).name] = result["error"]
+                    else:
+                        log.debug("Conda at %s", result["package"])
+                        package = Path(result["package"])
+                        new_packages.append(package)
+                        size = package.stat().st_size
+                        convert_span.bytes += size
+                        # timed in the worker process
+                        timing.record(
+                            "build_conda", result["seconds"], [Path(result["wheel"]).name], size
+                        )
+            converted.update(pending)
+
+            if failed:
+                details = "\n".join(f"  - {wheel}: {error}" for wheel, error in failed.items())
+                raise CondaPypiError(
+                    f"Could not convert {len(failed)} wheel(s):\n{details}".replace("%", "%%")
+                )
 
-                build_path = tmp_path / normal_wheel.stem
-                build_path.mkdir()
+            # only the packages converted in this pass are added to the index
+            with (
+                self._index_lock(),
+                timing.span("update_index", [package.name for package in new_packages]) as span,
+            ):
+                update_index_incremental(repo, new_packages)
+                span.bytes = convert_span.bytes
+        else:
+            log.debug(f"Exceeded maximum of {max_attempts} attempts")
+            return None
+        return changes
 
-                try:
-                    package_conda = build_conda(
-                        normal_wheel,
-                        build_path,
-                        repo / "noarch",  # XXX could be arch
-                        self.python_exe,
-                        is_editable=False,
-                        channels=channels,
-                    )
-                    log.debug("Conda at %s", package_conda)
-                except FileExistsError:
-                    log.debug(
-                        f"Tried to convert wheel that is already conda-ized: {normal_wheel}",
-                        exc_info=True,
-                    )
+    def _fetch_missing_dependencies(
+        self,
+        wheels: Iterable[Path],
+        wheel_dir: Path,
+        channels: Iterable[str],
+        resolved_names: set[str],
+    ) -> list[str]:
+        """
+        Walk the ``Requires-Dist`` of ``wheels`` and fetch every dependency,
+        recursively, that is not in ``resolved_names`` and that neither the local
+        repository nor ``channels`` provide.
 
-                converted.add(normal_wheel)
+        The walk reads the metadata that indexes serve next to wheels (PEP 658)
+        where available; the wheels are downloaded together once it is complete.
 
-            update_index(
-                ChannelIndex(
-                    repo,
-                    None,
-                    write_run_exports=True,
-                    compact_json=True,
-                    write_current_repodata=False,
+        Only names are checked: a dependency that is installed or in a channel in
+        the wrong version is left for the solver to report. ``resolved_names`` is
+        updated in place. Returns the specs that were fetched.
+        """
+        search_channels = [self.repo.as_uri(), *channels]
+        candidates = []
+        wheels = list(wheels)
+        resolved_names.update(wheel_conda_name(wheel) for wheel in wheels)
+        specs = [spec for wheel in wheels for spec in wheel_requirements(wheel)]
+        while specs:
+            requirements = {}
+            for spec in specs:
+                name = MatchSpec(spec).name
+                if name not in resolved_names:
+                    requirements.setdefault(name, spec)
+            resolved_names.update(requirements)
+
+            available = available_names(requirements, search_channels)
+            to_fetch = sorted(spec for name, spec in requirements.items() if name not in available)
+            if not to_fetch:
+                break
+            log.debug("Dependencies missing from channels: %s", to_fetch)
+            known = self._known_without_wheel(to_fetch)
+            try:
+                found = find_candidates_all(
+                    self.finder,
+                    wheel_dir,
+                    [spec for spec in to_fetch if spec not in known],
+                    max_workers=self.fetch_workers,
+                    cache=self.download_cache,
                 )
+            except FetchError as e:
+                self._remember_without_wheel(e.errors)
+                # may not be needed by the final solve, which reports it if it is
+                log.debug("Could not fetch dependencies: %s", e)
+                found = e.fetched
+            candidates.extend(found.values())
+            resolved_names.update(
+                wheel_conda_name(Path(candidate.link.filename)) for candidate in found.values()
             )
-        else:
-            log.debug(f"Exceeded maximum of {max_attempts} attempts")
-            return None
-        return changes
+            specs = [
+                spec
+                for candidate in found.values()
+                for spec in conda_requirements(FileDistribution(candidate.metadata))
+            ]
+
+        try:
+            fetched = fetch_candidates_all(
+                candidates,
+                wheel_dir,
+                max_workers=self.fetch_workers,
+                cache=self.download_cache,
+                session=self.finder.session,
+            )
+        except FetchError as e:
+            log.debug("Could not fetch dependencies: %s", e)
+            fetched = e.fetched
+        return list(fetched)
+
+    def _index_lock(self):
+        """
+        Lock held while updating the repository's repodata, which concurrent
+        processes would otherwise overwrite with their own additions.
+        """
+        return file_lock(self.repo / ".locks" / "index.lock")
+
+    def _known_without_wheel(self, packages: Iterable) -> dict:
+        """
+        Errors of ``packages`` that recently had no wheel on the finder's
+        indexes, found without asking them again.
+        """
+        if not self.no_wheel_cache:
+            return {}
+        known = {}
+        for package in packages:
+            error = self.no_wheel_cache.get(NoWheelCache.key(package, self.finder))
+            if error is not None:
+                known[package] = NoWheelError(error)
+        return known
+
+    def _remember_without_wheel(self, errors: dict[str, Exception]) -> None:
+        if not self.no_wheel_cache:
+            return
+        for package, error in errors.items():
+            # other errors, e.g. from the network, are worth retrying
+            if isinstance(error, NoWheelError):
+                key = NoWheelCache.key(package, self.finder)
+                self.no_wheel_cache.put(key, package, error.message)
 
     def default_package_finder(self):
-        return get_package_finder(self.prefix)
+        return get_package_finder(
+            self.prefix,
+            cache=self.download_cache,
+            find_links=context.plugins.conda_pypi_find_links,
+            offline=context.offline,
+        )
 
     def _get_converting_spinner_message(self, channels) -> str:
         pypi_index_names_dashed = "\n - ".join(
-            s.get("url") for s in self.finder.sources if s.get("type") == "index"
+            s.get("url") for s in self.finder.sources if s.get("type") in ("index", "find_links")
         )
 
         canonical_names = list(dict.fromkeys([Channel(c).canonical_name for c in channels]))
@@ -193,17 +456,25 @@ class ConvertTree:
             dependency order from roots to leaves.
 
         """
+        with self.timings.activate() if self.timings else nullcontext():
+            return self._convert_tree(requested, max_attempts)
+
+    def _convert_tree(
+        self, requested: list[MatchSpec], max_attempts: int
+    ) -> tuple[tuple[PrefixRecord, ...], tuple[PrefixRecord, ...]] | None:
         (self.repo / "noarch").mkdir(parents=True, exist_ok=True)
-        if not (self.repo / "noarch" / "repodata.json").exists():
-            update_index(
-                ChannelIndex(
-                    self.repo,
-                    None,
-                    write_run_exports=True,
-                    compact_json=True,
-                    write_current_repodata=False,
-                )
-            )
+        with self._index_lock():
+            if not (self.repo / "noarch" / "repodata.json").exists():
+                with timing.span("update_index"):
+                    update_index(
+                        ChannelIndex(
+                            self.repo,
+                            None,
+                            write_run_exports=True,
+                            compact_json=True,
+                            write_current_repodata=False,
+                        )
+                    )
 
         with tempfile.TemporaryDirectory() as tmp_path:
             tmp_path = pathlib.Path(tmp_path)
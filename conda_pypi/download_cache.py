@@ -0,0 +1,319 @@
+"""
+Cache of wheels and index pages downloaded from PyPI, shared by conda-pypi
+processes.
+
+Wheels are stored as ``<path>/wheels/<key>/<filename>``, keyed on their URL
+and the sha256 the index lists for them. Index pages are stored as
+``<path>/pages/<key>`` with the ETag and Last-Modified validators the server
+sent, and are revalidated instead of downloaded again.
+
+Files are written beside their final name and renamed into place, so several
+processes can share the cache; a file evicted by another process is simply
+downloaded again. The sha256 verified while downloading a wheel is recorded in
+a hidden file beside it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+import httpx
+import platformdirs
+from conda.gateways.connection.download import download
+from unearth import Link  # noqa: TID253
+from unearth.fetchers import PyPIClient  # noqa: TID253
+
+from conda_pypi.session import download as session_download
+from conda_pypi.utils import link_or_copy, parse_size, record_sha256, recorded_sha256
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = "2G"
+
+
+def default_cache_dir() -> Path:
+    return Path(platformdirs.user_cache_dir("conda-pypi"), "downloads")
+
+
+@dataclass
+class CacheEntry:
+    path: Path
+    size: int
+    last_used: float
+
+
+@dataclass
+class CachedPage:
+    url: str
+    content_type: str
+    etag: str | None
+    last_modified: str | None
+    content: bytes
+
+
+class DownloadCache:
+    """
+    Downloaded wheels and index pages under ``path``.
+
+    A hit refreshes the file's mtime, so eviction removes the least recently
+    used files first once the cache grows past ``max_size`` bytes. The cache
+    is only walked to evict files once its size, counted from the first
+    addition on, passes ``max_size``.
+    """
+
+    def __init__(self, path: Path | str | None = None, max_size: int | str = DEFAULT_MAX_SIZE):
+        self.path = Path(path) if path else default_cache_dir()
+        self.max_size = parse_size(max_size)
+        # bytes in the cache, or None until the first addition
+        self._size = None
+        self._size_lock = threading.Lock()
+
+    @classmethod
+    def from_context(cls) -> DownloadCache | None:
+        """
+        Cache configured by the ``conda_pypi_download_cache_max_size`` setting,
+        or None if it is set to 0.
+        """
+        from conda.base.context import context
+
+        max_size = parse_size(context.plugins.conda_pypi_download_cache_max_size)
+        if not max_size:
+            return None
+        return cls(max_size=max_size)
+
+    @staticmethod
+    def wheel_sha256(link: Link) -> str | None:
+        """
+        The sha256 the index lists for ``link``, if any.
+        """
+        if link.hashes and "sha256" in link.hashes:
+            return link.hashes["sha256"]
+        if link.hash_name == "sha256":
+            return link.hash
+        return None
+
+    def wheel_path(self, link: Link) -> Path:
+        key_data = f"{link.url_without_fragment}#sha256={self.wheel_sha256(link) or ''}"
+        key = hashlib.sha256(key_data.encode("utf-8")).hexdigest()
+        return self.path / "wheels" / key / link.filename
+
+    def fetch_wheel(self, link: Link, target: Path, session: httpx.Client | None = None) -> Path:
+        """
+        Put wheel ``link`` in ``target``, downloading it into the cache first
+        unless it is already cached, through ``session`` if given.
+        """
+        cached = self.wheel_path(link)
+        target_path = target / link.filename
+        for _ in range(2):
+            sha256 = recorded_sha256(cached)
+            if self._touch(cached):
+                log.debug("Download cache hit for %s", link.filename)
+                if sha256:
+                    # the record is tied to the mtime that touching changed
+                    record_sha256(cached, sha256)
+            else:
+                self._download(link, cached, session)
+                self._added(cached)
+                sha256 = recorded_sha256(cached)
+            try:
+                link_or_copy(cached, target_path)
+            except FileNotFoundError:  # evicted by another process
+                continue
+            if sha256:
+                record_sha256(target_path, sha256)
+            return target_path
+        raise FileNotFoundError(f"{cached} was evicted while it was used")
+
+    def _download(self, link: Link, cached: Path, session: httpx.Client | None) -> None:
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        if session is not None:
+            session_download(session, link.url, cached, sha256=self.wheel_sha256(link))
+            return
+        # download beside the entry and rename, so readers never see a partial file
+        tmp_dir = Path(tempfile.mkdtemp(dir=cached.parent, prefix="."))
+        try:
+            tmp_path = tmp_dir / cached.name
+            download(link.url, tmp_path, sha256=self.wheel_sha256(link))
+            os.replace(tmp_path, cached)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        if sha256 := self.wheel_sha256(link):
+            record_sha256(cached, sha256)
+
+    def page_path(self, url: str, accept: str | None) -> Path:
+        # the same URL serves HTML or JSON depending on the Accept header
+        key = hashlib.sha256(f"{url}\n{accept or ''}".encode()).hexdigest()
+        return self.path / "pages" / key
+
+    def get_page(self, path: Path) -> CachedPage | None:
+        """
+        Return the page stored at ``path``, marking it as recently used.
+        """
+        try:
+            with path.open("rb") as page_file:
+                header = json.loads(page_file.readline())
+                content = page_file.read()
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            return None
+        return CachedPage(content=content, **header)
+
+    def put_page(self, path: Path, page: CachedPage) -> None:
+        """
+        Store ``page`` at ``path``: its validators on the first line, then the body.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        header = {
+            "url": page.url,
+            "content_type": page.content_type,
+            "etag": page.etag,
+            "last_modified": page.last_modified,
+        }
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as page_file:
+                page_file.write(json.dumps(header).encode("utf-8") + b"\n")
+                page_file.write(page.content)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        self._added(path)
+
+    def client(self, **kwargs) -> CachingPyPIClient:
+        """
+        An HTTP client for :class:`unearth.PackageFinder` that revalidates index
+        pages stored in this cache.
+        """
+        return CachingPyPIClient(self, **kwargs)
+
+    @staticmethod
+    def _touch(path: Path) -> bool:
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def entries(self) -> list[CacheEntry]:
+        """
+        Cached wheels and pages, least recently used first.
+        """
+        entries = []
+        for directory in (self.path / "wheels", self.path / "pages"):
+            if not directory.is_dir():
+                continue
+            for root, dirs, files in os.walk(directory):
+                # hidden files and directories are being written
+                dirs[:] = [name for name in dirs if not name.startswith(".")]
+                for name in files:
+                    if name.startswith("."):
+                        continue
+                    path = Path(root, name)
+                    try:
+                        stat = path.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append(CacheEntry(path, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda entry: entry.last_used)
+
+    def _added(self, path: Path) -> None:
+        """
+        Count ``path``, just added to the cache, and evict files if the cache
+        has grown past ``max_size``. Other processes adding files are only
+        counted when the cache is walked.
+        """
+        with self._size_lock:
+            if self._size is None:
+                # includes path
+                self._size = sum(entry.size for entry in self.entries())
+            else:
+                try:
+                    self._size += path.stat().st_size
+                except FileNotFoundError:  # evicted by another process
+                    return
+            if self._size > self.max_size:
+                self.prune()
+
+    def prune(self, max_size: int | str | None = None) -> list[CacheEntry]:
+        """
+        Evict least recently used files until the cache fits in ``max_size``
+        (default ``self.max_size``). Returns the removed entries.
+        """
+        max_size = self.max_size if max_size is None else parse_size(max_size)
+        entries = self.entries()
+        total = sum(entry.size for entry in entries)
+        removed = []
+        for entry in entries:
+            if total <= max_size:
+                break
+            entry.path.unlink(missing_ok=True)
+            if entry.path.parent.parent.name == "wheels":
+                shutil.rmtree(entry.path.parent, ignore_errors=True)
+            total -= entry.size
+            removed.append(entry)
+        self._size = total
+        if removed:
+            log.debug("Evicted %d files from download cache %s", len(removed), self.path)
+        return removed
+
+    def clear(self) -> list[CacheEntry]:
+        return self.prune(0)
+
+
+class CachingPyPIClient(PyPIClient):
+    """
+    :class:`unearth.fetchers.PyPIClient` that keeps index pages in a
+    :class:`DownloadCache` and revalidates them with ``If-None-Match`` and
+    ``If-Modified-Since`` instead of downloading them again.
+    """
+
+    def __init__(self, cache: DownloadCache, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+
+    def send(self, request: httpx.Request, *, stream: bool = False, **kwargs) -> httpx.Response:
+        if stream or request.method != "GET" or request.url.scheme not in ("http", "https"):
+            return super().send(request, stream=stream, **kwargs)
+
+        path = self.cache.page_path(str(request.url), request.headers.get("Accept"))
+        cached = self.cache.get_page(path)
+        if cached:
+            if cached.etag:
+                request.headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                request.headers["If-Modified-Since"] = cached.last_modified
+
+        response = super().send(request, **kwargs)
+        if cached and response.status_code == 304:
+            log.debug("Index page %s not modified", request.url)
+            response.close()
+            return httpx.Response(
+                200,
+                headers={"Content-Type": cached.content_type},
+                content=cached.content,
+                request=httpx.Request("GET", cached.url),
+            )
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code == 200 and (etag or last_modified):
+            self.cache.put_page(
+                path,
+                CachedPage(
+                    url=str(response.url),
+                    content_type=response.headers.get("Content-Type", ""),
+                    etag=etag,
+                    last_modified=last_modified,
+                    content=response.content,
+                ),
+            )
+        return response
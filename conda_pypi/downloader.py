@@ -2,29 +2,157 @@
 Fetch matching wheels from pypi.
 """
 
+import dataclasses
+import hashlib
 import logging
-from collections.abc import Iterable
+import threading
+import zipfile
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import TypeVar
 
+import httpx
+from conda.base.context import context
 from conda.core.prefix_data import PrefixData
-from conda.gateways.connection.download import download
+from conda.exceptions import CondaError
+from conda.gateways.connection.download import download, download_http_errors
+from conda.gateways.connection.session import get_session
 from conda.models.match_spec import MatchSpec
-from unearth import PackageFinder, TargetPython  # noqa: TID253
+from installer.utils import parse_wheel_filename  # noqa: TID253
+from packaging.requirements import Requirement
+from packaging.utils import canonicalize_name
+from unearth import (  # noqa: TID253
+    BestMatch,
+    Link,
+    Package,
+    PackageFinder,
+    TargetPython,
+)
+from unearth.evaluator import evaluate_package, is_equality_specifier  # noqa: TID253
 
-from conda_pypi.exceptions import CondaPypiError
-from conda_pypi.translate import conda_to_requires
+from conda_pypi import timing
+from conda_pypi.conda_build_utils import sha256_checksum
+from conda_pypi.download_cache import DownloadCache
+from conda_pypi.exceptions import CondaPypiError, FetchError, NoWheelError
+from conda_pypi.session import download as session_download
+from conda_pypi.session import new_session
+from conda_pypi.translate import WheelDistribution, conda_to_requires
+from conda_pypi.utils import link_or_copy, record_sha256
 
 log = logging.getLogger(__name__)
 
 DEFAULT_INDEX_URLS = ("https://pypi.org/simple/",)
 
+T = TypeVar("T")
+
+
+@dataclasses.dataclass
+class WheelCandidate:
+    """
+    The best wheel found for a package, and its METADATA.
+    """
+
+    package: str
+    link: Link
+    metadata: str
+    # only downloaded if the index does not serve the metadata on its own
+    wheel: Path | None = None
+
+
+class CachingPackageFinder(PackageFinder):
+    """
+    :class:`unearth.PackageFinder` that keeps the packages parsed from each
+    project's index pages for its lifetime, so looking a project up again,
+    e.g. in a later solver round, neither fetches nor parses its pages. The
+    cache sits behind the public ``find_all_packages``, which
+    ``find_best_match`` is built on here. An ``offline`` finder only searches
+    its find-links, and fails the lookup if it has none.
+
+    Index pages are requested as PEP 691 JSON first, falling back to HTML.
+    """
+
+    def __init__(self, *args, offline: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.offline = offline
+        if offline:
+            # unearth falls back to PyPI when given no sources
+            self.sources = [source for source in self.sources if source["type"] != "index"]
+        self._packages = {}
+        self._packages_lock = threading.Lock()
+
+    def find_all_packages(
+        self,
+        package_name: str,
+        allow_yanked: bool = False,
+        hashes: dict[str, list[str]] | None = None,
+    ) -> Sequence[Package]:
+        if self.offline and not self.sources:
+            # raised on lookup, so packages from conda channels install offline
+            raise CondaPypiError(
+                f"Offline mode needs a local wheelhouse to find {package_name} in."
+            )
+        if hashes:
+            return super().find_all_packages(package_name, allow_yanked, hashes)
+        key = (canonicalize_name(package_name), allow_yanked)
+        with self._packages_lock:
+            packages = self._packages.get(key)
+        if packages is None:
+            packages = list(super().find_all_packages(package_name, allow_yanked))
+            with self._packages_lock:
+                self._packages[key] = packages
+        return packages
+
+    def find_best_match(
+        self,
+        requirement: Requirement | str,
+        allow_yanked: bool | None = None,
+        allow_prereleases: bool | None = None,
+        hashes: dict[str, list[str]] | None = None,
+    ) -> BestMatch:
+        # unearth's own find_best_match bypasses find_all_packages
+        if isinstance(requirement, str):
+            requirement = Requirement(requirement)
+        if requirement.url or hashes:
+            return super().find_best_match(requirement, allow_yanked, allow_prereleases, hashes)
+        if allow_yanked is None:
+            allow_yanked = is_equality_specifier(requirement.specifier)
+        candidates = self.find_all_packages(requirement.name, allow_yanked)
+        applicable = [
+            package
+            for package in candidates
+            if evaluate_package(package, requirement, allow_prereleases)
+        ]
+        if not applicable and allow_prereleases is None:
+            # like unearth, allow prereleases if they are all the index has
+            applicable = [
+                package
+                for package in candidates
+                if evaluate_package(package, requirement, allow_prereleases=True)
+            ]
+        return BestMatch(next(iter(applicable), None), applicable, candidates)
+
 
 def get_package_finder(
     prefix: Path,
     index_urls: Iterable[str] = DEFAULT_INDEX_URLS,
+    cache: DownloadCache | None = None,
+    find_links: Iterable[str] = (),
+    offline: bool = False,
 ) -> PackageFinder:
     """
     Finder with prefix's Python, not our Python.
+
+    ``find_links`` are local wheelhouse directories (or URLs of pages linking
+    to wheels) searched before ``index_urls``; a wheel found there is used
+    even if an index has a newer one. ``offline`` drops the index URLs, so
+    only local wheelhouses are searched; without any, looking a package up
+    raises :class:`CondaPypiError`.
+
+    The finder's session is pooled, for :func:`find_and_fetch` to download
+    wheels over the connections it used for index pages. With a ``cache``,
+    index pages are stored in it and revalidated. Each project's packages are
+    kept in memory once they have been found.
     """
     prefix_data = PrefixData(prefix)
     python_records = list(prefix_data.query("python"))
@@ -33,11 +161,34 @@ def get_package_finder(
     py_ver = python_records[0].version
     py_ver = tuple(map(int, py_ver.split(".")))
     target_python = TargetPython(py_ver=py_ver)
-    return PackageFinder(
+
+    find_links = [_find_link(find_link, offline) for find_link in find_links]
+    index_urls = [] if offline else list(index_urls)
+    finder = CachingPackageFinder(
+        offline=offline,
+        session=new_session(index_urls, cache),
         target_python=target_python,
         only_binary=":all:",
-        index_urls=index_urls,
+        find_links=find_links,
+        index_urls=() if find_links else index_urls,
+        respect_source_order=bool(find_links),
     )
+    if find_links:
+        # unearth adds find-links after index URLs
+        for index_url in index_urls:
+            finder.add_index_url(index_url)
+    return finder
+
+
+def _find_link(find_link: str, offline: bool) -> str:
+    if "://" in find_link:
+        if offline and not find_link.startswith("file:"):
+            raise CondaPypiError(f"Cannot use {find_link} to find wheels in offline mode.")
+        return find_link
+    path = Path(find_link).expanduser().resolve()
+    if not path.is_dir():
+        raise CondaPypiError(f"Wheelhouse {find_link} is not a directory.")
+    return str(path)
 
 
 def find_package(finder: PackageFinder, package: str):
@@ -51,25 +202,232 @@ def find_package(finder: PackageFinder, package: str):
     return finder.find_best_match(requirement)
 
 
-def find_and_fetch(finder: PackageFinder, target: Path, package: str) -> Path:
+def find_wheel_link(finder: PackageFinder, package: str) -> Link:
     """
-    Find package on PyPI, download best link to target.
+    Find package on PyPI; return the best link, which must be a wheel.
     """
-    result = find_package(finder, package)
+    with timing.span("find", [package]):
+        result = find_package(finder, package)
     link = result.best and result.best.link
     if not link:
-        raise CondaPypiError(f"No PyPI link for {package}")
+        raise NoWheelError(f"No PyPI link for {package}")
 
     # Check if the file is a wheel (.whl)
-    filename = link.url_without_fragment.rsplit("/", 1)[-1]
-    if not filename.endswith(".whl"):
-        raise CondaPypiError(
+    if not link.is_wheel:
+        raise NoWheelError(
             f"No wheel file available for {package}. "
             f"Only source distributions are available. "
             f"conda-pypi requires wheel files for conversion."
         )
+    return link
 
-    log.info(f"Fetch {package} as {filename}")
-    target_path = target / filename
-    download(link.url, target_path)
+
+def fetch_wheel(
+    link: Link,
+    target: Path,
+    cache: DownloadCache | None = None,
+    session: httpx.Client | None = None,
+) -> Path:
+    """
+    Download wheel ``link`` to target, through ``cache`` and ``session`` if
+    given, checking the sha256 the index lists for it. The verified digest is
+    recorded for :func:`conda_pypi.utils.recorded_sha256`. Wheels in a local
+    wheelhouse are hard linked, or copied across filesystems, and not cached.
+    """
+    with timing.span("download", [link.filename]) as span:
+        if link.is_file:
+            target_path = target / link.filename
+            target_path.unlink(missing_ok=True)
+            link_or_copy(Path(link.file_path), target_path)
+            if sha256 := DownloadCache.wheel_sha256(link):
+                if sha256_checksum(str(target_path)) != sha256:
+                    raise CondaPypiError(
+                        f"sha256 of {link.url_without_fragment} does not match {sha256}."
+                    )
+                record_sha256(target_path, sha256)
+        elif cache is not None:
+            target_path = cache.fetch_wheel(link, target, session)
+        elif session is not None:
+            target_path = target / link.filename
+            session_download(
+                session, link.url, target_path, sha256=DownloadCache.wheel_sha256(link)
+            )
+        else:
+            target_path = target / link.filename
+            sha256 = DownloadCache.wheel_sha256(link)
+            download(link.url, target_path, sha256=sha256)
+            if sha256:
+                record_sha256(target_path, sha256)
+        span.bytes = target_path.stat().st_size
     return target_path
+
+
+def fetch_metadata(link: Link, session: httpx.Client | None = None) -> str | None:
+    """
+    Download the METADATA of wheel ``link`` that the index serves next to it
+    (PEP 658, PEP 714), through ``session`` if given, or return None if it does
+    not.
+    """
+    metadata_link = link.dist_info_link
+    if not metadata_link:
+        return None
+
+    url = metadata_link.url_without_fragment
+    with timing.span("metadata", [link.filename]) as span:
+        if session is not None:
+            try:
+                response = session.get(url)
+            except httpx.HTTPError as e:
+                raise CondaPypiError(f"Could not download {url}: {e}") from e
+        else:
+            with download_http_errors(url):
+                conda_session = get_session(url)
+                response = conda_session.get(
+                    url,
+                    proxies=conda_session.proxies,
+                    timeout=(
+                        context.remote_connect_timeout_secs,
+                        context.remote_read_timeout_secs,
+                    ),
+                )
+        if response.status_code == 404:
+            # advertised but not served; the wheel has the same METADATA
+            log.debug("Index lists metadata for %s but does not serve it", link.filename)
+            return None
+        if response.status_code >= 400:
+            raise CondaPypiError(f"Could not download {url}: HTTP {response.status_code}")
+        span.bytes = len(response.content)
+
+    if isinstance(link.dist_info_metadata, dict):
+        for hash_name, expected in link.dist_info_metadata.items():
+            if hash_name in hashlib.algorithms_guaranteed:
+                actual = hashlib.new(hash_name, response.content).hexdigest()
+                if actual != expected:
+                    raise CondaPypiError(
+                        f"{hash_name} of {url} is {actual}, but the index lists {expected}."
+                    )
+    return response.content.decode("utf-8")
+
+
+def find_and_fetch(
+    finder: PackageFinder, target: Path, package: str, cache: DownloadCache | None = None
+) -> Path:
+    """
+    Find package on PyPI, download best link to target.
+    """
+    link = find_wheel_link(finder, package)
+    log.info(f"Fetch {package} as {link.filename}")
+    return fetch_wheel(link, target, cache, finder.session)
+
+
+def find_candidate(
+    finder: PackageFinder, target: Path, package: str, cache: DownloadCache | None = None
+) -> WheelCandidate:
+    """
+    Find package on PyPI and get the best wheel's METADATA, downloading only
+    the metadata file when the index serves one.
+
+    The wheel is downloaded to target when it does not.
+    """
+    link = find_wheel_link(finder, package)
+    if (metadata := fetch_metadata(link, finder.session)) is not None:
+        log.info(f"Fetch metadata of {package} from {link.filename}")
+        return WheelCandidate(package, link, metadata)
+
+    log.info(f"Fetch {package} as {link.filename} for its metadata")
+    wheel = fetch_wheel(link, target, cache, finder.session)
+    parsed = parse_wheel_filename(wheel.name)
+    with zipfile.ZipFile(wheel) as wheel_zip:
+        distribution = WheelDistribution(
+            wheel_zip, f"{parsed.distribution}-{parsed.version}.dist-info"
+        )
+        metadata = distribution.read_text("METADATA")
+    if metadata is None:
+        raise CondaPypiError(f"No METADATA in {wheel.name}")
+    return WheelCandidate(package, link, metadata, wheel)
+
+
+def _for_each_package(
+    function: Callable[[str], T],
+    packages: Iterable[str],
+    max_workers: int | None = None,
+) -> dict[str, T]:
+    """
+    Call ``function`` for several packages concurrently on ``max_workers``
+    threads.
+
+    Every package is attempted; failures are raised together as a
+    :class:`FetchError` once the others have finished.
+    """
+    results = {}
+    errors = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(function, package): package for package in packages}
+        for future in as_completed(futures):
+            package = futures[future]
+            try:
+                results[package] = future.result()
+            except CondaError as e:
+                log.debug("Could not fetch %s", package, exc_info=True)
+                errors[package] = e
+    if errors:
+        raise FetchError(dict(sorted(errors.items())), results)
+    return results
+
+
+def find_and_fetch_all(
+    finder: PackageFinder,
+    target: Path,
+    packages: Iterable[str],
+    max_workers: int | None = None,
+    cache: DownloadCache | None = None,
+) -> dict[str, Path]:
+    """
+    Find and download several packages concurrently on ``max_workers`` threads.
+
+    Every package is attempted; failures are raised together as a
+    :class:`FetchError` once the others have finished.
+    """
+    return _for_each_package(
+        lambda package: find_and_fetch(finder, target, package, cache), packages, max_workers
+    )
+
+
+def find_candidates_all(
+    finder: PackageFinder,
+    target: Path,
+    packages: Iterable[str],
+    max_workers: int | None = None,
+    cache: DownloadCache | None = None,
+) -> dict[str, WheelCandidate]:
+    """
+    :func:`find_candidate` for several packages concurrently, like
+    :func:`find_and_fetch_all`.
+    """
+    return _for_each_package(
+        lambda package: find_candidate(finder, target, package, cache), packages, max_workers
+    )
+
+
+def fetch_candidates_all(
+    candidates: Iterable[WheelCandidate],
+    target: Path,
+    max_workers: int | None = None,
+    cache: DownloadCache | None = None,
+    session: httpx.Client | None = None,
+) -> dict[str, Path]:
+    """
+    Download the wheels of ``candidates`` concurrently like
+    :func:`find_and_fetch_all`, except those already downloaded for their
+    metadata. Pass the finder's session to reuse its connections.
+    """
+    candidates = {candidate.package: candidate for candidate in candidates}
+
+    def fetch(package: str) -> Path:
+        candidate = candidates[package]
+        if candidate.wheel:
+            return candidate.wheel
+        log.info(f"Fetch {package} as {candidate.link.filename}")
+        return fetch_wheel(candidate.link, target, cache, session)
+
+    return _for_each_package(fetch, candidates, max_workers)
@@ -2,6 +2,8 @@
 Errors specific to conda pypi.
 """
 
+from __future__ import annotations
+
 from conda.exceptions import CondaError
 
 
@@ -11,3 +13,26 @@ class CondaPypiError(CondaError):
 
 class UnableToConvertToRepodataEntry(CondaPypiError):
     pass
+
+
+class NoWheelError(CondaPypiError):
+    """
+    The index has no wheel for a requirement, only source distributions or
+    nothing at all.
+    """
+
+
+class FetchError(CondaPypiError):
+    """
+    One or more packages could not be fetched from PyPI.
+
+    ``fetched`` holds the packages of the same batch that were downloaded.
+    """
+
+    def __init__(self, errors: dict[str, Exception], fetched: dict | None = None):
+        self.errors = errors
+        self.fetched = fetched or {}
+        details = "\n".join(f"  - {package}: {error}" for package, error in errors.items())
+        # CondaError interpolates its message; nested messages may contain URLs with "%"
+        details = details.replace("%", "%%")
+        super().__init__(f"Could not fetch {len(errors)} package(s) from PyPI:\n{details}")
@@ -2,24 +2,47 @@
 Interface to conda-index.
 """
 
+import json
+import os
+import tempfile
+from collections import defaultdict
+from collections.abc import Iterable
+from pathlib import Path
 from typing import Any
 
-from conda_index.index import ChannelIndex  # noqa: TID253
+from conda_index.index import (  # noqa: TID253
+    REPODATA_FROM_PKGS_JSON_FN,
+    REPODATA_JSON_FN,
+    REPODATA_SHARDS_FN,
+    REPODATA_SHARDS_FROM_PKGS_FN,
+    RUN_EXPORTS_JSON_FN,
+    ChannelIndex,
+)
 from conda_index.index.cache import BaseCondaIndexCache  # noqa: TID253
+from conda_index.index.sqlitecache import CondaIndexCache  # noqa: TID253
 from conda_index.utils import CONDA_PACKAGE_EXTENSIONS  # noqa: TID253
 
 from conda_pypi.exceptions import UnableToConvertToRepodataEntry
 from conda_pypi.pypi_metadata import pypi_to_repodata
 
 
-def create_channel_index(path):
+def create_channel_index(
+    path, threads: int = 1, write_monolithic: bool = True, write_shards: bool = False
+):
+    """
+    ``write_monolithic`` writes ``repodata.json``; ``write_shards`` writes
+    sharded repodata (CEP-16): ``repodata_shards.msgpack.zst``, an index of
+    one shard per package name, which clients fetch only as needed.
+    """
     channel_index = ChannelIndex(
         path,
         None,
         repodata_v3=True,
         save_fs_state=False,
-        threads=1,
+        threads=threads,
         write_current_repodata=False,
+        write_monolithic=write_monolithic,
+        write_shards=write_shards,
         write_zst=True,
         cache_kwargs={
             "package_extensions": CONDA_PACKAGE_EXTENSIONS + (".whl",),
@@ -33,6 +56,279 @@ def update_index(channel_index: ChannelIndex):
     channel_index.index(patch_generator=None)
 
 
+def prune_repodata(subdir_path: Path, monolithic: bool, shards: bool) -> None:
+    """
+    Remove the repodata formats :func:`update_index` did not just write in
+    ``subdir_path``, so clients never read them stale, and shards that the
+    shard index no longer references.
+    """
+    import msgpack
+    import zstandard
+
+    if not monolithic:
+        for name in (REPODATA_JSON_FN, REPODATA_FROM_PKGS_JSON_FN):
+            for suffix in ("", ".zst", ".bz2"):
+                (subdir_path / f"{name}{suffix}").unlink(missing_ok=True)
+
+    referenced = set()
+    for name in (REPODATA_SHARDS_FN, REPODATA_SHARDS_FROM_PKGS_FN):
+        path = subdir_path / name
+        if not shards:
+            path.unlink(missing_ok=True)
+        elif path.exists():
+            with zstandard.ZstdDecompressor().stream_reader(path.open("rb")) as reader:
+                shards_index = msgpack.loads(reader.read())
+            referenced.update(shard_hash.hex() for shard_hash in shards_index["shards"].values())
+
+    # shards are named after the sha256 of their content
+    for shard in subdir_path.glob("*.msgpack.zst"):
+        digest = shard.name.removesuffix(".msgpack.zst")
+        if len(digest) == 64 and digest not in referenced:
+            shard.unlink(missing_ok=True)
+
+
+def update_index_incremental(channel_root: Path, packages: Iterable[Path]) -> None:
+    """
+    Add newly written ``packages`` under ``channel_root/<subdir>/`` to an
+    already indexed channel.
+
+    Unlike :func:`update_index`, this neither lists and stats every package in
+    the channel nor regenerates repodata from the whole conda-index cache. Only
+    ``packages`` are extracted into the cache, and their records are inserted
+    into the existing repodata.json, repodata_from_packages.json and
+    run_exports.json. index.html is left as is, and packages deleted from disk
+    remain in repodata until the next full :func:`update_index`.
+    """
+    channel_root = Path(channel_root)
+    by_subdir = defaultdict(list)
+    for package in packages:
+        by_subdir[Path(package).parent.name].append(Path(package))
+    if not by_subdir:
+        return
+
+    channel_index = ChannelIndex(
+        channel_root,
+        None,
+        subdirs=sorted(by_subdir),
+        threads=1,
+        save_fs_state=False,
+        update_only=True,
+        write_run_exports=True,
+        compact_json=True,
+        write_current_repodata=False,
+    )
+    if not all((channel_root / subdir / "repodata.json").exists() for subdir in by_subdir):
+        channel_index.save_fs_state = True
+        channel_index.update_only = False
+        update_index(channel_index)
+        return
+
+    for subdir, subdir_packages in by_subdir.items():
+        subdir_path = channel_root / subdir
+        with channel_index.cache_for_subdir(subdir) as cache:
+            listdir_stat = []
+            for package in subdir_packages:
+                stat = package.stat()
+                listdir_stat.append(
+                    {
+                        "path": cache.database_path(package.name),
+                        "mtime": stat.st_mtime,
+                        "size": stat.st_size,
+                    }
+                )
+            cache.store_fs_state(listdir_stat)
+            # extracts only packages whose stat differs from the indexed state
+            channel_index.extract_subdir_to_cache(subdir, False, False, str(subdir_path), cache)
+            records = _cached_records(cache, [row["path"] for row in listdir_stat])
+
+        for filename in (REPODATA_FROM_PKGS_JSON_FN, REPODATA_JSON_FN, RUN_EXPORTS_JSON_FN):
+            path = subdir_path / filename
+            if not path.exists():
+                continue
+            data = json.loads(path.read_bytes())
+            for fn, (index_json, run_exports) in records.items():
+                section = "packages.conda" if fn.endswith(".conda") else "packages"
+                if filename == RUN_EXPORTS_JSON_FN:
+                    data.setdefault(section, {})[fn] = {"run_exports": run_exports}
+                else:
+                    data.setdefault(section, {})[fn] = index_json
+            _write_json_atomic(path, channel_index.json_dumps(data))
+
+
+def _cached_records(
+    cache: CondaIndexCache, database_paths: list[str]
+) -> dict[str, tuple[dict, dict]]:
+    """
+    Map package filenames to their ``(index_json, run_exports)`` in the cache.
+    """
+    placeholders = ",".join("?" * len(database_paths))
+    rows = cache.db.execute(
+        f"""
+        SELECT path, index_json, run_exports FROM index_json
+        LEFT JOIN run_exports USING (path)
+        WHERE path IN ({placeholders})
+        """,
+        database_paths,
+    )
+    return {
+        cache.plain_path(path): (json.loads(index_json), json.loads(run_exports or "{}"))
+        for path, index_json, run_exports in rows
+    }
+
+
+def _write_json_atomic(path: Path, text: str) -> None:
+    # a concurrent solve must never read a partially written repodata.json
+    previous_mtime = path.stat().st_mtime
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+            tmp_file.write(text)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    # file:// channels are served with a Last-Modified header of one second
+    # resolution, which repodata caches (e.g. libmamba's .solv files) are
+    # validated against; an update within the same second must still change it.
+    mtime = path.stat().st_mtime
+    if int(mtime) <= int(previous_mtime):
+        os.utime(path, (mtime, int(previous_mtime) + 1))
+
+
+def pypi_to_repodata_entry(pypi_json: dict[str, Any]) -> dict[str, Any]:
+    """Convert a pypi package to the conda repodata entry that
+    :func:`store_repodata_entries` stores, without touching the cache.
+
+    Raises :class:`UnableToConvertToRepodataEntry` if the package has no pure
+    python wheel and ``ValueError`` if its wheel has no sha256 digest.
+    """
+    repodata_entry = pypi_to_repodata(pypi_json)
+    if repodata_entry is None:
+        raise UnableToConvertToRepodataEntry(
+            "Unable to find a pure python wheel and convert it to a repodata entry"
+        )
+    # must contain sha256 and md5 keys but values may be None
+    if not repodata_entry.get("sha256"):
+        raise ValueError(
+            f"PyPI payload for {repodata_entry.get('name')!r} is missing a sha256 digest"
+        )
+    repodata_entry.setdefault("md5", None)
+    return repodata_entry
+
+
+def _repodata_entry_fn(repodata_entry: dict[str, Any]) -> str:
+    return f"{repodata_entry['name']}-{repodata_entry['version']}-py3_none_any_0.whl"
+
+
+def store_repodata_entries(
+    cache: CondaIndexCache, repodata_entries: Iterable[dict[str, Any]], stage: str | None = None
+) -> list[dict[str, Any]]:
+    """Cache converted repodata entries in a single transaction.
+
+    :func:`store_pypi_metadata` commits once per package; this commits once for
+    all of ``repodata_entries``, from :func:`pypi_to_repodata_entry`. Returns
+    their stat entries, to be stored in the 'md' stage. With ``stage``, they
+    are also added to that stage in the same transaction, so that callers
+    storing many batches need not keep them.
+    """
+    stat_entries = []
+    with cache.db:
+        for repodata_entry in repodata_entries:
+            path = cache.database_path(_repodata_entry_fn(repodata_entry))
+            mtime = repodata_entry.get("timestamp", 0)
+            cache.db.execute(
+                "INSERT OR REPLACE INTO index_json (path, index_json) "
+                "VALUES (:path, json(:index_json))",
+                {"path": path, "index_json": json.dumps(repodata_entry)},
+            )
+            cache.store_index_json_stat(path, mtime, repodata_entry["size"], repodata_entry)
+            stat_entries.append({"path": path, "size": repodata_entry["size"], "mtime": mtime})
+        if stage:
+            cache.db.executemany(
+                """
+                INSERT INTO stat (stage, path, mtime, size)
+                VALUES (:stage, :path, :mtime, :size)
+                ON CONFLICT (stage, path) DO UPDATE SET
+                mtime=excluded.mtime, size=excluded.size
+                """,
+                ({"stage": stage, **stat_entry} for stat_entry in stat_entries),
+            )
+    return stat_entries
+
+
+def indexed_wheels(cache: CondaIndexCache) -> dict[str, dict[str, Any]]:
+    """Wheels indexed by a previous ``conda pypi index`` run, by path relative
+    to the channel.
+
+    Each row has the ``size``, ``mtime_ns`` and ``url`` the wheel was indexed
+    with, the ``conda_pypi`` version that indexed it, and either the ``stat``
+    entry of its repodata entry or the ``error`` it failed with. A wheel whose
+    size, mtime and URL are unchanged need not be read again by the same
+    conda-pypi version.
+    """
+    with cache.db:
+        cache.db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS conda_pypi_wheels (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime_ns INTEGER,
+                url TEXT,
+                stat TEXT,
+                error TEXT,
+                conda_pypi TEXT
+            )
+            """
+        )
+        columns = {row[1] for row in cache.db.execute("PRAGMA table_info(conda_pypi_wheels)")}
+        if "conda_pypi" not in columns:
+            # made by an earlier version; its rows never match a version
+            cache.db.execute("ALTER TABLE conda_pypi_wheels ADD COLUMN conda_pypi TEXT")
+    return {
+        path: {
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "url": url,
+            "conda_pypi": conda_pypi,
+            "stat": json.loads(stat) if stat else None,
+            "error": error,
+        }
+        for path, size, mtime_ns, url, conda_pypi, stat, error in cache.db.execute(
+            "SELECT path, size, mtime_ns, url, conda_pypi, stat, error FROM conda_pypi_wheels"
+        )
+    }
+
+
+def store_indexed_wheels(
+    cache: CondaIndexCache, wheels: dict[str, dict[str, Any]], removed: Iterable[str] = ()
+) -> None:
+    """Record ``wheels``, rows like those of :func:`indexed_wheels`, and forget
+    the ``removed`` paths, in one transaction."""
+    with cache.db:
+        cache.db.executemany(
+            "DELETE FROM conda_pypi_wheels WHERE path = ?", ((path,) for path in removed)
+        )
+        cache.db.executemany(
+            """
+            INSERT OR REPLACE INTO conda_pypi_wheels
+            (path, size, mtime_ns, url, conda_pypi, stat, error)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                (
+                    path,
+                    row["size"],
+                    row["mtime_ns"],
+                    row["url"],
+                    row["conda_pypi"],
+                    json.dumps(row["stat"]) if row["stat"] else None,
+                    row["error"],
+                )
+                for path, row in wheels.items()
+            ),
+        )
+
+
 def store_pypi_metadata(
     cache: BaseCondaIndexCache, pypi_json: dict[str, Any]
 ) -> dict[str, Any] | None:
@@ -54,12 +350,8 @@ def store_pypi_metadata(
         store_pypi_metadata(cache, pypi_data.json())
     ```
     """
-    repodata_entry = pypi_to_repodata(pypi_json)
-    if repodata_entry is None:
-        raise UnableToConvertToRepodataEntry(
-            "Unable to find a pure python wheel and convert it to a repodata entry"
-        )
-    path = f"{repodata_entry['name']}-{repodata_entry['version']}-py3_none_any_0.whl"
+    repodata_entry = pypi_to_repodata_entry(pypi_json)
+    path = _repodata_entry_fn(repodata_entry)
 
     stat_entry = {
         "path": cache.database_path(path),
@@ -67,13 +359,6 @@ def store_pypi_metadata(
         "mtime": repodata_entry.get("timestamp", 0),
     }
 
-    # must contain sha256 and md5 keys but values may be None
-    if not repodata_entry.get("sha256"):
-        raise ValueError(
-            f"PyPI payload for {repodata_entry.get('name')!r} is missing a sha256 digest"
-        )
-    repodata_entry.setdefault("md5", None)
-
     cache.store(
         fn=path,
         size=repodata_entry["size"],
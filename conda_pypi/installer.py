@@ -5,10 +5,14 @@ Install a wheel / install a conda.
 from __future__ import annotations
 
 import base64
+import contextlib
+import hashlib
+import io
 import logging
 import os
 import tarfile
 import tempfile
+import zipfile
 from collections.abc import Iterable
 from pathlib import Path
 from typing import BinaryIO
@@ -28,6 +32,23 @@ from conda_pypi.conda_build_utils import PathType
 log = logging.getLogger(__name__)
 
 
+class _HashingReader:
+    """
+    Hash and count bytes as ``tarfile`` reads them from a wheel member stream.
+    """
+
+    def __init__(self, stream: BinaryIO, hash_algorithm: str):
+        self.stream = stream
+        self.hash = hashlib.new(hash_algorithm)
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        self.hash.update(data)
+        self.size += len(data)
+        return data
+
+
 class _CondaWheelDestination(SchemeDictionaryDestination):
     """Suppress entry-point script generation.
 
@@ -38,11 +59,23 @@ class _CondaWheelDestination(SchemeDictionaryDestination):
 
     conda_builder: tarfile.TarFile
 
-    def __init__(self, *args, conda_builder: tarfile.TarFile, **kwargs):
+    def __init__(
+        self,
+        *args,
+        conda_builder: tarfile.TarFile,
+        member_sizes: dict[str, int] | None = None,
+        spool_max_size: int = 0,
+        **kwargs,
+    ):
         super().__init__(*args, **kwargs)
         self.conda_builder = conda_builder
         self.package_paths: list[dict] = []
         self._members: set[str] = set()
+        # uncompressed sizes from the wheel's zip central directory, by member name
+        self.member_sizes = member_sizes or {}
+        # members buffered before archiving roll over to disk past this size;
+        # 0 keeps them in memory
+        self.spool_max_size = spool_max_size
 
     def write_script(self, name, module, attr, section):
         log.debug(f"Skipping script generation for {name} (handled via link.json)")
@@ -67,7 +100,11 @@ class _CondaWheelDestination(SchemeDictionaryDestination):
         tar_info = tarfile.TarInfo(name=archive_path)
         tar_info.mode = 0o775 if is_executable else 0o664
 
-        with tempfile.SpooledTemporaryFile() as buffer:
+        size = self._stream_size(stream)
+        if size is not None and archive_path not in self._members:
+            return self._stream_to_tar(tar_info, path, stream, size)
+
+        with tempfile.SpooledTemporaryFile(max_size=self.spool_max_size) as buffer:
             hash_, size = copyfileobj_with_hashing(stream, buffer, self.hash_algorithm)
 
             # hash_ is urlsafe-b64encode without padding. self.hash_algorithm is
@@ -100,6 +137,38 @@ class _CondaWheelDestination(SchemeDictionaryDestination):
             # add only happens here
             self.conda_builder.addfile(tar_info, buffer)
 
+        return self._record(archive_path, path, hash_hex, size)
+
+    def _stream_size(self, stream: BinaryIO) -> int | None:
+        """
+        Bytes left in ``stream`` if known without reading it, else None.
+        """
+        if isinstance(stream, io.BytesIO):
+            # RECORD and additional metadata generated by installer
+            return stream.getbuffer().nbytes - stream.tell()
+        # installer streams wheel members as ZipExtFile, named after the member
+        return self.member_sizes.get(getattr(stream, "name", None))
+
+    def _stream_to_tar(
+        self,
+        tar_info: tarfile.TarInfo,
+        path: str,
+        stream: BinaryIO,
+        size: int,
+    ) -> RecordEntry:
+        """
+        Copy a wheel member of known size straight into the archive, hashing as
+        it is written instead of buffering it first.
+        """
+        reader = _HashingReader(stream, self.hash_algorithm)
+        tar_info.size = size
+        self.conda_builder.addfile(tar_info, reader)
+        if reader.size != size or stream.read(1):
+            raise ValueError(f"Size of {tar_info.name} does not match the wheel's zip directory")
+        self._members.add(tar_info.name)
+        return self._record(tar_info.name, path, reader.hash.hexdigest(), size)
+
+    def _record(self, archive_path: str, path: str, hash_hex: str, size: int) -> RecordEntry:
         self.package_paths.append(
             {
                 "_path": archive_path,
@@ -108,7 +177,8 @@ class _CondaWheelDestination(SchemeDictionaryDestination):
                 "size_in_bytes": size,
             }
         )
-
+        # RECORD style urlsafe-b64encode without padding
+        hash_ = base64.urlsafe_b64encode(bytes.fromhex(hash_hex)).decode("ascii").rstrip("=")
         return RecordEntry(path, Hash(self.hash_algorithm, hash_), size)
 
     def finalize_installation(
@@ -141,7 +211,16 @@ def install_installer_to_tar(
     python_executable: str,
     whl: Path,
     tar: tarfile.TarFile,
+    archive: zipfile.ZipFile | None = None,
+    spool_max_size: int = 0,
 ) -> list[dict]:
+    """
+    Install wheel ``whl`` into ``tar``, returning paths.json entries.
+
+    Pass an already open ``archive`` of ``whl`` to avoid opening it again.
+    Members that must be buffered are spooled to disk past ``spool_max_size``
+    bytes.
+    """
     scheme = {
         "purelib": "site-packages",
         "platlib": "site-packages",
@@ -150,15 +229,17 @@ def install_installer_to_tar(
         "headers": "include",
     }
 
-    destination = _CondaWheelDestination(
-        scheme_dict=scheme,
-        interpreter=str(python_executable),
-        script_kind="posix",
-        overwrite_existing=True,
-        conda_builder=tar,
-    )
-
-    with WheelFile.open(whl) as source:
+    with contextlib.nullcontext(archive) if archive else zipfile.ZipFile(whl) as wheel_zip:
+        destination = _CondaWheelDestination(
+            scheme_dict=scheme,
+            interpreter=str(python_executable),
+            script_kind="posix",
+            overwrite_existing=True,
+            conda_builder=tar,
+            member_sizes={info.filename: info.file_size for info in wheel_zip.infolist()},
+            spool_max_size=spool_max_size,
+        )
+        source = WheelFile(wheel_zip)
         install(
             source=source,
             destination=destination,
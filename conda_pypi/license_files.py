@@ -9,8 +9,10 @@ from __future__ import annotations
 
 import logging
 import shutil
+import zipfile
+from collections.abc import Iterator
 from importlib.metadata import PackageMetadata
-from pathlib import Path
+from pathlib import Path, PurePath, PurePosixPath
 
 from conda_pypi.translate import FileDistribution
 
@@ -25,7 +27,7 @@ def package_metadata_from_metadata_body(body: str) -> PackageMetadata:
     return FileDistribution(body).metadata
 
 
-def _license_file_lookup_paths(dist_info_resolved: Path, listed_path: Path) -> list[Path]:
+def _license_file_lookup_paths(dist_info_resolved: PurePath, listed_path: PurePath) -> list:
     """
     Candidate paths for one ``License-File`` value (under this ``.dist-info`` only).
 
@@ -40,6 +42,21 @@ def _license_file_lookup_paths(dist_info_resolved: Path, listed_path: Path) -> l
     ]
 
 
+def _listed_license_paths(metadata: PackageMetadata) -> Iterator[tuple[str, Path]]:
+    """
+    ``License-File`` values from METADATA, rejecting paths that could escape
+    the ``.dist-info`` folder.
+    """
+    for raw_line in metadata.get_all("License-File") or []:
+        entry = raw_line.strip()
+        if not entry:
+            continue
+        listed_path = Path(entry)
+        if listed_path.is_absolute() or ".." in listed_path.parts:
+            raise ValueError(f"License-File {str(listed_path)!r} contains unsafe path segments")
+        yield entry, listed_path
+
+
 def copy_into_info_licenses(
     dist_info_dir: Path,
     info_dir: Path,
@@ -55,13 +72,7 @@ def copy_into_info_licenses(
     dist_resolved = dist_info_dir.resolve()
     resolved: list[tuple[Path, Path]] = []  # (source_path, listed_path)
     seen: set[Path] = set()
-    for raw_line in metadata.get_all("License-File") or []:
-        entry = raw_line.strip()
-        if not entry:
-            continue
-        listed_path = Path(entry)
-        if listed_path.is_absolute() or ".." in listed_path.parts:
-            raise ValueError(f"License-File {str(listed_path)!r} contains unsafe path segments")
+    for entry, listed_path in _listed_license_paths(metadata):
         for candidate in _license_file_lookup_paths(dist_resolved, listed_path):
             if not candidate.is_file():
                 continue
@@ -92,3 +103,37 @@ def copy_into_info_licenses(
         rel_paths.append(f"info/licenses/{listed_path.as_posix()}")
 
     return rel_paths
+
+
+def read_wheel_licenses(
+    archive: zipfile.ZipFile,
+    dist_info_name: str,
+    metadata: PackageMetadata,
+) -> dict[str, bytes]:
+    """
+    Read ``License-File`` payloads straight from a wheel archive, using the same
+    lookup as :func:`copy_into_info_licenses`.
+
+    Returns ``{"info/licenses/...": payload}``, or an empty dict if nothing
+    resolved.
+    """
+    names = set(archive.namelist())
+    licenses: dict[str, bytes] = {}
+    seen: set[str] = set()
+    for entry, listed_path in _listed_license_paths(metadata):
+        posix_path = PurePosixPath(listed_path.as_posix())
+        for candidate in _license_file_lookup_paths(PurePosixPath(dist_info_name), posix_path):
+            member = candidate.as_posix()
+            if member not in names:
+                continue
+            if member not in seen:
+                seen.add(member)
+                licenses[f"info/licenses/{listed_path.as_posix()}"] = archive.read(member)
+                break
+        else:
+            log.warning(
+                "License-File %r declared in metadata but not found under %s",
+                entry,
+                dist_info_name,
+            )
+    return licenses
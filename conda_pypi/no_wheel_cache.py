@@ -0,0 +1,95 @@
+"""
+Cache of requirements that have no usable wheel on an index, so installs that
+need them fail without asking the index again.
+
+Entries are stored in the conda-pypi repository as ``<repo>/.no-wheel/<key>.json``,
+keyed on the requirement, the target Python and the index URLs, and expire
+``ttl`` seconds after they were written.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from unearth import PackageFinder
+
+log = logging.getLogger(__name__)
+
+DEFAULT_TTL = 24 * 60 * 60
+
+
+class NoWheelCache:
+    """
+    Requirements found without a wheel, with the error that was raised.
+    """
+
+    def __init__(self, path: Path | str, ttl: int = DEFAULT_TTL):
+        self.path = Path(path)
+        self.ttl = ttl
+
+    @classmethod
+    def from_context(cls, repo: Path) -> NoWheelCache | None:
+        """
+        Cache in ``repo`` with the TTL of the ``conda_pypi_no_wheel_cache_ttl``
+        setting, or None if it is set to 0.
+        """
+        from conda.base.context import context
+
+        ttl = int(context.plugins.conda_pypi_no_wheel_cache_ttl)
+        if ttl <= 0:
+            return None
+        return cls(repo / ".no-wheel", ttl)
+
+    @staticmethod
+    def key(requirement: str, finder: PackageFinder) -> str:
+        target_python = finder.target_python
+        key_data = {
+            "requirement": str(requirement),
+            "python": {
+                "py_ver": target_python.py_ver,
+                "impl": target_python.impl,
+                "abis": target_python.abis,
+                "platforms": target_python.platforms,
+            },
+            "sources": finder.sources,
+        }
+        return hashlib.sha256(json.dumps(key_data, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """
+        Return the error recorded for ``key``, unless it has expired.
+        """
+        path = self.path / f"{key}.json"
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+        if time.time() - entry["time"] > self.ttl:
+            path.unlink(missing_ok=True)
+            return None
+        log.debug("No wheel for %s, cached at %s", entry["requirement"], path)
+        return entry["error"]
+
+    def put(self, key: str, requirement: str, error: str) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        entry = {"requirement": str(requirement), "error": error, "time": time.time()}
+        fd, tmp_name = tempfile.mkstemp(dir=self.path, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as entry_file:
+                json.dump(entry, entry_file)
+            os.replace(tmp_name, self.path / f"{key}.json")
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    def clear(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
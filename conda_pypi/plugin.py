@@ -61,10 +61,75 @@ def conda_health_checks():
 
 @hookimpl
 def conda_settings():
-    from conda.common.configuration import PrimitiveParameter
+    from conda.common.configuration import PrimitiveParameter, SequenceParameter
+
+    from conda_pypi.conversion_cache import DEFAULT_MAX_SIZE
+    from conda_pypi.no_wheel_cache import DEFAULT_TTL
 
     yield CondaSetting(
         name="conda_pypi_pip_warning",
         description="Enable or disable the conda-pypi beta tip shown when pip is present",
         parameter=PrimitiveParameter(True),
     )
+    yield CondaSetting(
+        name="conda_pypi_conversion_cache_max_size",
+        description="Size cap for the cache of converted wheels, e.g. 500M or 2G; 0 disables it",
+        parameter=PrimitiveParameter(DEFAULT_MAX_SIZE),
+    )
+    yield CondaSetting(
+        name="conda_pypi_download_cache_max_size",
+        description="Size cap for the cache of wheels and index pages downloaded from PyPI, "
+        "e.g. 500M or 2G; 0 disables it",
+        parameter=PrimitiveParameter(DEFAULT_MAX_SIZE),
+    )
+    yield CondaSetting(
+        name="conda_pypi_find_links",
+        description="Local wheelhouse directories searched for wheels before the PyPI index; "
+        "with offline, the only places searched",
+        parameter=SequenceParameter(PrimitiveParameter("", element_type=str)),
+    )
+    yield CondaSetting(
+        name="conda_pypi_http_pool_size",
+        description="Connections to PyPI kept open and reused by index lookups and downloads",
+        parameter=PrimitiveParameter(10),
+    )
+    yield CondaSetting(
+        name="conda_pypi_http_retries",
+        description="Times a failed connection to PyPI is retried",
+        parameter=PrimitiveParameter(3),
+    )
+    yield CondaSetting(
+        name="conda_pypi_no_wheel_cache_ttl",
+        description="Seconds for which a requirement found without a wheel on PyPI fails "
+        "without asking the index again; 0 disables it",
+        parameter=PrimitiveParameter(DEFAULT_TTL),
+    )
+    yield CondaSetting(
+        name="conda_pypi_timing_report",
+        description="File that conda pypi install appends timing spans to as JSON lines; "
+        "empty disables the report",
+        parameter=PrimitiveParameter(""),
+    )
+    yield CondaSetting(
+        name="conda_pypi_compression_level",
+        description="zstd level (up to 22) for packages converted into the local conda-pypi "
+        "repository; lower is faster, higher is smaller",
+        parameter=PrimitiveParameter(3),
+    )
+    yield CondaSetting(
+        name="conda_pypi_compression_threads",
+        description="zstd worker threads used to compress converted packages; -1 uses one per CPU",
+        parameter=PrimitiveParameter(1),
+    )
+    yield CondaSetting(
+        name="conda_pypi_conversion_max_memory",
+        description="Approximate memory ceiling for converting one wheel, e.g. 256M; larger "
+        "packages are buffered in temporary files. 0 keeps whole packages in memory",
+        parameter=PrimitiveParameter("0"),
+    )
+    yield CondaSetting(
+        name="conda_pypi_conversion_jobs",
+        description="Number of processes conda pypi install uses to convert wheels; "
+        "0 uses one per CPU",
+        parameter=PrimitiveParameter(0),
+    )
@@ -2,6 +2,7 @@
 Conversion from PyPI metadata to repodata.json v3.whl entries.
 """
 
+import functools
 import logging
 import sys
 from datetime import datetime, timezone
@@ -41,6 +42,27 @@ def python_depend_from_requires_python(
     return f"python {requires_python}"
 
 
+@functools.lru_cache(maxsize=65536)
+def _parse_requires_dist(requires_dist: str) -> tuple[str, str, str | None, tuple[str, ...]]:
+    """Split a Requires-Dist entry into its name, the specifier and extras
+    suffix of its conda dependency, its non-extra marker condition and the
+    extras it belongs to.
+
+    Parsing dominates :func:`pypi_to_repodata`, and the releases of a project
+    mostly repeat the same entries, so results are kept in a bounded cache.
+    """
+    req = Requirement(requires_dist)
+    non_extra_condition, extra_names = (
+        extract_marker_condition_and_extras(req.marker) if req.marker else (None, [])
+    )
+    return (
+        req.name,
+        str(req.specifier) + dependency_extras_suffix(req.extras),
+        non_extra_condition,
+        tuple(extra_names),
+    )
+
+
 def pypi_to_repodata(
     pypi_data: dict[str, Any],
     pypi_to_conda_name_mapping: dict | None = None,
@@ -71,15 +93,11 @@ def pypi_to_repodata(
     depends_list: list[str] = []
     extra_depends_dict: dict[str, list[str]] = {}
     for dep in pypi_info.get("requires_dist") or []:
-        req = Requirement(dep)
-        req.name = pypi_to_conda_name(req.name, pypi_to_conda_name_mapping)
+        name, spec, non_extra_condition, extra_names = _parse_requires_dist(dep)
         # Use CEP 44 MatchSpec spelling (including optional dependency extras). Rattler-safe
         # normalization applies only to wheel → .conda :func:`conda_pypi.translate.requires_to_conda`.
-        conda_dep = req.name + str(req.specifier) + dependency_extras_suffix(req.extras)
+        conda_dep = pypi_to_conda_name(name, pypi_to_conda_name_mapping) + spec
 
-        non_extra_condition, extra_names = (
-            extract_marker_condition_and_extras(req.marker) if req.marker else (None, [])
-        )
         full_dep = dependency_when(conda_dep, non_extra_condition)
 
         if extra_names:
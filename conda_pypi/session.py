@@ -0,0 +1,217 @@
+"""
+One pooled HTTP client for the index pages, metadata files and wheels fetched
+from PyPI, so a large install reuses a few keep-alive connections per host
+instead of opening a TLS connection per request.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import itertools
+import logging
+import os
+import ssl
+import tempfile
+import urllib.request
+from collections.abc import Iterable
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import httpx
+from unearth.auth import MultiDomainBasicAuth  # noqa: TID253
+from unearth.fetchers import PyPIClient  # noqa: TID253
+
+from conda_pypi.exceptions import CondaPypiError
+from conda_pypi.utils import record_sha256
+
+if TYPE_CHECKING:
+    from conda_pypi.download_cache import DownloadCache
+
+log = logging.getLogger(__name__)
+
+
+def new_session(
+    index_urls: Iterable[str] = (),
+    cache: DownloadCache | None = None,
+    pool_size: int | None = None,
+    retries: int | None = None,
+) -> PyPIClient:
+    """
+    Client for :class:`unearth.PackageFinder` and :func:`download` that keeps
+    up to ``pool_size`` connections alive and retries failed connections
+    ``retries`` times; both default to the ``conda_pypi_http_pool_size`` and
+    ``conda_pypi_http_retries`` settings.
+
+    Credentials for ``index_urls`` are looked up like unearth does. With a
+    ``cache``, index pages are stored in it and revalidated. TLS verification,
+    the client certificate and proxies follow conda's ``ssl_verify``,
+    ``client_ssl_cert``, ``client_ssl_cert_key`` and ``proxy_servers`` settings,
+    as for conda's own downloads.
+
+    The caller closes the session; :class:`~conda_pypi.convert_tree.ConvertTree`
+    closes its finder's session in :meth:`~conda_pypi.convert_tree.ConvertTree.close`.
+    """
+    from conda.base.context import context
+
+    if pool_size is None:
+        pool_size = context.plugins.conda_pypi_http_pool_size
+    if retries is None:
+        retries = context.plugins.conda_pypi_http_retries
+    limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+    verify = _ssl_context(context.ssl_verify, context.client_ssl_cert, context.client_ssl_cert_key)
+    transport_kwargs = {"limits": limits, "retries": retries, "verify": verify}
+    kwargs = {
+        "limits": limits,
+        "verify": verify,
+        "transport": httpx.HTTPTransport(**transport_kwargs),
+        # httpx only reads proxies from the environment without a transport
+        "mounts": _proxy_mounts(context.proxy_servers, transport_kwargs),
+        "timeout": httpx.Timeout(
+            context.remote_read_timeout_secs, connect=context.remote_connect_timeout_secs
+        ),
+    }
+    session = cache.client(**kwargs) if cache is not None else PyPIClient(**kwargs)
+    session.auth = MultiDomainBasicAuth(index_urls=list(index_urls))
+    return session
+
+
+def _ssl_context(
+    ssl_verify: bool | str,
+    client_cert: str | None = None,
+    client_cert_key: str | None = None,
+) -> ssl.SSLContext | bool:
+    """
+    ``verify`` argument for httpx from conda's ``ssl_verify`` setting: a bool,
+    a CA bundle file or directory, or ``truststore`` for the system store.
+    """
+    if ssl_verify is False or ssl_verify == "false":
+        return False
+    if ssl_verify == "truststore":
+        import truststore
+
+        ssl_context = truststore.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    elif isinstance(ssl_verify, str) and os.path.isdir(ssl_verify):
+        ssl_context = ssl.create_default_context(capath=ssl_verify)
+    elif isinstance(ssl_verify, str) and ssl_verify != "true":
+        ssl_context = ssl.create_default_context(cafile=ssl_verify)
+    else:
+        import certifi
+
+        ssl_context = ssl.create_default_context(cafile=certifi.where())
+    if client_cert:
+        ssl_context.load_cert_chain(client_cert, client_cert_key)
+    return ssl_context
+
+
+def _proxy_mounts(
+    proxy_servers: dict[str, str] | None, transport_kwargs: dict
+) -> dict[str, httpx.HTTPTransport | None]:
+    """
+    httpx mounts for the proxies in the environment and conda's
+    ``proxy_servers``, which take precedence. Keys are requests-style schemes,
+    e.g. ``https``, or ``scheme://host``. Hosts in ``no_proxy`` are mounted to
+    None, the session's own transport.
+    """
+    proxies = urllib.request.getproxies()
+    no_proxy = proxies.pop("no", "")
+    proxies = {key: url for key, url in proxies.items() if key in ("http", "https", "all")}
+    proxies.update(proxy_servers or {})
+    mounts = {}
+    for key, url in proxies.items():
+        if url:
+            pattern = key if "://" in key else f"{key}://"
+            mounts[pattern] = httpx.HTTPTransport(proxy=url, **transport_kwargs)
+    if mounts:
+        for host in no_proxy.split(","):
+            host = host.strip().lstrip(".")
+            if host == "*":
+                return {}
+            if host:
+                mounts[f"all://*{host}"] = None
+    return mounts
+
+
+def download(
+    session: httpx.Client,
+    url: str,
+    path: Path,
+    sha256: str | None = None,
+    retries: int | None = None,
+) -> str:
+    """
+    Stream ``url`` to ``path`` through ``session``, hashing it as it arrives,
+    and return its sha256 after checking it against ``sha256`` if given. The
+    digest is recorded beside ``path`` with :func:`record_sha256`.
+
+    A transfer that breaks off is resumed with a ``Range`` request, up to
+    ``retries`` times (default ``conda_pypi_http_retries``); if the server
+    ignores the range or the file changed, it starts over. The file is written
+    beside ``path`` and renamed into place.
+    """
+    if retries is None:
+        from conda.base.context import context
+
+        retries = context.plugins.conda_pypi_http_retries
+    digest = hashlib.sha256()
+    # ETag or Last-Modified of the file, for If-Range
+    validator = None
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as download_file:
+            for attempt in itertools.count():
+                offset = download_file.tell()
+                headers = {}
+                if offset:
+                    headers["Range"] = f"bytes={offset}-"
+                    if validator:
+                        headers["If-Range"] = validator
+                try:
+                    with session.stream("GET", url, headers=headers) as response:
+                        response.raise_for_status()
+                        if response.status_code == 206:
+                            content_range = response.headers.get("Content-Range", "")
+                            if not content_range.startswith(f"bytes {offset}-"):
+                                raise CondaPypiError(
+                                    f"Could not resume {url}: "
+                                    f"asked for byte {offset}, got {content_range!r}"
+                                )
+                        else:
+                            if offset:
+                                log.debug("%s did not resume %s, starting over", url, path.name)
+                                download_file.seek(0)
+                                download_file.truncate()
+                                digest = hashlib.sha256()
+                            validator = _range_validator(response)
+                        for chunk in response.iter_bytes():
+                            download_file.write(chunk)
+                            digest.update(chunk)
+                    break
+                except httpx.TransportError as e:
+                    if attempt >= retries:
+                        raise CondaPypiError(f"Could not download {url}: {e}") from e
+                    log.debug(
+                        "Download of %s broke off at byte %d: %s",
+                        url,
+                        download_file.tell(),
+                        e,
+                    )
+                except httpx.HTTPError as e:
+                    raise CondaPypiError(f"Could not download {url}: {e}") from e
+        if sha256 and digest.hexdigest() != sha256:
+            raise CondaPypiError(
+                f"sha256 of {url} is {digest.hexdigest()}, but the index lists {sha256}."
+            )
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    record_sha256(path, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def _range_validator(response: httpx.Response) -> str | None:
+    # If-Range needs a strong ETag
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return response.headers.get("Last-Modified")
@@ -0,0 +1,140 @@
+"""
+Spans timing the phases of converting a dependency tree: solves, PyPI
+lookups, downloads, conversions and index updates.
+
+Spans are recorded by the :class:`Timings` that is active, if any, so the
+code being timed needs no extra arguments. A report is written as JSON lines,
+one span per line, and can be summarized as a table per phase.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+_active: Timings | None = None
+
+
+@dataclass
+class Span:
+    name: str
+    packages: list[str] = field(default_factory=list)
+    # wall clock time the span started, seconds since the epoch
+    start: float = 0.0
+    seconds: float = 0.0
+    bytes: int = 0
+
+
+class Timings:
+    """
+    Collects spans in memory and appends each one to ``path`` as a JSON line
+    when it ends. Safe to use from several threads.
+    """
+
+    def __init__(self, path: Path | str | None = None):
+        self.path = Path(path) if path else None
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_context(cls) -> Timings | None:
+        """
+        Timings reported to the ``conda_pypi_timing_report`` setting, or None
+        if it is not set.
+        """
+        from conda.base.context import context
+
+        path = context.plugins.conda_pypi_timing_report
+        return cls(path) if path else None
+
+    @contextmanager
+    def activate(self) -> Iterator[Timings]:
+        """
+        Record the spans of :func:`span` and :func:`record` here.
+        """
+        global _active
+        previous, _active = _active, self
+        try:
+            yield self
+        finally:
+            _active = previous
+
+    def record(self, span: Span) -> None:
+        # e.g. MatchSpec, for the report
+        span.packages = [str(package) for package in span.packages]
+        with self._lock:
+            self.spans.append(span)
+            if self.path:
+                with self.path.open("a", encoding="utf-8") as report:
+                    report.write(json.dumps(asdict(span)) + "\n")
+
+    def summary(self) -> str:
+        return summary_table(self.spans)
+
+
+@contextmanager
+def span(name: str, packages: Iterable[str] = ()) -> Iterator[Span]:
+    """
+    Time the body as a span called ``name``. The body may add packages and
+    bytes to the yielded span.
+    """
+    current = Span(name, list(packages), start=time.time())
+    started = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.seconds = time.perf_counter() - started
+        if _active is not None:
+            _active.record(current)
+
+
+def record(name: str, seconds: float, packages: Iterable[str] = (), bytes: int = 0) -> None:
+    """
+    Record a span timed elsewhere, e.g. in a worker process, that ended now.
+    """
+    if _active is not None:
+        _active.record(Span(name, list(packages), time.time() - seconds, seconds, bytes))
+
+
+def load(path: Path | str) -> list[Span]:
+    """
+    Read the spans of a JSON lines report.
+    """
+    with open(path, encoding="utf-8") as report:
+        return [Span(**json.loads(line)) for line in report if line.strip()]
+
+
+def summary_table(spans: Iterable[Span]) -> str:
+    """
+    One row per phase, in the order phases first appear, with span count,
+    total and slowest seconds, bytes and number of packages.
+    """
+    phases: dict[str, list[Span]] = {}
+    for each in spans:
+        phases.setdefault(each.name, []).append(each)
+
+    rows = [("phase", "count", "total s", "max s", "bytes", "packages")]
+    for name, phase_spans in phases.items():
+        rows.append(
+            (
+                name,
+                str(len(phase_spans)),
+                f"{sum(each.seconds for each in phase_spans):.3f}",
+                f"{max(each.seconds for each in phase_spans):.3f}",
+                str(sum(each.bytes for each in phase_spans)),
+                str(len({package for each in phase_spans for package in each.packages})),
+            )
+        )
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+    return "\n".join(
+        "  ".join(
+            cell.ljust(width) if column == 0 else cell.rjust(width)
+            for column, (cell, width) in enumerate(zip(row, widths))
+        )
+        for row in rows
+    )
@@ -7,9 +7,10 @@ import logging
 import re
 import sys
 import time
+import zipfile
 from collections.abc import Callable, Iterable
 from importlib.metadata import Distribution, PackageMetadata, PathDistribution
-from pathlib import Path
+from pathlib import Path, PurePosixPath
 from typing import Any
 
 from conda.exceptions import ArgumentError
@@ -92,6 +93,30 @@ class FileDistribution(Distribution):
         return
 
 
+class WheelDistribution(Distribution):
+    """
+    A ``*.dist-info`` folder read straight from an open wheel archive, without
+    extracting it to disk.
+    """
+
+    def __init__(self, archive: zipfile.ZipFile, dist_info_name: str):
+        self.archive = archive
+        self.dist_info_name = dist_info_name
+
+    def read_text(self, filename: str) -> str | None:
+        try:
+            return self.archive.read(f"{self.dist_info_name}/{filename}").decode("utf-8")
+        except KeyError:
+            return None
+
+    def locate_file(self, path):
+        """
+        Given a path to a file in this distribution, return its name in the
+        wheel archive.
+        """
+        return PurePosixPath(path)
+
+
 @dataclasses.dataclass
 class PackageRecord:
     # what goes in info/index.json
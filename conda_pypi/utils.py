@@ -2,9 +2,12 @@ from __future__ import annotations
 
 import base64
 import hashlib
+import json
 import os
+import shutil
 import sys
 from collections.abc import Iterator
+from contextlib import contextmanager
 from logging import getLogger
 from pathlib import Path
 
@@ -39,6 +42,111 @@ def sha256_base64url_to_hex(value: str | None) -> str | None:
         return None
 
 
+def link_or_copy(source: os.PathLike, target: os.PathLike) -> None:
+    """
+    Hard link ``source`` to ``target``, or copy it where hard links are not
+    possible, e.g. across filesystems. A missing ``source`` raises
+    :class:`FileNotFoundError`.
+    """
+    try:
+        os.link(source, target)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+def _sha256_sidecar(path: os.PathLike) -> Path:
+    path = Path(path)
+    return path.with_name(f".{path.name}.sha256")
+
+
+def record_sha256(path: os.PathLike, sha256: str) -> None:
+    """
+    Remember the verified ``sha256`` of file ``path`` in a hidden file beside
+    it, so :func:`recorded_sha256` can return it instead of hashing the file
+    again. The record is tied to the file's size, modification time, device
+    and inode, which hard links share.
+    """
+    entry = {"sha256": sha256, **_stat_key(os.stat(path))}
+    _sha256_sidecar(path).write_text(json.dumps(entry), encoding="utf-8")
+
+
+def recorded_sha256(path: os.PathLike) -> str | None:
+    """
+    The sha256 recorded for ``path`` by :func:`record_sha256`, or None if there
+    is none or the file was replaced since.
+    """
+    try:
+        entry = json.loads(_sha256_sidecar(path).read_text(encoding="utf-8"))
+        stat = os.stat(path)
+    except (FileNotFoundError, ValueError):
+        return None
+    if any(entry.get(name) != value for name, value in _stat_key(stat).items()):
+        return None
+    return entry.get("sha256")
+
+
+def _stat_key(stat: os.stat_result) -> dict[str, int]:
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "device": stat.st_dev,
+        "inode": stat.st_ino,
+    }
+
+
+SIZE_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+def parse_size(value: int | str) -> int:
+    """Parse a byte count such as ``1048576``, ``500M`` or ``2G`` (binary units)."""
+    if isinstance(value, int):
+        return value
+    text = value.strip().upper().removesuffix("B").removesuffix("I")
+    number, unit = (text[:-1], text[-1]) if text.endswith(("K", "M", "G", "T")) else (text, "")
+    try:
+        return int(float(number) * SIZE_UNITS[unit])
+    except ValueError:
+        raise ValueError(f"Invalid size: {value!r}") from None
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """
+    Hold an exclusive lock on ``path``, created if needed, waiting as long as
+    another process or thread holds it. Not reentrant.
+    """
+    if context.no_lock:
+        yield
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as lock_file:
+        if sys.platform == "win32":
+            import msvcrt
+
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK gives up after 10 seconds
+                    continue
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
 def get_prefix(prefix: os.PathLike | None = None, name: str | None = None) -> Path:
     if prefix:
         return Path(prefix)
@@ -0,0 +1,73 @@
+"""
+Tests for the `conda pypi cache` subcommand.
+"""
+
+from argparse import Namespace
+from pathlib import Path
+
+import pytest
+
+from conda_pypi import conversion_cache, download_cache
+from conda_pypi.cli.cache import execute
+
+
+@pytest.fixture
+def cache_dir(tmp_path: Path, monkeypatch) -> Path:
+    path = tmp_path / "cache"
+    monkeypatch.setattr(conversion_cache, "default_cache_dir", lambda: path)
+    for name in ("a", "b"):
+        package = tmp_path / f"{name}-1.0-pypi_0.conda"
+        package.write_bytes(b"x" * 1024)
+        conversion_cache.ConversionCache(path).put(f"key-{name}", package)
+    return path
+
+
+def test_cli(conda_cli):
+    """
+    Test that cache subcommand exists.
+    """
+    out, _err, rc = conda_cli("pypi", "cache", "--help", raises=SystemExit)
+    assert rc.value.code == 0
+    assert "--prune" in out
+
+
+def test_execute_lists_entries(cache_dir: Path, capsys):
+    args = Namespace(downloads=False, list=True, prune=False, clear=False, max_size=None)
+    assert execute(args) == 0
+
+    out = capsys.readouterr().out
+    assert "a-1.0-pypi_0.conda" in out
+    assert "b-1.0-pypi_0.conda" in out
+    assert f"Cache location: {cache_dir}" in out
+    assert "Cached packages: 2" in out
+
+
+def test_execute_prune_to_max_size(cache_dir: Path, capsys):
+    args = Namespace(downloads=False, list=False, prune=True, clear=False, max_size="1K")
+    assert execute(args) == 0
+
+    out = capsys.readouterr().out
+    assert "Removed 1 cached packages" in out
+    assert "Cached packages: 1" in out
+
+
+def test_execute_clear(cache_dir: Path, capsys):
+    args = Namespace(downloads=False, list=False, prune=False, clear=True, max_size=None)
+    assert execute(args) == 0
+
+    assert "Cached packages: 0" in capsys.readouterr().out
+
+
+def test_execute_downloads(tmp_path: Path, monkeypatch, capsys):
+    path = tmp_path / "downloads"
+    monkeypatch.setattr(download_cache, "default_cache_dir", lambda: path)
+    (path / "pages").mkdir(parents=True)
+    (path / "pages" / "page").write_bytes(b"{}\n")
+
+    args = Namespace(downloads=True, list=True, prune=False, clear=True, max_size=None)
+    assert execute(args) == 0
+
+    out = capsys.readouterr().out
+    assert "Removed 1 cached files" in out
+    assert f"Cache location: {path}" in out
+    assert "Cached files: 0" in out
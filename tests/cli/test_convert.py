@@ -1,5 +1,7 @@
 import json
 import os
+import shutil
+from pathlib import Path
 
 import conda_package_streaming.package_streaming as cps
 import pytest
@@ -66,6 +68,55 @@ def test_convert_wheel(tmp_path):
     assert _read_about_json(files[0])["channels"] == list(context.channels)
 
 
+def test_convert_wheel_directory_in_parallel(tmp_path):
+    """Test converting a directory of wheels as a batch, with a JSON summary."""
+    wheelhouse = tmp_path / "wheelhouse"
+    wheelhouse.mkdir()
+    shutil.copy(DEMO_WHEEL, wheelhouse)
+    shutil.copy(ENTRYPOINT_WHEEL, wheelhouse)
+    out_dir = tmp_path / "out"
+    summary_json = tmp_path / "summary.json"
+
+    args = [
+        "pypi",
+        "convert",
+        "--output-folder",
+        str(out_dir),
+        "--jobs",
+        "2",
+        "--summary-json",
+        str(summary_json),
+        str(wheelhouse),
+    ]
+    main_subshell(*args)
+
+    assert len(list(out_dir.glob("*.conda"))) == 2
+
+    summary = json.loads(summary_json.read_text())
+    assert summary["jobs"] == 2
+    assert summary["succeeded"] == 2
+    assert summary["failed"] == 0
+    assert [Path(result["wheel"]).name for result in summary["results"]] == sorted(
+        path.name for path in wheelhouse.glob("*.whl")
+    )
+    assert all(result["seconds"] > 0 for result in summary["results"])
+
+
+def test_convert_batch_rejects_source_projects(tmp_path):
+    """Test that source projects cannot be mixed into a batch of wheels."""
+    args = [
+        "pypi",
+        "convert",
+        "--output-folder",
+        str(tmp_path / "out"),
+        DEMO_WHEEL,
+        PKG_HAS_BUILD_DEP,
+    ]
+
+    with pytest.raises(ArgumentError, match="Only wheels or directories of wheels"):
+        main_subshell(*args)
+
+
 def test_convert_wheel_with_tests(tmp_path):
     """Test converting an existing wheel file to conda package and injecting a test directory."""
     out_dir = tmp_path / "out"
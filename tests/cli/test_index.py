@@ -2,20 +2,30 @@
 Tests for the `conda pypi index` subcommand.
 """
 
+import hashlib
 import json
 import shutil
+import sys
 import zipfile
-from argparse import Namespace
 from pathlib import Path
 
+import msgpack
 import pytest
+import zstandard
 from conda.exceptions import ArgumentError
 
+import conda_pypi.cli.index as index_cli
 from conda_pypi.cli.index import execute, validate_dir_and_return_whl_files
+from conda_pypi.cli.main import generate_parser
 
 here = Path(__file__).parent.parent
 
 
+def index_args(directory, *options: str):
+    """Arguments of `conda pypi index DIRECTORY *options`, with the parser's defaults."""
+    return generate_parser().parse_args(["index", str(directory), *options])
+
+
 def test_cli(conda_cli):
     """
     Test that index subcommands exist.
@@ -53,11 +63,47 @@ def test_validate_dir_no_subdirectories(tmp_path):
 
 def test_validate_dir_returns_wheels():
     """Test valid dir"""
-    result = validate_dir_and_return_whl_files(here / "pypi_local_index")
+    result = list(validate_dir_and_return_whl_files(here / "pypi_local_index"))
     assert len(result) > 1
     assert any(wheel.name == "demo_package-0.1.0-py3-none-any.whl" for wheel in result)
 
 
+@pytest.mark.skipif(sys.platform == "win32", reason="symlinks need privileges on Windows")
+def test_validate_dir_does_not_follow_symlinks_to_ancestors(tmp_path):
+    """A symlink back up the tree does not index its wheels twice."""
+    (tmp_path / "pkg").mkdir()
+    wheel = make_wheel(tmp_path / "pkg", "a", "1.0")
+    (tmp_path / "pkg" / "up").symlink_to("..", target_is_directory=True)
+    (tmp_path / "pkg" / "self").symlink_to(tmp_path, target_is_directory=True)
+
+    assert list(validate_dir_and_return_whl_files(tmp_path)) == [wheel]
+
+
+def test_validate_dir_finds_flat_nested_and_mixed_wheels(tmp_path):
+    """Wheels are found in the directory itself and at any depth below it."""
+    (tmp_path / "a" / "deeper").mkdir(parents=True)
+    (tmp_path / ".cache").mkdir()
+    (tmp_path / "empty").mkdir()
+    wheels = {
+        make_wheel(tmp_path, "flat", "1.0"),
+        make_wheel(tmp_path / "a", "nested", "1.0"),
+        make_wheel(tmp_path / "a" / "deeper", "deep", "1.0"),
+    }
+    make_wheel(tmp_path / ".cache", "hidden", "1.0")
+    (tmp_path / "a" / "README.txt").write_text("not a wheel")
+
+    assert set(validate_dir_and_return_whl_files(tmp_path)) == wheels
+
+    args = index_args(tmp_path, "--base-url", "https://example.com/")
+    assert execute(args) == 0
+    repodata = json.loads((tmp_path / "noarch" / "repodata.json").read_text())
+    assert sorted(entry["url"] for entry in repodata["v3"]["whl"].values()) == [
+        "https://example.com/a/deeper/deep-1.0-py3-none-any.whl",
+        "https://example.com/a/nested-1.0-py3-none-any.whl",
+        "https://example.com/flat-1.0-py3-none-any.whl",
+    ]
+
+
 def test_execute_indexes_wheels(tmp_path):
     """
     Test that execute() reads .whl files from a directory structure and produces
@@ -65,7 +111,7 @@ def test_execute_indexes_wheels(tmp_path):
     """
     shutil.copytree(here / "pypi_local_index", tmp_path / "pypi_local_index")
 
-    args = Namespace(directory=tmp_path / "pypi_local_index", base_url=None)
+    args = index_args(tmp_path / "pypi_local_index")
     result = execute(args)
 
     assert result == 0
@@ -76,13 +122,114 @@ def test_execute_indexes_wheels(tmp_path):
     assert len(repodata["v3"]["whl"]) == 6
 
 
+def test_execute_jobs_matches_serial_index(tmp_path, capsys):
+    """Indexing on a process pool gives the same repodata and failures as one process."""
+    repodata = {}
+    for jobs in (1, 3):
+        channel = tmp_path / str(jobs)
+        shutil.copytree(here / "pypi_local_index", channel)
+        (channel / "bad-package").mkdir()
+        (channel / "bad-package" / "bad_package-1.0.0-py3-none-any.whl").write_bytes(b"nope")
+
+        assert (
+            execute(index_args(channel, "--base-url", "https://example.com/", "--jobs", str(jobs)))
+            == 0
+        )
+        assert "Failed to read bad_package-1.0.0-py3-none-any.whl" in capsys.readouterr().out
+        repodata[jobs] = json.loads((channel / "noarch" / "repodata.json").read_text())
+
+    assert len(repodata[3]["v3"]["whl"]) == 6
+    assert repodata[3]["v3"] == repodata[1]["v3"]
+
+
+def test_execute_reads_only_changed_wheels(tmp_path, capsys, mocker):
+    """Wheels indexed by an earlier run are not read again unless they changed."""
+
+    channel = tmp_path / "pypi_local_index"
+    shutil.copytree(here / "pypi_local_index", channel)
+    (channel / "bad-package").mkdir()
+    (channel / "bad-package" / "bad_package-1.0.0-py3-none-any.whl").write_bytes(b"nope")
+    args = index_args(channel)
+    assert execute(args) == 0
+    capsys.readouterr()
+
+    index_wheel = mocker.spy(index_cli, "index_wheel")
+    (channel / "new-package").mkdir()
+    make_wheel(channel / "new-package", "new_package", "1.0.0")
+    shutil.rmtree(channel / "demo-package")
+    assert execute(args) == 0
+
+    assert [call.args[0].name for call in index_wheel.call_args_list] == [
+        "new_package-1.0.0-py3-none-any.whl"
+    ]
+    # failures are remembered too
+    assert "Failed to read bad_package-1.0.0-py3-none-any.whl" in capsys.readouterr().out
+    repodata = json.loads((channel / "noarch" / "repodata.json").read_text())
+    names = {entry["name"] for entry in repodata["v3"]["whl"].values()}
+    assert "new-package" in names
+    assert "demo-package" not in names
+    assert len(names) == 6
+
+    # a changed base URL changes every entry
+    assert execute(index_args(channel, "--base-url", "https://example.com/")) == 0
+    assert index_wheel.call_count == 1 + 7
+
+    # as does another conda-pypi version
+    capsys.readouterr()
+    mocker.patch.object(index_cli, "__version__", "999.0")
+    assert execute(index_args(channel, "--base-url", "https://example.com/")) == 0
+    assert index_wheel.call_count == 1 + 7 + 7
+    assert "Failed to read bad_package-1.0.0-py3-none-any.whl" in capsys.readouterr().out
+
+
+def test_execute_writes_sharded_repodata(tmp_path):
+    """
+    Sharded repodata lists every package in a shard found through the shard
+    index, and shards or repodata.json left by earlier runs are removed.
+    """
+
+    def load(path: Path):
+        with zstandard.ZstdDecompressor().stream_reader(path.open("rb")) as reader:
+            return msgpack.loads(reader.read())
+
+    channel = tmp_path / "pypi_local_index"
+    shutil.copytree(here / "pypi_local_index", channel)
+    noarch = channel / "noarch"
+    args = index_args(channel, "--repodata-format", "both")
+    assert execute(args) == 0
+    assert (noarch / "repodata.json").exists()
+
+    shards_index = load(noarch / "repodata_shards.msgpack.zst")
+    assert shards_index["info"]["subdir"] == "noarch"
+    assert "demo-package" in shards_index["shards"]
+    for name, shard_hash in shards_index["shards"].items():
+        shard_path = noarch / f"{shard_hash.hex()}.msgpack.zst"
+        assert hashlib.sha256(shard_path.read_bytes()).digest() == shard_hash
+        assert {entry["name"] for entry in load(shard_path)["v3"]["whl"].values()} == {name}
+    demo_shard = noarch / f"{shards_index['shards']['demo-package'].hex()}.msgpack.zst"
+
+    shutil.rmtree(channel / "demo-package")
+    args.repodata_format = "sharded"
+    assert execute(args) == 0
+    assert "demo-package" not in load(noarch / "repodata_shards.msgpack.zst")["shards"]
+    assert not demo_shard.exists()
+    assert len(list(noarch.glob("*.msgpack.zst"))) == len(shards_index["shards"]) - 1 + 2
+    assert not (noarch / "repodata.json").exists()
+    assert not (noarch / "repodata.json.zst").exists()
+
+    args.repodata_format = "json"
+    assert execute(args) == 0
+    assert not list(noarch.glob("*.msgpack.zst"))
+    assert (noarch / "repodata.json").exists()
+
+
 def test_execute_reports_failed_wheels(tmp_path, capsys):
     """Test OS/BadZipFile Error"""
     pkg_dir = tmp_path / "bad-package"
     pkg_dir.mkdir()
     (pkg_dir / "bad_package-1.0.0-py3-none-any.whl").write_bytes(b"not a real wheel")
 
-    args = Namespace(directory=tmp_path, base_url=None)
+    args = index_args(tmp_path)
     result = execute(args)
 
     assert result == 0
@@ -116,7 +263,7 @@ def test_execute_skips_wheel_with_invalid_requirement(tmp_path, capsys):
     pkg_dir.mkdir()
     make_wheel(pkg_dir, "bad_package", "1.0.0", requires_dist=["!!!invalid!!!"])
 
-    args = Namespace(directory=tmp_path, base_url=None)
+    args = index_args(tmp_path)
     result = execute(args)
 
     assert result == 0
@@ -130,7 +277,7 @@ def test_execute_skips_platform_specific_wheel(tmp_path, capsys):
     pkg_dir.mkdir()
     make_wheel(pkg_dir, "bad_package", "1.0.0", platform="cp311-win_amd64")
 
-    args = Namespace(directory=tmp_path, base_url=None)
+    args = index_args(tmp_path)
     result = execute(args)
 
     assert result == 0
@@ -141,7 +288,7 @@ def test_execute_skips_platform_specific_wheel(tmp_path, capsys):
 def test_base_url_is_passed(tmp_path):
     """Test that if `--base-url` is passed, it is used to construct the URL for each entry in repodata.json"""
     shutil.copytree(here / "pypi_local_index", tmp_path / "pypi_local_index")
-    args = Namespace(directory=tmp_path / "pypi_local_index", base_url="https://example.com/")
+    args = index_args(tmp_path / "pypi_local_index", "--base-url", "https://example.com/")
     result = execute(args)
 
     assert result == 0
@@ -156,8 +303,62 @@ def test_execute_expands_user_in_directory(tmp_path, monkeypatch):
     monkeypatch.setenv("HOME", str(tmp_path))
     monkeypatch.setenv("USERPROFILE", str(tmp_path))  # for windows
 
-    args = Namespace(directory=Path("~/pypi_local_index"), base_url=None)
+    args = index_args(Path("~/pypi_local_index"))
     result = execute(args)
 
     assert result == 0
     assert (tmp_path / "pypi_local_index" / "noarch" / "repodata.json").exists()
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_execute_from_json(tmp_path, capsys, monkeypatch, jobs):
+    """
+    PyPI release payloads are streamed from a JSON lines file into a channel.
+    Releases without a pure Python wheel are counted, bad lines are reported,
+    and another run replaces the packages of the first.
+    """
+
+    monkeypatch.setattr(index_cli, "JSON_BATCH_SIZE", 1)
+    fastapi = json.loads(
+        (here / "data" / "pypi_json" / "fastapi-0.116.1.json").read_text(encoding="utf-8")
+    )
+    platform_only = {
+        "info": {"name": "foo", "version": "1.0"},
+        "urls": [
+            {
+                "packagetype": "bdist_wheel",
+                "filename": "foo-1.0-cp312-cp312-manylinux_x86_64.whl",
+                "url": "https://example.com/foo-1.0-cp312-cp312-manylinux_x86_64.whl",
+            }
+        ],
+    }
+    releases = tmp_path / "releases.jsonl"
+    releases.write_text(
+        "\n".join((json.dumps(fastapi), "", json.dumps(platform_only), "{not json", "[]")) + "\n"
+    )
+    channel = tmp_path / "channel"
+    args = index_args(channel, "--jobs", str(jobs), "--from-json", str(releases))
+    assert execute(args) == 0
+
+    out = capsys.readouterr().out
+    assert "Skipping line 4: invalid JSON" in out
+    assert "Skipping line 5: not a PyPI release payload" in out
+    assert "Indexed 1 releases; 1 without a pure Python wheel; 2 failed." in out
+    repodata = json.loads((channel / "noarch" / "repodata.json").read_text())
+    assert [entry["version"] for entry in repodata["v3"]["whl"].values()] == ["0.116.1"]
+
+    lines = []
+    for version in ("0.116.2", "0.117.0"):
+        fastapi["info"]["version"] = version
+        lines.append(json.dumps(fastapi))
+    releases.write_text("\n".join(lines))
+    assert execute(args) == 0
+    repodata = json.loads((channel / "noarch" / "repodata.json").read_text())
+    assert sorted(entry["version"] for entry in repodata["v3"]["whl"].values()) == [
+        "0.116.2",
+        "0.117.0",
+    ]
+
+    args.base_url = "https://example.com/"
+    with pytest.raises(ArgumentError, match="--base-url"):
+        execute(args)
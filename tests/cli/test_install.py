@@ -6,6 +6,7 @@ from __future__ import annotations
 
 import json
 import re
+import shutil
 from argparse import Namespace
 from pathlib import Path
 
@@ -58,6 +59,9 @@ def editable_args():
             "yes": False,
             "ignore_channels": False,
             "index_urls": None,
+            "find_links": None,
+            "offline": False,
+            "timing_report": None,
             "quiet": False,
             "verbosity": 0,
             "prefix": None,
@@ -242,6 +246,28 @@ def test_index_urls(tmp_env, conda_cli, pypi_local_index):
         assert rc == 0
 
 
+def test_find_links_offline(tmp_env, conda_cli, tmp_path, pypi_demo_package_wheel_path):
+    wheelhouse = tmp_path / "wheelhouse"
+    wheelhouse.mkdir()
+    shutil.copy(pypi_demo_package_wheel_path, wheelhouse)
+    with tmp_env("python=3.10") as prefix:
+        with pytest.deprecated_call(match=r"`conda pypi install` for package installs"):
+            out, _err, rc = conda_cli(
+                "pypi",
+                "--yes",
+                "install",
+                "--ignore-channels",
+                "--prefix",
+                prefix,
+                "--offline",
+                "--find-links",
+                str(wheelhouse),
+                "demo-package",
+            )
+        assert "Converted packages\n - demo-package==0.1.0" in out
+        assert rc == 0
+
+
 def test_install_output(tmp_env, conda_cli):
     with tmp_env("python=3.12") as prefix:
         with pytest.deprecated_call(match=r"`conda pypi install` for package installs"):
@@ -1,4 +1,7 @@
 import shutil
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 
 import pytest
@@ -75,6 +78,40 @@ def pypi_local_index():
     http.shutdown()
 
 
+class _KeepAliveHandler(SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _CountingServer(ThreadingHTTPServer):
+    daemon_threads = True
+    connections = 0
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+
+@pytest.fixture
+def counting_pypi_index():
+    """
+    Serves the folder "tests/pypi_local_index" with keep-alive HTTP/1.1, and
+    counts the connections clients open in ``server.connections``.
+    """
+    server = _CountingServer(
+        ("127.0.0.1", 0), partial(_KeepAliveHandler, directory=str(PYPI_LOCAL_INDEX))
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
 @pytest.fixture(scope="session")
 def conda_local_channel():
     """
@@ -139,3 +176,27 @@ def wheels_local_channel(tmp_path_factory, session_conda_cli):
     yield f"http://{host}:{port}"
 
     http.shutdown()
+
+
+@pytest.fixture(scope="session")
+def sharded_wheels_local_channel(tmp_path_factory, session_conda_cli):
+    """Like ``wheels_local_channel``, with sharded repodata and no repodata.json."""
+    channel_dir = tmp_path_factory.mktemp("sharded_wheels_local_channel")
+    shutil.copytree(PYPI_LOCAL_INDEX, channel_dir, dirs_exist_ok=True)
+    http = http_test_server.run_test_server(str(channel_dir))
+    host, port = http.socket.getsockname()
+    base_url = f"http://{host}:{port}/"
+
+    session_conda_cli(
+        "pypi",
+        "index",
+        str(channel_dir),
+        "--base-url",
+        base_url,
+        "--repodata-format",
+        "sharded",
+    )
+
+    yield f"http://{host}:{port}"
+
+    http.shutdown()
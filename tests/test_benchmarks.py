@@ -1,13 +1,27 @@
+import io
+import json
+import sys
+import tarfile
 from pathlib import Path
 
 import pytest
 from conda.common.path import get_python_short_path
 from conda.models.match_spec import MatchSpec
 from conda.testing.fixtures import CondaCLIFixture
+from conda_index.index import ChannelIndex
+from conda_package_streaming.create import conda_builder
 
 from conda_pypi.build import build_conda
 from conda_pypi.convert_tree import ConvertTree
+from conda_pypi.download_cache import DownloadCache
 from conda_pypi.downloader import find_and_fetch, get_package_finder
+from conda_pypi.index import update_index, update_index_incremental
+
+
+@pytest.fixture(scope="module")
+def download_cache(tmp_path_factory) -> DownloadCache:
+    """Wheels and index pages shared by every round, so rounds time conversion, not PyPI."""
+    return DownloadCache(tmp_path_factory.mktemp("download-cache"))
 
 
 @pytest.mark.benchmark
@@ -24,6 +38,7 @@ def test_convert_tree(
     conda_cli: CondaCLIFixture,
     python_template_env: Path,
     packages: tuple[str],
+    download_cache: DownloadCache,
     benchmark,
 ):
     """Benchmark convert_tree. This test overrides channels so the whole
@@ -48,7 +63,7 @@ def test_convert_tree(
 
         conda_cli("create", "--clone", str(python_template_env), "--prefix", prefix, "--yes")
 
-        tree_converter = ConvertTree(prefix, True, repo_dir)
+        tree_converter = ConvertTree(prefix, True, repo_dir, download_cache=download_cache)
         return (tree_converter,), {}
 
     def target(tree_converter):
@@ -76,6 +91,7 @@ def test_build_conda(
     conda_cli: CondaCLIFixture,
     python_template_env: Path,
     package: str,
+    download_cache: DownloadCache,
     benchmark,
 ):
     """Benchmark building the conda package from a wheel.
@@ -102,8 +118,8 @@ def test_build_conda(
         conda_cli("create", "--clone", str(python_template_env), "--prefix", prefix, "--yes")
 
         python_exe = Path(prefix, get_python_short_path())
-        finder = get_package_finder(prefix)
-        wheel_path = find_and_fetch(finder, wheel_dir, package)
+        finder = get_package_finder(prefix, cache=download_cache)
+        wheel_path = find_and_fetch(finder, wheel_dir, package, cache=download_cache)
 
         return (wheel_path, python_exe, build_path, output_path), {}
 
@@ -122,3 +138,109 @@ def test_build_conda(
         rounds=1,
         warmup_rounds=0,  # no warm up, cleaning the cache every time
     )
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("compression_level", [1, 3, 10, 19, 22])
+def test_build_conda_compression_level(
+    tmp_path_factory,
+    compression_level: int,
+    download_cache: DownloadCache,
+    benchmark,
+):
+    """Benchmark wall time and output size of build_conda across zstd levels.
+
+    The package size is recorded in the benchmark's ``extra_info``.
+    """
+    wheel_dir = tmp_path_factory.mktemp("wheel_dir")
+    finder = get_package_finder(sys.prefix, cache=download_cache)
+    wheel_path = find_and_fetch(finder, wheel_dir, "certifi", cache=download_cache)
+    # Track setup iteration for unique paths
+    setup_counter = 0
+
+    def setup():
+        nonlocal setup_counter
+        setup_counter += 1
+        build_path = tmp_path_factory.mktemp(f"build-{compression_level}-{setup_counter}")
+        output_path = tmp_path_factory.mktemp(f"output-{compression_level}-{setup_counter}")
+        return (build_path, output_path), {}
+
+    def target(build_path, output_path):
+        package_conda = build_conda(
+            wheel_path,
+            build_path,
+            output_path,
+            sys.executable,
+            compression_level=compression_level,
+        )
+        benchmark.extra_info["size_in_bytes"] = package_conda.stat().st_size
+
+    benchmark.pedantic(
+        target,
+        setup=setup,
+        rounds=1,
+        warmup_rounds=0,
+    )
+    assert benchmark.extra_info["size_in_bytes"] > 0
+
+
+def _make_conda_package(subdir_path: Path, name: str) -> Path:
+    stem = f"{name}-1.0-pypi_0"
+    index_json = json.dumps(
+        {"name": name, "version": "1.0", "build": "pypi_0", "build_number": 0, "depends": []}
+    ).encode("utf-8")
+    with conda_builder(stem, subdir_path) as tar:
+        tar_info = tarfile.TarInfo("info/index.json")
+        tar_info.size = len(index_json)
+        tar.addfile(tar_info, io.BytesIO(index_json))
+    return subdir_path / f"{stem}.conda"
+
+
+@pytest.fixture(scope="module")
+def large_channel(tmp_path_factory) -> Path:
+    """A local channel of 5,000 indexed packages, like a long-lived conda-pypi repo."""
+
+    channel = tmp_path_factory.mktemp("large-channel")
+    noarch = channel / "noarch"
+    noarch.mkdir()
+    for i in range(5000):
+        _make_conda_package(noarch, f"pkg{i}")
+    update_index(
+        ChannelIndex(
+            channel, None, write_run_exports=True, compact_json=True, write_current_repodata=False
+        )
+    )
+    return channel
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("incremental", [True, False], ids=["incremental", "full"])
+def test_update_index_after_convert(large_channel: Path, incremental: bool, benchmark):
+    """Benchmark indexing the 5 packages one convert_tree pass adds to a 5,000
+    package channel, incrementally or by re-indexing the whole channel.
+    """
+
+    rounds = iter(range(1000))
+
+    def setup():
+        n = next(rounds)
+        noarch = large_channel / "noarch"
+        kind = "incremental" if incremental else "full"
+        packages = [_make_conda_package(noarch, f"{kind}{n}-{i}") for i in range(5)]
+        return (packages,), {}
+
+    def target(packages):
+        if incremental:
+            update_index_incremental(large_channel, packages)
+        else:
+            update_index(
+                ChannelIndex(
+                    large_channel,
+                    None,
+                    write_run_exports=True,
+                    compact_json=True,
+                    write_current_repodata=False,
+                )
+            )
+
+    benchmark.pedantic(target, setup=setup, rounds=5, iterations=1)
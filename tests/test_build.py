@@ -1,13 +1,26 @@
+import base64
+import hashlib
 import json
+import multiprocessing
+import os
+import subprocess
 import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from textwrap import dedent
 
+import pytest
+import zstandard
 from conda.common.path import get_python_short_path
 from conda.testing.fixtures import TmpEnvFixture
 from conda_package_streaming import package_streaming
 
-from conda_pypi.build import build_conda
+from conda_pypi import build
+from conda_pypi.build import build_conda, build_conda_batch, paths_json
 from conda_pypi.package_extractors.whl import extract_whl_as_conda_pkg
+from conda_pypi.utils import sha256_as_base64url
 
 
 def _build_demo_conda_and_paths(
@@ -180,6 +193,258 @@ def test_build_conda_members_stay_in_info_component(
     assert all(name.startswith("site-packages") for name in pkg_names)
 
 
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_build_conda_batch_reports_each_wheel(
+    pypi_demo_package_wheel_path: Path,
+    pypi_license_file_wheel_path: Path,
+    tmp_path: Path,
+    jobs: int,
+):
+    """A broken wheel is reported without stopping the rest of the batch."""
+    bad_wheel = tmp_path / "bad_package-1.0.0-py3-none-any.whl"
+    bad_wheel.write_bytes(b"not a real wheel")
+    repo_path = tmp_path / "repo"
+    repo_path.mkdir()
+
+    results = list(
+        build_conda_batch(
+            [pypi_demo_package_wheel_path, bad_wheel, pypi_license_file_wheel_path],
+            repo_path,
+            sys.executable,
+            jobs=jobs,
+        )
+    )
+
+    by_wheel = {Path(result["wheel"]).name: result for result in results}
+    assert len(by_wheel) == 3
+    assert by_wheel[bad_wheel.name]["package"] is None
+    assert "BadZipFile" in by_wheel[bad_wheel.name]["error"]
+    for wheel in (pypi_demo_package_wheel_path, pypi_license_file_wheel_path):
+        result = by_wheel[wheel.name]
+        assert result["error"] is None
+        assert Path(result["package"]).is_file()
+        assert result["seconds"] >= 0
+
+
+def _convert_shared_wheel(wheel: Path, repo_path: Path, lock_dir: Path, log_path: Path, barrier):
+    """
+    Worker process of test_build_conda_batch_converts_shared_wheels_once:
+    convert ``wheel`` once all workers are ready, logging each conversion.
+    """
+    convert = build.build_conda
+
+    def logged_build_conda(*args, **kwargs):
+        with log_path.open("a") as log:
+            log.write(f"{os.getpid()}\n")
+        # hold the lock while the other processes arrive
+        time.sleep(0.5)
+        return convert(*args, **kwargs)
+
+    build.build_conda = logged_build_conda
+    barrier.wait()
+    return list(build_conda_batch([wheel], repo_path, sys.executable, lock_dir=lock_dir))
+
+
+def test_build_conda_batch_converts_shared_wheels_once(
+    pypi_demo_package_wheel_path: Path, tmp_path: Path
+):
+    """
+    Processes sharing an output directory and lock_dir convert a wheel once;
+    the others wait and report the same package.
+    """
+    repo_path = tmp_path / "repo"
+    repo_path.mkdir()
+    log_path = tmp_path / "conversions.log"
+    log_path.touch()
+
+    with multiprocessing.Manager() as manager, ProcessPoolExecutor(4) as executor:
+        barrier = manager.Barrier(4)
+        futures = [
+            executor.submit(
+                _convert_shared_wheel,
+                pypi_demo_package_wheel_path,
+                repo_path,
+                tmp_path / "locks",
+                log_path,
+                barrier,
+            )
+            for _ in range(4)
+        ]
+        results = [result for future in futures for result in future.result()]
+
+    assert len(log_path.read_text().splitlines()) == 1
+    assert [result["error"] for result in results] == [None] * 4
+    assert len({result["package"] for result in results}) == 1
+    # nothing but the finished package is left in the output directory
+    assert [path.name for path in repo_path.iterdir()] == [Path(results[0]["package"]).name]
+
+
+def test_build_conda_does_not_replace_package(pypi_demo_package_wheel_path: Path, tmp_path: Path):
+    output_path = tmp_path / "out"
+    output_path.mkdir()
+    package = build_conda(
+        pypi_demo_package_wheel_path, tmp_path / "build", output_path, sys.executable
+    )
+    package.write_bytes(b"from another process")
+
+    with pytest.raises(FileExistsError):
+        build_conda(pypi_demo_package_wheel_path, tmp_path / "build", output_path, sys.executable)
+    assert package.read_bytes() == b"from another process"
+    assert list(output_path.iterdir()) == [package]
+
+
+def test_build_conda_compression_settings(
+    pypi_demo_package_wheel_path: Path,
+    tmp_path: Path,
+    mocker,
+):
+    """Compression level and threads are passed to the zstd compressor."""
+    compressor = mocker.patch(
+        "conda_pypi.build.zstandard.ZstdCompressor", wraps=zstandard.ZstdCompressor
+    )
+    repo_path = tmp_path / "repo"
+    repo_path.mkdir()
+
+    package_conda = build_conda(
+        pypi_demo_package_wheel_path,
+        tmp_path / "build",
+        repo_path,
+        sys.executable,
+        compression_level=1,
+        compression_threads=0,
+    )
+
+    compressor.assert_called_once_with(level=1, threads=0)
+    info_entries = [m.name for _, m in package_streaming.stream_conda_info(package_conda)]
+    assert "info/index.json" in info_entries
+
+
+def test_paths_json_reuses_record_digests(tmp_path: Path, mocker):
+    """RECORD digests are reused for unchanged files; other files are hashed."""
+    site_packages = tmp_path / "site-packages"
+    dist_info = site_packages / "demo-1.0.dist-info"
+    dist_info.mkdir(parents=True)
+    (site_packages / "demo").mkdir()
+    unchanged = site_packages / "demo" / "unchanged.py"
+    unchanged.write_text("unchanged = True\n")
+    modified = site_packages / "demo" / "modified.py"
+    modified.write_text("modified = False\n")
+    unlisted = site_packages / "demo" / "unlisted.py"
+    unlisted.write_text("unlisted = True\n")
+    (tmp_path / "bin").mkdir()
+    script = tmp_path / "bin" / "demo"
+    script.write_text("#!python\n")
+
+    def row(path, recorded):
+        data = path.read_bytes()
+        return f"{recorded},sha256={sha256_as_base64url(data)},{len(data)}\n"
+
+    record = dist_info / "RECORD"
+    record.write_text(
+        row(unchanged, "demo/unchanged.py")
+        + row(modified, "demo/modified.py")
+        + row(script, "../bin/demo")
+        + "demo-1.0.dist-info/RECORD,,\n"
+    )
+    os.utime(record, (1000, 1000))
+    for path in (unchanged, modified, unlisted, script):
+        os.utime(path, (900, 900))
+    modified.write_text("modified = True\n")
+    os.utime(modified, (1100, 1100))
+
+    expected = paths_json(tmp_path)
+    checksum = mocker.spy(build, "sha256_checksum")
+
+    assert paths_json(tmp_path, use_record=True, threads=2) == expected
+    hashed = sorted(Path(call.args[0]).name for call in checksum.call_args_list)
+    assert hashed == ["RECORD", "modified.py", "unlisted.py"]
+
+
+def _write_large_wheel(path: Path, members: int, member_size: int) -> Path:
+    """Write a wheel of ``members`` zero-filled data files, stored uncompressed."""
+    chunk = bytes(1 << 20)
+    digest = hashlib.sha256()
+    for _ in range(member_size // len(chunk)):
+        digest.update(chunk)
+    data_hash = base64.urlsafe_b64encode(digest.digest()).decode("ascii").rstrip("=")
+
+    wheel = path / "large_package-1.0-py3-none-any.whl"
+    dist_info = "large_package-1.0.dist-info"
+    record = []
+    with zipfile.ZipFile(wheel, "w", zipfile.ZIP_STORED) as wheel_zip:
+        for i in range(members):
+            name = f"large_package/blob{i}.bin"
+            with wheel_zip.open(name, "w", force_zip64=True) as member:
+                for _ in range(member_size // len(chunk)):
+                    member.write(chunk)
+            record.append(f"{name},sha256={data_hash},{member_size}")
+        for name, text in (
+            ("METADATA", "Metadata-Version: 2.1\nName: large-package\nVersion: 1.0\n"),
+            ("WHEEL", "Wheel-Version: 1.0\nRoot-Is-Purelib: true\nTag: py3-none-any\n"),
+        ):
+            data = text.encode("utf-8")
+            wheel_zip.writestr(f"{dist_info}/{name}", data)
+            record.append(f"{dist_info}/{name},sha256={sha256_as_base64url(data)},{len(data)}")
+        record.append(f"{dist_info}/RECORD,,")
+        wheel_zip.writestr(f"{dist_info}/RECORD", "\n".join(record) + "\n")
+    return wheel
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="resource module is Unix only")
+@pytest.mark.parametrize(
+    "members, member_size",
+    [
+        (4, 64 << 20),
+        pytest.param(8, 256 << 20, marks=pytest.mark.benchmark, id="2GiB"),
+    ],
+)
+def test_build_conda_max_memory_bounds_peak_rss(tmp_path: Path, members: int, member_size: int):
+    """Converting a large wheel with max_memory keeps peak RSS far below the wheel size."""
+    wheel = _write_large_wheel(tmp_path, members=members, member_size=member_size)
+    output_path = tmp_path / "output"
+    output_path.mkdir()
+
+    # a fresh interpreter, whose ru_maxrss before the conversion covers the imports
+    script = dedent(
+        """
+        import resource, sys
+        from pathlib import Path
+        from conda_pypi.build import build_conda
+
+        wheel, build_path, output_path = map(Path, sys.argv[1:])
+        print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+        build_conda(
+            wheel,
+            build_path,
+            output_path,
+            sys.executable,
+            compression_level=1,
+            compression_threads=0,
+            max_memory=16 << 20,
+        )
+        print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+        """
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script, str(wheel), str(tmp_path / "build"), str(output_path)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    before, after = map(int, result.stdout.split()[-2:])
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    growth = (after - before) * (1 if sys.platform == "darwin" else 1024)
+    # about the size of a 256 MiB wheel without max_memory
+    assert growth < 64 << 20
+
+    package_conda = output_path / "large-package-1.0-pypi_0.conda"
+    sizes = {
+        member.name: member.size
+        for _, member in package_streaming.stream_conda_component(package_conda)
+    }
+    assert sizes[f"site-packages/large_package/blob{members - 1}.bin"] == member_size
+
+
 def test_conda_package_conforms_to_cep_34_35(
     tmp_env: TmpEnvFixture,
     pypi_demo_package_wheel_path: Path,
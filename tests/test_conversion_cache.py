@@ -0,0 +1,112 @@
+"""
+Tests for the cache of converted wheels.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+
+from conda_pypi import installer
+from conda_pypi.build import build_conda
+from conda_pypi.conversion_cache import ConversionCache
+
+
+def _build(wheel: Path, tmp_path: Path, cache: ConversionCache, **kwargs) -> Path:
+    output_path = tmp_path / "out"
+    output_path.mkdir(parents=True, exist_ok=True)
+    return build_conda(
+        wheel,
+        tmp_path / "build",
+        output_path,
+        sys.executable,
+        cache=cache,
+        **kwargs,
+    )
+
+
+def test_key_depends_on_conversion_inputs(
+    pypi_demo_package_wheel_path: Path,
+    pypi_license_file_wheel_path: Path,
+    tmp_path: Path,
+):
+    cache = ConversionCache(tmp_path)
+    key = cache.key(pypi_demo_package_wheel_path)
+
+    assert key == cache.key(pypi_demo_package_wheel_path)
+    assert key != cache.key(pypi_license_file_wheel_path)
+    assert key != cache.key(pypi_demo_package_wheel_path, channels=("conda-forge",))
+    assert key != cache.key(pypi_demo_package_wheel_path, {"demo-package": {"conda_name": "demo"}})
+    assert key != cache.key(pypi_demo_package_wheel_path, python_executable="/env/bin/python")
+    assert key != cache.key(pypi_demo_package_wheel_path, compression_level=3)
+    assert key != cache.key(pypi_demo_package_wheel_path, compression_threads=4)
+
+
+def test_build_conda_reuses_cached_package(
+    pypi_demo_package_wheel_path: Path,
+    tmp_path: Path,
+    mocker: MockerFixture,
+):
+    cache = ConversionCache(tmp_path / "cache")
+    first = _build(pypi_demo_package_wheel_path, tmp_path / "first", cache)
+    assert len(cache.entries()) == 1
+
+    spy = mocker.spy(installer, "install_installer_to_tar")
+    second = _build(pypi_demo_package_wheel_path, tmp_path / "second", cache)
+
+    spy.assert_not_called()
+    assert second.name == first.name
+    assert second.read_bytes() == first.read_bytes()
+
+    # an existing output is still an error, before any conversion work
+    with pytest.raises(FileExistsError):
+        _build(pypi_demo_package_wheel_path, tmp_path / "second", cache)
+
+
+def test_build_conda_with_test_dir_is_not_cached(
+    pypi_demo_package_wheel_path: Path,
+    tmp_path: Path,
+):
+    cache = ConversionCache(tmp_path / "cache")
+    test_dir = tmp_path / "test"
+    test_dir.mkdir()
+    (test_dir / "run_test.py").write_text("")
+
+    _build(pypi_demo_package_wheel_path, tmp_path, cache, test_dir=test_dir)
+
+    assert cache.entries() == []
+
+
+def test_put_evicts_least_recently_used(tmp_path: Path):
+    packages = []
+    for name in ("a", "b", "c"):
+        package = tmp_path / f"{name}-1.0-pypi_0.conda"
+        package.write_bytes(b"x" * 100)
+        packages.append(package)
+
+    cache = ConversionCache(tmp_path / "cache", max_size=250)
+    cache.put("key-a", packages[0])
+    cache.put("key-b", packages[1])
+    # make "a" older than "b", then use it so that "b" is least recently used
+    os.utime(cache.get("key-a"), (0, 0))
+    os.utime(cache.get("key-b"), (100, 100))
+    assert cache.get("key-a")
+
+    cache.put("key-c", packages[2])
+
+    assert [entry.key for entry in cache.entries()] == ["key-a", "key-c"]
+    assert cache.get("key-b") is None
+
+
+def test_clear(tmp_path: Path):
+    package = tmp_path / "a-1.0-pypi_0.conda"
+    package.write_bytes(b"x")
+    cache = ConversionCache(tmp_path / "cache")
+    cache.put("key-a", package)
+
+    removed = cache.clear()
+
+    assert [entry.key for entry in removed] == ["key-a"]
+    assert cache.entries() == []
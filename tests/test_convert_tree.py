@@ -3,20 +3,29 @@ Test converting a dependency tree to conda.
 """
 
 import os
+import shutil
+import zipfile
 from pathlib import Path
 
 import pytest
+from conda.exceptions import PackagesNotFoundError
 from conda.models.match_spec import MatchSpec
 from conda.testing.fixtures import TmpEnvFixture
 from pytest_mock import MockerFixture
+from unearth import Link, PackageFinder, TargetPython
 
+from conda_pypi import convert_tree, downloader
+from conda_pypi.conversion_cache import ConversionCache
 from conda_pypi.convert_tree import (
     ConvertTree,
     parse_libmamba_solver_error,
     parse_rattler_solver_error,
 )
+from conda_pypi.download_cache import DownloadCache
 from conda_pypi.downloader import get_package_finder
-from conda_pypi.exceptions import CondaPypiError
+from conda_pypi.exceptions import CondaPypiError, FetchError
+from conda_pypi.session import new_session
+from conda_pypi.timing import Timings
 
 REPO = Path(__file__).parents[1] / "synthetic_repo"
 
@@ -107,6 +116,184 @@ def test_package_without_wheel_should_fail_early(
         assert "wheel" in error_msg
 
 
+def test_convert_loop_converts_wheels_in_parallel(
+    tmp_path: Path,
+    mocker: MockerFixture,
+    pypi_demo_package_wheel_path: Path,
+    pypi_license_file_wheel_path: Path,
+):
+    """
+    Fetched wheels are converted on a process pool, and all of them are in the
+    repository before it is indexed.
+    """
+    repo = tmp_path / "repo"
+    (repo / "noarch").mkdir(parents=True)
+    wheels = [pypi_demo_package_wheel_path, pypi_license_file_wheel_path]
+
+    def fetch(finder, target, packages, max_workers=None, cache=None):
+        return {wheel.name: Path(shutil.copy(wheel, target)) for wheel in wheels}
+
+    def index(channel_root, packages):
+        assert len(packages) == len(wheels)
+        assert all(package.exists() for package in packages)
+
+    mocker.patch("conda_pypi.convert_tree.find_and_fetch_all", side_effect=fetch)
+    mocker.patch("conda_pypi.convert_tree.available_names", side_effect=lambda names, _: names)
+    update_index = mocker.patch(
+        "conda_pypi.convert_tree.update_index_incremental", side_effect=index
+    )
+    build_conda_batch = mocker.spy(convert_tree, "build_conda_batch")
+    solver = mocker.Mock()
+    solver.solve_for_diff.side_effect = [PackagesNotFoundError(["demo-package"]), ((), ())]
+
+    converter = ConvertTree(
+        tmp_path / "prefix",
+        repo=repo,
+        finder=mocker.Mock(sources=[], target_python=TargetPython(py_ver=(3, 12))),
+        cache=ConversionCache(tmp_path / "cache"),
+        download_cache=DownloadCache(tmp_path / "downloads"),
+        conversion_jobs=4,
+        timings=Timings(),
+    )
+    with converter.timings.activate():
+        assert converter._convert_loop(5, solver, tmp_path) == ((), ())
+
+    update_index.assert_called_once()
+    assert build_conda_batch.call_args.kwargs["jobs"] == len(wheels)
+    spans = converter.timings.spans
+    assert [span.name for span in spans if span.name != "build_conda"] == [
+        "solve",
+        "convert",
+        "update_index",
+        "solve",
+    ]
+    assert spans[0].packages == ["demo-package"]
+    assert sorted(span.packages[0] for span in spans if span.name == "build_conda") == sorted(
+        wheel.name for wheel in wheels
+    )
+
+
+def _write_wheel(path: Path, name: str, requires: list[str]) -> Path:
+    """Write an empty wheel whose METADATA lists ``requires``, and the METADATA next to it."""
+    metadata = "".join(
+        [
+            f"Metadata-Version: 2.1\nName: {name}\nVersion: 1.0\n",
+            *(f"Requires-Dist: {requirement}\n" for requirement in requires),
+        ]
+    )
+    dist_info = f"{name.replace('-', '_')}-1.0.dist-info"
+    wheel = path / f"{name.replace('-', '_')}-1.0-py3-none-any.whl"
+    with zipfile.ZipFile(wheel, "w") as wheel_zip:
+        wheel_zip.writestr(f"{dist_info}/METADATA", metadata)
+        wheel_zip.writestr(
+            f"{dist_info}/WHEEL", "Wheel-Version: 1.0\nRoot-Is-Purelib: true\nTag: py3-none-any\n"
+        )
+        wheel_zip.writestr(f"{dist_info}/RECORD", "")
+    Path(f"{wheel}.metadata").write_text(metadata)
+    return wheel
+
+
+def test_convert_loop_fetches_dependency_closure(tmp_path: Path, mocker: MockerFixture):
+    """
+    The dependencies of a missing package that no channel provides are found
+    from their metadata and converted before the next solve, so a deep tree
+    needs two solves instead of one per level.
+    """
+
+    index = tmp_path / "index"
+    index.mkdir()
+    repo = tmp_path / "repo"
+    (repo / "noarch").mkdir(parents=True)
+    tree = {
+        "pkg-a": ["pkg-b>=1", "pkg-c", "conda-only"],
+        "pkg-b": ["pkg-d", 'windows-only; sys_platform == "win32"'],
+        "pkg-c": ["pkg-d", "extra-only; extra == 'test'"],
+        "pkg-d": [],
+    }
+    links = {
+        name: Link(_write_wheel(index, name, requires).as_uri(), dist_info_metadata=True)
+        for name, requires in tree.items()
+    }
+    finder = mocker.Mock(
+        sources=[], target_python=TargetPython(py_ver=(3, 12)), session=new_session()
+    )
+    finder.find_best_match.side_effect = lambda requirement: mocker.Mock(
+        best=mocker.Mock(link=links[requirement.name])
+    )
+
+    def available(names, channels):
+        assert channels[0] == repo.as_uri()
+        return {name for name in names if name == "conda-only"}
+
+    mocker.patch("conda_pypi.convert_tree.available_names", side_effect=available)
+    update_index = mocker.patch("conda_pypi.convert_tree.update_index_incremental")
+    fetch_wheel = mocker.spy(downloader, "fetch_wheel")
+    fetch_metadata = mocker.spy(downloader, "fetch_metadata")
+    solver = mocker.Mock()
+    solver.solve_for_diff.side_effect = [PackagesNotFoundError(["pkg-a"]), ((), ())]
+
+    converter = ConvertTree(
+        tmp_path / "prefix",
+        repo=repo,
+        finder=finder,
+        cache=ConversionCache(tmp_path / "cache"),
+        download_cache=DownloadCache(tmp_path / "downloads"),
+        conversion_jobs=1,
+    )
+    assert converter._convert_loop(5, solver, tmp_path) == ((), ())
+
+    assert solver.solve_for_diff.call_count == 2
+    # the walk only reads metadata; each wheel is downloaded once
+    assert sorted(call.args[0].filename for call in fetch_metadata.call_args_list) == [
+        "pkg_b-1.0-py3-none-any.whl",
+        "pkg_c-1.0-py3-none-any.whl",
+        "pkg_d-1.0-py3-none-any.whl",
+    ]
+    assert sorted(call.args[0].filename for call in fetch_wheel.call_args_list) == [
+        f"{name.replace('-', '_')}-1.0-py3-none-any.whl" for name in tree
+    ]
+    update_index.assert_called_once()
+    packages = update_index.call_args.args[1]
+    assert sorted(package.name for package in packages) == [
+        f"{name}-1.0-pypi_0.conda" for name in tree
+    ]
+
+
+def test_convert_loop_fails_fast_without_wheel(tmp_path: Path, mocker: MockerFixture):
+    """
+    A requirement found without a wheel is remembered in the repository, and
+    the next conversion that needs it fails without asking the index.
+    """
+    repo = tmp_path / "repo"
+    (repo / "noarch").mkdir(parents=True)
+    finder = PackageFinder(
+        index_urls=["https://pypi.example/simple/"], target_python=TargetPython(py_ver=(3, 12))
+    )
+    find_best_match = mocker.patch.object(
+        finder,
+        "find_best_match",
+        return_value=mocker.Mock(
+            best=mocker.Mock(link=Link("https://pypi.example/ach-1.0.tar.gz"))
+        ),
+    )
+
+    for _ in range(2):
+        converter = ConvertTree(
+            tmp_path / "prefix",
+            repo=repo,
+            finder=finder,
+            cache=ConversionCache(tmp_path / "cache"),
+            download_cache=DownloadCache(tmp_path / "downloads"),
+        )
+        solver = mocker.Mock()
+        solver.solve_for_diff.side_effect = PackagesNotFoundError(["ach"])
+        with pytest.raises(FetchError, match="No wheel file available for ach"):
+            converter._convert_loop(5, solver, tmp_path)
+
+    find_best_match.assert_called_once()
+    assert len(list((repo / ".no-wheel").glob("*.json"))) == 1
+
+
 def test_parse_libmamba_solver_error():
     error_message = "'Encountered problems while solving:\n  - nothing provides numpy <2.6,>=1.25.2 needed by scipy-1.16.3-pypi_0\n\nCould not solve for environment specs\nThe following package could not be installed\n└─ \x1b[31mscipy =* *\x1b[0m is not installable because it requires\n   └─ \x1b[31mnumpy <2.6,>=1.25.2 *\x1b[0m, which does not exist (perhaps a missing channel).'"
     assert set(parse_libmamba_solver_error(error_message)) == {"numpy <2.6,>=1.25.2"}
@@ -0,0 +1,115 @@
+"""
+Tests for the cache of wheels and index pages downloaded from PyPI.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+
+import httpx
+from pytest_mock import MockerFixture
+from unearth import Link
+
+from conda_pypi import download_cache
+from conda_pypi.download_cache import DownloadCache
+from conda_pypi.utils import recorded_sha256
+
+
+def _link(wheel: Path) -> Link:
+    sha256 = hashlib.sha256(wheel.read_bytes()).hexdigest()
+    return Link(f"{wheel.as_uri()}#sha256={sha256}")
+
+
+def test_fetch_wheel_hit(
+    tmp_path: Path, mocker: MockerFixture, pypi_demo_package_wheel_path: Path
+):
+    cache = DownloadCache(tmp_path / "cache")
+    link = _link(pypi_demo_package_wheel_path)
+    download = mocker.spy(download_cache, "download")
+
+    for target in (tmp_path / "first", tmp_path / "second"):
+        target.mkdir()
+        wheel = cache.fetch_wheel(link, target)
+        assert wheel == target / pypi_demo_package_wheel_path.name
+        assert wheel.read_bytes() == pypi_demo_package_wheel_path.read_bytes()
+        assert recorded_sha256(wheel) == link.hash
+
+    download.assert_called_once()
+    assert [entry.path for entry in cache.entries()] == [cache.wheel_path(link)]
+
+
+def test_fetch_wheel_keyed_on_sha256(tmp_path: Path, pypi_demo_package_wheel_path: Path):
+    cache = DownloadCache(tmp_path / "cache")
+    link = _link(pypi_demo_package_wheel_path)
+    other = Link(f"{link.url_without_fragment}#sha256={'0' * 64}")
+    assert cache.wheel_path(link) != cache.wheel_path(other)
+
+
+def test_prune_evicts_least_recently_used(
+    tmp_path: Path, pypi_demo_package_wheel_path: Path, pypi_license_file_wheel_path: Path
+):
+    cache = DownloadCache(tmp_path / "cache")
+    target = tmp_path / "target"
+    target.mkdir()
+    old, new = _link(pypi_demo_package_wheel_path), _link(pypi_license_file_wheel_path)
+    cache.fetch_wheel(old, target)
+    cache.fetch_wheel(new, target)
+    os.utime(cache.wheel_path(old), (1, 1))
+
+    removed = cache.prune(cache.wheel_path(new).stat().st_size)
+    assert [entry.path for entry in removed] == [cache.wheel_path(old)]
+    assert not cache.wheel_path(old).parent.exists()
+    assert cache.wheel_path(new).exists()
+
+
+def test_fetch_wheel_prunes_past_max_size(
+    tmp_path: Path,
+    mocker: MockerFixture,
+    pypi_demo_package_wheel_path: Path,
+    pypi_license_file_wheel_path: Path,
+):
+    """The cache is walked once to count its size, then only to evict files."""
+    first, second = _link(pypi_demo_package_wheel_path), _link(pypi_license_file_wheel_path)
+    target = tmp_path / "target"
+    target.mkdir()
+    cache = DownloadCache(tmp_path / "cache", max_size="1G")
+    entries = mocker.spy(cache, "entries")
+    prune = mocker.spy(cache, "prune")
+    cache.fetch_wheel(first, target)
+    cache.fetch_wheel(second, target)
+    assert (entries.call_count, prune.call_count) == (1, 0)
+
+    max_size = cache.wheel_path(first).stat().st_size
+    os.utime(cache.wheel_path(second), (1, 1))
+    cache.wheel_path(first).unlink()
+    cache = DownloadCache(tmp_path / "cache", max_size=max_size)
+    prune = mocker.spy(cache, "prune")
+    cache.fetch_wheel(first, target)
+    prune.assert_called_once()
+    assert [entry.path for entry in cache.entries()] == [cache.wheel_path(first)]
+
+
+def test_client_revalidates_index_pages(tmp_path: Path):
+    cache = DownloadCache(tmp_path / "cache")
+    url = "https://pypi.example/simple/demo-package/"
+    body = b'<a href="demo_package-0.1.0-py3-none-any.whl">demo</a>'
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(
+            200, headers={"Content-Type": "text/html", "ETag": '"v1"'}, content=body
+        )
+
+    for _ in range(2):
+        client = cache.client(mounts={"https://": httpx.MockTransport(handler)})
+        response = client.get(url, headers={"Accept": "text/html"})
+        assert response.status_code == 200
+        assert response.content == body
+        assert response.headers["Content-Type"] == "text/html"
+        assert str(response.url) == url
+
+    assert "If-None-Match" not in requests[0].headers
+    assert requests[1].headers["If-None-Match"] == '"v1"'
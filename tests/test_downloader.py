@@ -6,13 +6,23 @@ distributions), the conversion should fail early with a meaningful error rather
 than looping until max attempts (20).
 """
 
+import hashlib
 import os
+import shutil
+import threading
+import time
+import zipfile
 from pathlib import Path
 
 import pytest
 from conda.testing.fixtures import TmpEnvFixture
+from unearth import Link
 
-from conda_pypi.exceptions import CondaPypiError
+from conda_pypi import downloader
+from conda_pypi.downloader import fetch_wheel, find_candidate, find_package, get_package_finder
+from conda_pypi.exceptions import CondaPypiError, FetchError
+from conda_pypi.session import new_session
+from conda_pypi.utils import recorded_sha256
 
 REPO = Path(__file__).parents[1] / "synthetic_repo"
 
@@ -45,3 +55,136 @@ def test_downloader_detects_no_wheels(tmp_env: TmpEnvFixture, monkeypatch, tmp_p
         assert "source distributions" in error_msg or "only source" in error_msg, (
             f"Expected error message to mention source distributions, got: {error_msg}"
         )
+
+
+def test_find_and_fetch_all_aggregates_errors(monkeypatch, tmp_path: Path):
+    """
+    Packages are fetched concurrently up to max_workers, and every failure is
+    reported together after the other packages have been fetched.
+    """
+
+    lock = threading.Lock()
+    running = 0
+    peak = 0
+
+    def fake_find_and_fetch(finder, target, package, cache=None):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+        if package.startswith("sdist-only"):
+            raise CondaPypiError(f"No wheel file available for {package}.")
+        return target / f"{package}-1.0-py3-none-any.whl"
+
+    monkeypatch.setattr(downloader, "find_and_fetch", fake_find_and_fetch)
+
+    packages = ["sdist-only-b", *(f"pkg{i}" for i in range(8)), "sdist-only-a"]
+    with pytest.raises(FetchError) as exc_info:
+        downloader.find_and_fetch_all(None, tmp_path, packages, max_workers=3)
+
+    assert list(exc_info.value.errors) == ["sdist-only-a", "sdist-only-b"]
+    assert "Could not fetch 2 package(s)" in str(exc_info.value)
+    assert "No wheel file available for sdist-only-a" in str(exc_info.value)
+    assert 1 < peak <= 3
+
+    fetched = downloader.find_and_fetch_all(None, tmp_path, packages[1:-1], max_workers=3)
+    assert fetched == {f"pkg{i}": tmp_path / f"pkg{i}-1.0-py3-none-any.whl" for i in range(8)}
+
+
+def test_find_candidate_prefers_metadata_file(tmp_path: Path, mocker):
+    """
+    The METADATA the index serves next to a wheel (PEP 658) is used instead of
+    downloading the wheel, and its hash is verified. Without it, the wheel is
+    downloaded and its METADATA read.
+    """
+
+    index = tmp_path / "index"
+    index.mkdir()
+    target = tmp_path / "target"
+    target.mkdir()
+    metadata = "Metadata-Version: 2.1\nName: demo\nVersion: 1.0\nRequires-Dist: idna\n"
+    wheel = index / "demo-1.0-py3-none-any.whl"
+    with zipfile.ZipFile(wheel, "w") as wheel_zip:
+        wheel_zip.writestr("demo-1.0.dist-info/METADATA", metadata)
+    Path(f"{wheel}.metadata").write_text(metadata)
+    sha256 = hashlib.sha256(metadata.encode()).hexdigest()
+
+    def finder_for(link):
+        finder = mocker.Mock(session=new_session())
+        finder.find_best_match.return_value.best.link = link
+        return finder
+
+    link = Link(wheel.as_uri(), dist_info_metadata={"sha256": sha256})
+    candidate = find_candidate(finder_for(link), target, "demo")
+    assert (candidate.metadata, candidate.wheel) == (metadata, None)
+    assert not list(target.iterdir())
+
+    link = Link(wheel.as_uri(), dist_info_metadata={"sha256": "0" * 64})
+    with pytest.raises(CondaPypiError, match="sha256"):
+        find_candidate(finder_for(link), target, "demo")
+
+    candidate = find_candidate(finder_for(Link(wheel.as_uri())), target, "demo")
+    assert (candidate.metadata, candidate.wheel) == (metadata, target / wheel.name)
+
+    # listed by the index, but missing
+    Path(f"{wheel}.metadata").unlink()
+    (target / wheel.name).unlink()
+    link = Link(wheel.as_uri(), dist_info_metadata={"sha256": sha256})
+    candidate = find_candidate(finder_for(link), target, "demo")
+    assert (candidate.metadata, candidate.wheel) == (metadata, target / wheel.name)
+
+
+def test_find_links_come_before_index(
+    counting_pypi_index, pypi_demo_package_wheel_path: Path, tmp_path: Path, mocker
+):
+    """
+    A wheel in a local wheelhouse is preferred to the index, and offline mode
+    never connects to the index.
+    """
+
+    python = mocker.Mock(version="3.12.0")
+    mocker.patch("conda_pypi.downloader.PrefixData").return_value.query.return_value = [python]
+    wheelhouse = tmp_path / "wheelhouse"
+    wheelhouse.mkdir()
+    shutil.copy(pypi_demo_package_wheel_path, wheelhouse)
+    host, port = counting_pypi_index.server_address[:2]
+    index_urls = [f"http://{host}:{port}/"]
+
+    finder = get_package_finder(tmp_path, index_urls, find_links=[str(wheelhouse)])
+    assert [source["type"] for source in finder.sources] == ["find_links", "index"]
+    link = find_package(finder, "demo-package").best.link
+    assert link.file_path.parent == wheelhouse
+
+    counting_pypi_index.connections = 0
+    finder = get_package_finder(tmp_path, index_urls, find_links=[str(wheelhouse)], offline=True)
+    assert find_package(finder, "demo-package").best.link.file_path.parent == wheelhouse
+    assert find_package(finder, "entrypoint-pkg").best is None
+    assert counting_pypi_index.connections == 0
+
+    finder = get_package_finder(tmp_path, index_urls, offline=True)
+    with pytest.raises(CondaPypiError, match="Offline mode"):
+        find_package(finder, "demo-package")
+    assert counting_pypi_index.connections == 0
+
+
+def test_fetch_wheel_links_wheelhouse_files(
+    tmp_path: Path, mocker, pypi_demo_package_wheel_path: Path
+):
+    wheelhouse = tmp_path / "wheelhouse"
+    wheelhouse.mkdir()
+    wheel = Path(shutil.copy(pypi_demo_package_wheel_path, wheelhouse))
+    sha256 = hashlib.sha256(wheel.read_bytes()).hexdigest()
+    session = mocker.Mock()
+    target = tmp_path / "target"
+    target.mkdir()
+
+    fetched = fetch_wheel(Link(f"{wheel.as_uri()}#sha256={sha256}"), target, session=session)
+    assert fetched.stat().st_ino == wheel.stat().st_ino
+    assert recorded_sha256(fetched) == sha256
+    assert not session.mock_calls
+
+    with pytest.raises(CondaPypiError, match="sha256"):
+        fetch_wheel(Link(f"{wheel.as_uri()}#sha256={'0' * 64}"), target, session=session)
@@ -1,20 +1,27 @@
 from __future__ import annotations
 
+import io
 import json
+import shutil
+import tarfile
 from pathlib import Path
-from typing import TYPE_CHECKING
 
 import pytest
+from conda_index.index import ChannelIndex
+from conda_package_streaming.create import conda_builder
 
 from conda_pypi.exceptions import UnableToConvertToRepodataEntry
-from conda_pypi.index import store_pypi_metadata
+from conda_pypi.index import (
+    indexed_wheels,
+    store_indexed_wheels,
+    store_pypi_metadata,
+    update_index,
+    update_index_incremental,
+)
 
 HERE = Path(__file__).parent
 PYPI_JSON_FIXTURES = HERE / "data" / "pypi_json"
 
-if TYPE_CHECKING:
-    from conda_index.index import ChannelIndex
-
 
 def test_store_pypi_metadata(channel_index_with_wheels: ChannelIndex):
     cache = channel_index_with_wheels.cache_for_subdir("noarch")
@@ -69,3 +76,109 @@ def test_store_pypi_metadata_no_sha256(channel_index_with_wheels: ChannelIndex):
 
     with pytest.raises(ValueError, match="PyPI payload for 'foo-bar' is missing a sha256 digest"):
         store_pypi_metadata(cache, pypi_data)
+
+
+def _make_conda_package(subdir_path: Path, name: str) -> Path:
+    """Write a minimal .conda containing only info/index.json."""
+
+    stem = f"{name}-1.0-pypi_0"
+    index_json = json.dumps(
+        {"name": name, "version": "1.0", "build": "pypi_0", "build_number": 0, "depends": []}
+    ).encode("utf-8")
+    with conda_builder(stem, subdir_path) as tar:
+        tar_info = tarfile.TarInfo("info/index.json")
+        tar_info.size = len(index_json)
+        tar.addfile(tar_info, io.BytesIO(index_json))
+    return subdir_path / f"{stem}.conda"
+
+
+def _full_index(channel_root: Path):
+    update_index(
+        ChannelIndex(
+            channel_root,
+            None,
+            threads=1,
+            write_run_exports=True,
+            compact_json=True,
+            write_current_repodata=False,
+        )
+    )
+
+
+def test_indexed_wheels_adds_version_to_old_table(channel_index_with_wheels: ChannelIndex):
+    """Rows written before the conda_pypi column existed match no version."""
+    cache = channel_index_with_wheels.cache_for_subdir("noarch")
+    with cache.db:
+        cache.db.execute(
+            "CREATE TABLE conda_pypi_wheels (path TEXT PRIMARY KEY, size INTEGER, "
+            "mtime_ns INTEGER, url TEXT, stat TEXT, error TEXT)"
+        )
+        cache.db.execute(
+            "INSERT INTO conda_pypi_wheels VALUES ('a.whl', 1, 2, 'file:///a.whl', NULL, 'old')"
+        )
+    assert indexed_wheels(cache)["a.whl"]["conda_pypi"] is None
+
+    row = {"size": 1, "mtime_ns": 2, "url": "file:///a.whl", "conda_pypi": "1.0"}
+    store_indexed_wheels(cache, {"a.whl": {**row, "stat": None, "error": "new"}})
+    assert indexed_wheels(cache)["a.whl"]["conda_pypi"] == "1.0"
+
+
+def test_update_index_incremental_matches_full_index(tmp_path: Path):
+    """Adding packages incrementally gives the same repodata as a full re-index."""
+    channel = tmp_path / "channel"
+    noarch = channel / "noarch"
+    noarch.mkdir(parents=True)
+    for i in range(3):
+        _make_conda_package(noarch, f"existing{i}")
+    _full_index(channel)
+
+    new_packages = [_make_conda_package(noarch, f"new{i}") for i in range(2)]
+    # not passed in, so not indexed: the channel is not listed again
+    _make_conda_package(noarch, "unlisted")
+    update_index_incremental(channel, new_packages)
+
+    repodata = json.loads((noarch / "repodata.json").read_text())
+    assert sorted(repodata["packages.conda"]) == [
+        "existing0-1.0-pypi_0.conda",
+        "existing1-1.0-pypi_0.conda",
+        "existing2-1.0-pypi_0.conda",
+        "new0-1.0-pypi_0.conda",
+        "new1-1.0-pypi_0.conda",
+    ]
+
+    (noarch / "unlisted-1.0-pypi_0.conda").unlink()
+    shutil.rmtree(noarch / ".cache")
+    incremental = {
+        filename: json.loads((noarch / filename).read_text())
+        for filename in ("repodata.json", "repodata_from_packages.json", "run_exports.json")
+    }
+    _full_index(channel)
+    for filename, data in incremental.items():
+        assert data == json.loads((noarch / filename).read_text()), filename
+
+
+def test_update_index_incremental_changes_last_modified(tmp_path: Path):
+    """Updates within one second still change repodata.json's whole-second mtime."""
+    noarch = tmp_path / "noarch"
+    noarch.mkdir()
+    _make_conda_package(noarch, "existing")
+    _full_index(tmp_path)
+
+    mtimes = [int((noarch / "repodata.json").stat().st_mtime)]
+    for i in range(3):
+        update_index_incremental(tmp_path, [_make_conda_package(noarch, f"new{i}")])
+        mtimes.append(int((noarch / "repodata.json").stat().st_mtime))
+    assert mtimes == sorted(set(mtimes))
+
+
+def test_update_index_incremental_without_repodata(tmp_path: Path):
+    """A channel that was never indexed falls back to a full index."""
+    noarch = tmp_path / "noarch"
+    noarch.mkdir()
+    existing = _make_conda_package(noarch, "existing")
+    new = _make_conda_package(noarch, "new")
+
+    update_index_incremental(tmp_path, [new])
+
+    repodata = json.loads((noarch / "repodata.json").read_text())
+    assert sorted(repodata["packages.conda"]) == [existing.name, new.name]
@@ -4,17 +4,20 @@ Tests for installer data file handling.
 Tests that data files in wheels are properly installed.
 """
 
+import hashlib
 import io
 import json
 import os
 import sys
 import tarfile
+import tempfile
 from pathlib import Path
 
 import pytest
 from conda.base.context import context
 from conda.common.path import get_python_short_path
 from conda.testing.fixtures import TmpEnvFixture
+from pytest_mock import MockerFixture
 
 from conda_pypi import installer
 from conda_pypi.build import build_pypa
@@ -68,6 +71,32 @@ def test_install_installer_to_tar_data_files_present(
     )
 
 
+def test_install_installer_to_tar_streams_members(
+    pypi_demo_package_wheel_path: Path,
+    tmp_path: Path,
+    mocker: MockerFixture,
+):
+    """Wheel members are hashed while streaming into the tar, without spooling."""
+    spooled = mocker.patch.object(
+        installer.tempfile, "SpooledTemporaryFile", wraps=tempfile.SpooledTemporaryFile
+    )
+    tar_path = tmp_path / "output.tar"
+    with tarfile.open(tar_path, "w") as tar:
+        package_paths = installer.install_installer_to_tar(
+            sys.executable,
+            pypi_demo_package_wheel_path,
+            tar,
+        )
+
+    spooled.assert_not_called()
+
+    with tarfile.open(tar_path) as tar:
+        for entry in package_paths:
+            data = tar.extractfile(entry["_path"]).read()
+            assert entry["size_in_bytes"] == len(data)
+            assert entry["sha256"] == hashlib.sha256(data).hexdigest()
+
+
 def test_install_installer_headers(
     tmp_env: TmpEnvFixture,
     wheel_with_headers: Path,
@@ -1,11 +1,16 @@
 import sys
+import zipfile
 from importlib.metadata import PathDistribution
 from pathlib import Path
 
 import pytest
 
-from conda_pypi.license_files import copy_into_info_licenses, package_metadata_from_metadata_body
-from conda_pypi.translate import CondaMetadata
+from conda_pypi.license_files import (
+    copy_into_info_licenses,
+    package_metadata_from_metadata_body,
+    read_wheel_licenses,
+)
+from conda_pypi.translate import CondaMetadata, WheelDistribution
 
 
 def test_package_metadata_from_body_matches_path_distribution(tmp_path: Path):
@@ -143,6 +148,41 @@ def test_license_file_unsafe_path_raises(tmp_path: Path, unsafe_path: str):
     assert not (info_dir / "licenses").exists(), "no files should be copied before error"
 
 
+def test_read_wheel_licenses_matches_copy_into_info_licenses(tmp_path: Path):
+    """Reading from the wheel archive resolves the same files as the on-disk copy."""
+    dist_info_dir = tmp_path / "pkg-1.0.dist-info"
+    (dist_info_dir / "licenses" / "docs").mkdir(parents=True)
+    (dist_info_dir / "LICENSE").write_text("BSD\n", encoding="utf-8")
+    (dist_info_dir / "licenses" / "docs" / "NOTICE").write_text("Legal\n", encoding="utf-8")
+    _write_dist_info_metadata(
+        dist_info_dir,
+        "License-File: LICENSE",
+        "License-File: docs/NOTICE",
+        "License-File: MISSING",
+    )
+    wheel = tmp_path / "pkg-1.0-py3-none-any.whl"
+    with zipfile.ZipFile(wheel, "w") as zf:
+        for path in sorted(dist_info_dir.rglob("*")):
+            if path.is_file():
+                zf.write(path, path.relative_to(tmp_path).as_posix())
+
+    info_dir = tmp_path / "info"
+    info_dir.mkdir()
+    rel_paths = copy_into_info_licenses(
+        dist_info_dir, info_dir, PathDistribution(dist_info_dir).metadata
+    )
+
+    with zipfile.ZipFile(wheel) as archive:
+        distribution = WheelDistribution(archive, dist_info_dir.name)
+        licenses = read_wheel_licenses(archive, dist_info_dir.name, distribution.metadata)
+
+    assert sorted(licenses) == sorted(rel_paths)
+    assert licenses == {
+        "info/licenses/LICENSE": b"BSD\n",
+        "info/licenses/docs/NOTICE": b"Legal\n",
+    }
+
+
 @pytest.mark.parametrize(
     "license_header,expected",
     [
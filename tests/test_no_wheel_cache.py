@@ -0,0 +1,34 @@
+"""
+Tests for the cache of requirements without a wheel.
+"""
+
+from pathlib import Path
+
+from unearth import PackageFinder, TargetPython
+
+from conda_pypi.no_wheel_cache import NoWheelCache
+
+
+def _finder(py_ver=(3, 12), index_url="https://pypi.org/simple/") -> PackageFinder:
+    return PackageFinder(index_urls=[index_url], target_python=TargetPython(py_ver=py_ver))
+
+
+def test_key_covers_requirement_python_and_index():
+    key = NoWheelCache.key("ach", _finder())
+    assert key == NoWheelCache.key("ach", _finder())
+    assert key != NoWheelCache.key("ach>=1", _finder())
+    assert key != NoWheelCache.key("ach", _finder(py_ver=(3, 13)))
+    assert key != NoWheelCache.key("ach", _finder(index_url="https://example.com/simple/"))
+
+
+def test_entries_expire(tmp_path: Path):
+    cache = NoWheelCache(tmp_path / "no-wheel", ttl=60)
+    key = NoWheelCache.key("ach", _finder())
+    assert cache.get(key) is None
+
+    cache.put(key, "ach", "No wheel file available for ach.")
+    assert cache.get(key) == "No wheel file available for ach."
+
+    # expired entries are removed
+    assert NoWheelCache(tmp_path / "no-wheel", ttl=0).get(key) is None
+    assert cache.get(key) is None
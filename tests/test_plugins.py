@@ -167,9 +167,8 @@ def test_pip_beta_tip_visible_at_default_verbosity(
 def test_pip_warning_setting_defaults_to_true():
     """The conda_pypi_pip_warning setting must default to True."""
 
-    settings = list(conda_settings())
-    assert len(settings) == 1
-    setting = settings[0]
+    settings = {setting.name: setting for setting in conda_settings()}
+    setting = settings["conda_pypi_pip_warning"]
     assert isinstance(setting, CondaSetting)
     assert setting.name == "conda_pypi_pip_warning"
     assert setting.parameter.default.value is True
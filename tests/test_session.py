@@ -0,0 +1,138 @@
+"""
+Tests for the pooled HTTP session shared by index lookups and downloads.
+"""
+
+import hashlib
+import os
+import ssl
+import sys
+from pathlib import Path
+
+import certifi
+import httpx
+import pytest
+import unearth.finder
+from conda.base.context import context
+from unearth import PackageFinder, TargetPython
+
+from conda_pypi.downloader import CachingPackageFinder, find_and_fetch, find_package
+from conda_pypi.exceptions import CondaPypiError
+from conda_pypi.session import download, new_session
+from conda_pypi.utils import recorded_sha256
+
+
+def test_lookups_and_downloads_share_connections(counting_pypi_index, tmp_path: Path):
+    host, port = counting_pypi_index.server_address[:2]
+    index_url = f"http://{host}:{port}/"
+    finder = PackageFinder(
+        session=new_session([index_url], pool_size=2, retries=0),
+        index_urls=[index_url],
+        only_binary=":all:",
+        target_python=TargetPython(py_ver=sys.version_info[:2]),
+    )
+
+    for i in range(3):
+        target = tmp_path / str(i)
+        target.mkdir()
+        wheel = find_and_fetch(finder, target, "demo-package")
+        assert wheel.name == "demo_package-0.1.0-py3-none-any.whl"
+
+    # every index page and wheel request reused one keep-alive connection
+    assert counting_pypi_index.connections == 1
+
+
+def test_download_checks_sha256(tmp_path: Path, pypi_demo_package_wheel_path: Path):
+    session = new_session(pool_size=1, retries=0)
+    url = pypi_demo_package_wheel_path.as_uri()
+    target = tmp_path / pypi_demo_package_wheel_path.name
+
+    with pytest.raises(CondaPypiError, match="sha256"):
+        download(session, url, target, sha256="0" * 64)
+    assert not list(tmp_path.iterdir())
+
+    download(session, url, target)
+    assert target.read_bytes() == pypi_demo_package_wheel_path.read_bytes()
+
+
+def test_finder_parses_each_project_once(counting_pypi_index, mocker):
+    host, port = counting_pypi_index.server_address[:2]
+    index_url = f"http://{host}:{port}/"
+    finder = CachingPackageFinder(
+        session=new_session([index_url], pool_size=1, retries=0),
+        index_urls=[index_url],
+        only_binary=":all:",
+        target_python=TargetPython(py_ver=sys.version_info[:2]),
+    )
+    collect = mocker.spy(unearth.finder, "collect_links_from_location")
+
+    for package in ("demo-package", "demo_package >=0.1", "Demo-Package <1"):
+        assert find_package(finder, package).best.version == "0.1.0"
+    assert collect.call_count == 1
+
+    # versions excluded by one lookup are still found by the next
+    assert find_package(finder, "demo-package >=1").best is None
+    assert find_package(finder, "demo-package").best.version == "0.1.0"
+    assert finder.find_all_packages("Demo_Package")[0].version == "0.1.0"
+    assert collect.call_count == 1
+
+
+@pytest.mark.parametrize("resumes", [True, False])
+def test_download_resumes_broken_transfer(tmp_path: Path, resumes: bool):
+    body = bytes(range(256)) * 64
+    requests = []
+
+    def broken_after(data: bytes, size: int):
+        yield data[:size]
+        raise httpx.ReadError("connection reset")
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        headers = {"ETag": '"v1"'}
+        if len(requests) == 1:
+            return httpx.Response(200, headers=headers, content=broken_after(body, 1000))
+        if not resumes:
+            return httpx.Response(200, headers=headers, content=body)
+        assert request.headers["Range"] == "bytes=1000-"
+        assert request.headers["If-Range"] == '"v1"'
+        headers["Content-Range"] = f"bytes 1000-{len(body) - 1}/{len(body)}"
+        return httpx.Response(206, headers=headers, content=body[1000:])
+
+    session = httpx.Client(transport=httpx.MockTransport(handler))
+    target = tmp_path / "demo-1.0-py3-none-any.whl"
+    sha256 = hashlib.sha256(body).hexdigest()
+
+    assert download(session, "https://example.com/demo.whl", target, sha256, retries=1) == sha256
+    assert target.read_bytes() == body
+    assert len(requests) == 2
+    assert recorded_sha256(target) == sha256
+
+    # a replaced file is hashed again
+    target.write_bytes(b"changed")
+    assert recorded_sha256(target) is None
+
+
+def test_session_follows_conda_tls_and_proxy_settings(mocker):
+    ca_bundle = Path(certifi.where())
+    load_cert_chain = mocker.patch("ssl.SSLContext.load_cert_chain")
+    mocker.patch.object(type(context), "ssl_verify", str(ca_bundle))
+    mocker.patch.object(type(context), "client_ssl_cert", "client.pem")
+    mocker.patch.object(type(context), "client_ssl_cert_key", "client.key")
+    mocker.patch.object(type(context), "proxy_servers", {"https": "http://proxy.example.com:3128"})
+    mocker.patch.dict(os.environ, {"no_proxy": "internal.example.com"}, clear=True)
+
+    with new_session(pool_size=1, retries=0) as session:
+        load_cert_chain.assert_called_with("client.pem", "client.key")
+        transport = session._transport_for_url(httpx.URL("https://pypi.org/simple/"))
+        assert transport is not session._transport
+        assert transport._pool._proxy_url.host == b"proxy.example.com"
+        assert transport._pool._ssl_context is session._transport._pool._ssl_context
+        internal = session._transport_for_url(httpx.URL("https://internal.example.com/"))
+        assert internal is session._transport
+        # plain http has no proxy configured
+        plain = session._transport_for_url(httpx.URL("http://pypi.org/simple/"))
+        assert plain is session._transport
+
+    mocker.patch.object(type(context), "ssl_verify", False)
+    mocker.patch.object(type(context), "client_ssl_cert", None)
+    with new_session(pool_size=1, retries=0) as session:
+        assert session._transport._pool._ssl_context.verify_mode == ssl.CERT_NONE
@@ -0,0 +1,47 @@
+"""
+Tests for the timing spans of convert_tree phases.
+"""
+
+import json
+from pathlib import Path
+
+from conda_pypi import timing
+from conda_pypi.timing import Timings
+
+
+def test_spans_only_recorded_while_active(tmp_path: Path):
+    timings = Timings(tmp_path / "report.jsonl")
+    with timing.span("find", ["numpy"]):
+        pass
+
+    with timings.activate():
+        with timing.span("download", ["numpy-2.0-py3-none-any.whl"]) as span:
+            span.bytes = 100
+        timing.record("build_conda", 1.5, ["numpy-2.0-py3-none-any.whl"], 200)
+
+    with timing.span("find", ["scipy"]):
+        pass
+
+    assert [span.name for span in timings.spans] == ["download", "build_conda"]
+    lines = (tmp_path / "report.jsonl").read_text().splitlines()
+    assert json.loads(lines[0])["bytes"] == 100
+    assert json.loads(lines[1]) == {
+        "name": "build_conda",
+        "packages": ["numpy-2.0-py3-none-any.whl"],
+        "start": timings.spans[1].start,
+        "seconds": 1.5,
+        "bytes": 200,
+    }
+    assert timing.load(tmp_path / "report.jsonl") == timings.spans
+
+
+def test_summary_table():
+    timings = Timings()
+    timings.record(timing.Span("solve", ["a"], seconds=2.0))
+    timings.record(timing.Span("download", ["a.whl"], seconds=0.5, bytes=10))
+    timings.record(timing.Span("solve", ["b"], seconds=1.0))
+
+    lines = timings.summary().splitlines()
+    assert lines[0].split() == ["phase", "count", "total", "s", "max", "s", "bytes", "packages"]
+    assert lines[1].split() == ["solve", "2", "3.000", "2.000", "0", "2"]
+    assert lines[2].split() == ["download", "1", "0.500", "0.500", "10", "1"]
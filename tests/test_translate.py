@@ -1,6 +1,7 @@
 """Tests for conda_pypi.translate module."""
 
 import logging
+import zipfile
 
 import pytest
 from conda.exceptions import ArgumentError
@@ -9,6 +10,7 @@ from conda_pypi import __version__
 from conda_pypi.translate import (
     CondaMetadata,
     FileDistribution,
+    WheelDistribution,
     requires_to_conda,
     validate_name_mapping_format,
 )
@@ -298,3 +300,20 @@ def test_link_json_entry_points_are_parseable_by_conda():
         # Raises ValueError for "app [cli]" before this fix.
         command, module, func = parse_entry_point_def(entry_point)
         assert (command, module, func) == ("demo-script", "pkg.cli", "app")
+
+
+def test_wheel_distribution_reads_dist_info_from_archive(tmp_path):
+    """WheelDistribution serves METADATA and entry_points.txt without extracting."""
+    wheel = tmp_path / "demo-1.0.0-py3-none-any.whl"
+    with zipfile.ZipFile(wheel, "w") as zf:
+        zf.writestr("demo-1.0.0.dist-info/METADATA", "Metadata-Version: 2.1\nName: demo\n")
+        zf.writestr(
+            "demo-1.0.0.dist-info/entry_points.txt", "[console_scripts]\ndemo = demo:main\n"
+        )
+
+    with zipfile.ZipFile(wheel) as archive:
+        distribution = WheelDistribution(archive, "demo-1.0.0.dist-info")
+
+        assert distribution.metadata["Name"] == "demo"
+        assert [ep.value for ep in distribution.entry_points] == ["demo:main"]
+        assert distribution.read_text("RECORD") is None
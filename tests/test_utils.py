@@ -4,12 +4,17 @@ from __future__ import annotations
 
 import base64
 import hashlib
+import os
+from pathlib import Path
 
 import pytest
 
 from conda_pypi.utils import (
     hash_as_base64url,
+    parse_size,
     pypi_spec_variants,
+    record_sha256,
+    recorded_sha256,
     sha256_as_base64url,
     sha256_base64url_to_hex,
 )
@@ -94,3 +99,57 @@ def test_sha256_base64url_to_hex_hex_acceptable_by_bytes_fromhex():
     assert hex_str is not None
     decoded = bytes.fromhex(hex_str)
     assert decoded == hashlib.sha256(b"any content").digest()
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        (1234, 1234),
+        ("1234", 1234),
+        ("0", 0),
+        ("10K", 10 * 1024),
+        ("500M", 500 * 1024**2),
+        ("500MiB", 500 * 1024**2),
+        ("2g", 2 * 1024**3),
+        ("1.5G", 3 * 1024**3 // 2),
+    ],
+)
+def test_parse_size(value, expected: int):
+    assert parse_size(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", "G", "lots"])
+def test_parse_size_invalid(value: str):
+    with pytest.raises(ValueError, match="Invalid size"):
+        parse_size(value)
+
+
+def test_recorded_sha256_follows_hard_links(tmp_path: Path):
+    path = tmp_path / "demo.whl"
+    path.write_bytes(b"wheel")
+    record_sha256(path, "0" * 64)
+    assert recorded_sha256(path) == "0" * 64
+
+    link = tmp_path / "link" / "demo.whl"
+    link.parent.mkdir()
+    os.link(path, link)
+    record_sha256(link, "0" * 64)
+    assert recorded_sha256(link) == "0" * 64
+
+
+def test_recorded_sha256_invalidated_by_changes(tmp_path: Path):
+    path = tmp_path / "demo.whl"
+    path.write_bytes(b"wheel")
+    record_sha256(path, "0" * 64)
+
+    # same size, rewritten in place
+    stat = path.stat()
+    path.write_bytes(b"WHEEL")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert recorded_sha256(path) is None
+
+    record_sha256(path, "1" * 64)
+    replacement = tmp_path / "replacement.whl"
+    replacement.write_bytes(b"other")
+    os.replace(replacement, path)
+    assert recorded_sha256(path) is None
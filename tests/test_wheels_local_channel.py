@@ -43,3 +43,30 @@ def test_install_demo_package_from_wheels_local_channel(
         assert (prefix / "conda-meta").is_dir()
         records = list((prefix / "conda-meta").glob("demo-package-*.json"))
         assert records, "demo-package was not installed"
+
+
+def test_install_demo_package_from_sharded_wheels_local_channel(
+    sharded_wheels_local_channel,
+    with_rattler_solver,
+    tmp_env: TmpEnvFixture,
+    conda_cli,
+):
+    """
+    demo-package can be installed with Rattler from a channel that only has
+    sharded repodata.
+    """
+    resp = requests.get(f"{sharded_wheels_local_channel}/noarch/repodata.json")
+    assert resp.status_code == 404
+
+    with tmp_env("python=3.12") as prefix:
+        _out, err, rc = conda_cli(
+            "install",
+            "demo-package",
+            "--prefix",
+            prefix,
+            "--channel",
+            sharded_wheels_local_channel,
+            "--yes",
+        )
+        assert rc == 0, f"Failed to install from sharded wheel channel: {err}"
+        assert list((prefix / "conda-meta").glob("demo-package-*.json"))